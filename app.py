@@ -1,49 +1,207 @@
 from dotenv import load_dotenv
 load_dotenv()
 from flask import Flask, redirect, url_for, session, jsonify
-import os
+import click
 from datetime import datetime
 from models import db, User
+from config import Config
+from utils.sqlite_profile import apply_sqlite_profile, run_sqlite_maintenance
+from utils.metrics import metrics
+from utils.sql_profiler import sql_profiler
+from utils.sampling_profiler import sampling_profiler
 
-# Initialize Flask app
+def init_database():
+    """Create any missing tables; run inside an app context (flask init-db)"""
+    # Only the primary; a replica receives the schema through replication
+    db.create_all(bind_key=None)
 
-app = Flask(__name__)
-# Configuration
+def create_app(config_class=Config):
+    """
+    Build the Flask application
 
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///attendance.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# Default admin credentials (for demo; change in production)
-app.config['ADMIN_USERNAME'] = os.environ.get('ADMIN_USERNAME', 'admin')
-app.config['ADMIN_PASSWORD'] = os.environ.get('ADMIN_PASSWORD', 'admin123')
+    Configuration, database engines and blueprints only: no schema work and no
+    connections, so worker boot and CLI start-up stay cheap. Run
+    `flask init-db` once per deployment to create the tables.
 
-db.init_app(app)
+    Args:
+        config_class: Configuration object passed to app.config.from_object
 
-# Import routes after db initialization to avoid circular imports
-from routes import admin_routes, attendance_routes, auth_routes
+    Returns:
+        Flask: The configured application
+    """
+    # Initialize Flask app
+    app = Flask(__name__)
 
-# Register blueprints
+    # Configuration
+    app.config.from_object(config_class)
 
-app.register_blueprint(admin_routes.bp)
-app.register_blueprint(attendance_routes.bp)
-app.register_blueprint(auth_routes.bp)
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_profile(engine, app.config)
 
-# Create database tables
-with app.app_context():
-    db.create_all()
+    metrics.init_app(app)
+    sql_profiler.init_app(app)
+    sampling_profiler.init_app(app)
 
-@app.route('/')
-def index():
-    return redirect(url_for('auth.login'))
+    # Import routes after db initialization to avoid circular imports
+    from routes import admin_routes, api_routes, attendance_routes, auth_routes, metrics_routes, qr_routes
 
+    # Register blueprints
+    app.register_blueprint(admin_routes.bp)
+    app.register_blueprint(attendance_routes.bp)
+    app.register_blueprint(auth_routes.bp)
+    app.register_blueprint(qr_routes.bp)
+    app.register_blueprint(metrics_routes.bp)
+    app.register_blueprint(api_routes.bp)
 
-# Utility route to remove all users (for admin/debug only)
-@app.route('/remove_all_users')
-def remove_all_users():
-    with app.app_context():
-        num_deleted = User.query.delete()
-        db.session.commit()
-    return jsonify({'message': f'All users removed. Deleted: {num_deleted}'})
+    @app.route('/')
+    def index():
+        return redirect(url_for('auth.login'))
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create the database tables (safe to re-run)"""
+        init_database()
+        print('Database tables are up to date')
+
+    @app.cli.command('sqlite-maintenance')
+    def sqlite_maintenance():
+        """Checkpoint the SQLite WAL and run PRAGMA optimize; schedule from cron"""
+        result = run_sqlite_maintenance(db.engine)
+        if result is None:
+            print('Database is not SQLite; nothing to do')
+        else:
+            print(f"WAL checkpoint: {result['checkpointed_frames']}/{result['log_frames']} frames"
+                  f"{' (busy)' if result['busy'] else ''}")
+
+    @app.cli.command('split-tenants')
+    @click.option('--purge', is_flag=True, help='Delete copied rows from the shared database afterwards')
+    def split_tenants(purge):
+        """Copy each admin's teachers and attendance into their own shard (needs TENANT_SHARDING)"""
+        if not app.config['TENANT_SHARDING']:
+            print('Set TENANT_SHARDING=sqlite or TENANT_SHARDING=schema first')
+            return
+        from utils.tenant_shards import split_database
+        for tenant_id, (teachers, records) in split_database(purge=purge).items():
+            print(f'Tenant {tenant_id}: copied {teachers} teachers and {records} attendance records')
+
+    @app.cli.command('generate-dataset')
+    @click.option('--tenants', default=1, show_default=True, help='Admin accounts to create')
+    @click.option('--teachers', default=1000, show_default=True, help='Teachers per tenant')
+    @click.option('--years', default=2, show_default=True, help='Years of attendance history')
+    @click.option('--seed', default=0, show_default=True, help='Same seed, same rows')
+    @click.option('--password', default='password', show_default=True, help='Password of every generated account')
+    @click.option('--prefix', default='tenant', show_default=True, help='Usernames are <prefix>001, <prefix>002, ...')
+    @click.option('--end', type=click.DateTime(['%Y-%m-%d']),
+                  help='First day without history [default: synthetic_data.DEFAULT_END, '
+                       'fixed so a seed gives the same rows on any day]')
+    def generate_dataset(tenants, teachers, years, seed, password, prefix, end):
+        """Fill the database with seeded synthetic tenants, teachers and attendance"""
+        import time
+        from utils.synthetic_data import generate_tenants, DEFAULT_END
+        init_database()
+        start = time.perf_counter()
+        total = 0
+        try:
+            for result in generate_tenants(tenants, teachers, years=years, seed=seed, password=password, prefix=prefix,
+                                           end=end.date() if end else DEFAULT_END):
+                total += result['attendance']
+                print(f"{result['username']}: {result['teachers']} teachers, {result['attendance']} attendance records")
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        elapsed = time.perf_counter() - start
+        print(f'{tenants * teachers} teachers and {total} attendance records in {elapsed:.1f} s '
+              f'({total / max(elapsed, 1e-9):,.0f} records/s)')
+
+    @app.cli.command('reclassify-attendance')
+    @click.option('--user-id', type=int, multiple=True, help='School (admin user ID) to process; repeatable, default all')
+    @click.option('--since', type=click.DateTime(['%Y-%m-%d']), help='First attendance date to re-classify')
+    @click.option('--until', type=click.DateTime(['%Y-%m-%d']), help='Last attendance date to re-classify')
+    @click.option('--dry-run', is_flag=True, help='Show what would change without writing')
+    @click.option('--chunk-size', default=50000, show_default=True, help='Check-ins read per chunk')
+    def reclassify_attendance(user_id, since, until, dry_run, chunk_size):
+        """Recompute stored On Time/Late/Absent statuses after a schedule change"""
+        from utils.db_routing import use_tenant
+        from utils.reclassify import reclassify_tenant, ReclassifyError
+        from utils.tenant_shards import tenant_ids
+        for tenant_id in user_id or tenant_ids():
+            try:
+                with use_tenant(tenant_id):
+                    result = reclassify_tenant(tenant_id, since=since and since.date(), until=until and until.date(),
+                                               dry_run=dry_run, chunk_size=chunk_size)
+            except ReclassifyError as e:
+                raise click.ClickException(str(e))
+            verb = 'would change' if dry_run else 'changed'
+            print(f"School {tenant_id}: {result['examined']} check-ins in {result['seconds']:.1f} s, "
+                  f"{verb} {result['changed']}")
+            for (old, new), count in sorted(result['transitions'].items()):
+                print(f'  {old} -> {new}: {count}')
+            for sample in result['samples']:
+                print(f"  #{sample['id']} {sample['check_in_time']:%Y-%m-%d %a %H:%M:%S} "
+                      f"{sample['old']} -> {sample['new']}")
+
+    @app.cli.command('close-day')
+    @click.option('--date', 'day', type=click.DateTime(['%Y-%m-%d']), help='Day to close (default today)')
+    @click.option('--since', type=click.DateTime(['%Y-%m-%d']), help='Also close every day from this date on')
+    @click.option('--user-id', type=int, multiple=True, help='School (admin user ID) to close; repeatable, default all')
+    @click.option('--force', is_flag=True, help="Close today before the schools' absent deadlines")
+    @click.option('--include-closed-days', is_flag=True, help='Also close days the school calendar marks as non-school days')
+    def close_day_command(day, since, user_id, force, include_closed_days):
+        """Record Absent for every active teacher with no attendance on a school day; schedule from cron"""
+        from datetime import timedelta
+        from utils.clock import clock
+        from utils.close_day import close_day
+        last = day.date() if day else clock.today()
+        current = since.date() if since else last
+        while current <= last:
+            try:
+                for result in close_day(current, user_ids=user_id, force=force, include_closed=include_closed_days):
+                    if 'skipped' in result:
+                        print(f"{current:%Y-%m-%d %a} school {result['user_id']}: skipped, {result['skipped']}")
+                    else:
+                        print(f"{current:%Y-%m-%d %a} school {result['user_id']}: {result['inserted']} marked Absent")
+            except ValueError as e:
+                raise click.ClickException(str(e))
+            current += timedelta(days=1)
+
+    @app.cli.command('create-api-token')
+    @click.option('--user-id', type=int, required=True, help='Admin whose teachers and attendance the token can read')
+    @click.option('--name', required=True, help='Label for the integration, e.g. payroll')
+    def create_api_token(user_id, name):
+        """Issue a bearer token for /api/v1; it is printed once and only its hash is stored"""
+        from utils.api_tokens import create_token
+        try:
+            token = create_token(user_id, name)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        print(token)
+
+    @app.cli.command('revoke-api-token')
+    @click.option('--user-id', type=int, required=True, help='Admin the token belongs to')
+    @click.option('--name', required=True, help='Label given when the token was created')
+    def revoke_api_token(user_id, name):
+        """Delete an /api/v1 token; requests using it are refused immediately"""
+        from utils.api_tokens import revoke_token
+        if not revoke_token(user_id, name):
+            raise click.ClickException(f'Admin {user_id} has no token named "{name}"')
+        print(f'Revoked token "{name}"')
+
+    # Utility route to remove all users (for admin/debug only)
+    @app.route('/remove_all_users')
+    def remove_all_users():
+        with app.app_context():
+            num_deleted = User.query.delete()
+            db.session.commit()
+        return jsonify({'message': f'All users removed. Deleted: {num_deleted}'})
+
+    return app
+
+# Module-level app for `flask --app app`, gunicorn app:app and existing scripts
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # The development server creates missing tables itself
+    with app.app_context():
+        init_database()
+    app.run(debug=True, host='0.0.0.0', port=5000)
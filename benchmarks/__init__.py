@@ -0,0 +1 @@
+# Benchmarks for Teacher Attendance System
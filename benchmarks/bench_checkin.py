@@ -0,0 +1,292 @@
+"""
+Benchmark the check-in hot path and report pages on synthetic rosters
+
+For each roster size a fresh SQLite database gets the roster plus years of
+history, then the benchmark measures through Flask's test client:
+  - /attendance/process-qr check-in and check-out latency percentiles
+  - AttendanceLogic.get_attendance_summary time and peak Python memory
+  - /admin/ dashboard render time
+  - statements per request for each of those, against QUERY_BUDGETS
+
+Results are written as JSON, named after the current commit, so runs can be
+compared across commits with --compare. The run exits with status 1 when a
+request issues more statements than its budget or repeats one statement per
+row (N+1), so it can gate CI.
+
+Usage:
+    python -m benchmarks.bench_checkin [--sizes 100,1000,10000] [--years 2] [--scans 300]
+                                       [--json out.json] [--compare earlier.json] [--no-query-budget]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from app import create_app, init_database
+from config import Config, engine_options
+from utils.synthetic_data import build_dataset
+from utils.attendance_logic import AttendanceLogic
+from utils.sql_profiler import sql_profiler
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_DIR, 'benchmarks', 'results')
+
+BENCH_USER_ID = 1
+DASHBOARD_RENDERS = 20
+
+# Most statements one request may issue, independent of roster size
+QUERY_BUDGETS = {
+    'check_in': 5,
+    'check_out': 5,
+    'dashboard': 4,
+    'reports': 3,
+    'summary_api': 1,
+    'teacher_detail': 5,
+}
+
+# Fixed scan times: inside the on-time window, then inside the check-out window
+CHECK_IN_TIME = (6, 40)
+CHECK_OUT_TIME = (15, 30)
+
+
+def _percentiles(seconds):
+    values = sorted(seconds)
+    pick = lambda fraction: values[min(len(values) - 1, int(len(values) * fraction))]
+    return {
+        'count': len(values),
+        'p50_ms': round(statistics.median(values) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+        'p99_ms': round(pick(0.99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3),
+    }
+
+
+def _make_app(database_path):
+    url = f'sqlite:///{database_path}'
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(url),
+        'SQLALCHEMY_BINDS': {},
+        'TENANT_SHARDING': '',
+        'TESTING': True,
+    })
+    return create_app(config)
+
+
+def _set_clock(hour_minute):
+    moment = datetime.combine(date.today(), datetime.min.time()).replace(hour=hour_minute[0], minute=hour_minute[1])
+    AttendanceLogic.get_current_time = staticmethod(lambda: moment)
+
+
+def _query_profile(client, method, path, **kwargs):
+    """Statement count and N+1 groups of one request"""
+    with sql_profiler.profile() as profile:
+        response = client.open(path, method=method, **kwargs)
+    assert response.status_code == 200, f'{path} returned {response.status_code}'
+    summary = profile.summary()
+    return {'queries': summary['queries'], 'n_plus_one': summary['n_plus_one']}
+
+
+def _scan_latencies(client, unique_ids, action, hour_minute):
+    _set_clock(hour_minute)
+    latencies = []
+    for unique_id in unique_ids:
+        start = time.perf_counter()
+        response = client.post('/attendance/process-qr', data={
+            'qr_data': f'TEACHER:{unique_id}', 'action': action
+        })
+        latencies.append(time.perf_counter() - start)
+        if not response.get_json()['success']:
+            raise RuntimeError(f"{action} failed: {response.get_json()['message']}")
+    return _percentiles(latencies)
+
+
+def _summary_cost(app, **filters):
+    """Time one summary call, then repeat it under tracemalloc for peak memory"""
+    with app.test_request_context():
+        from flask import session
+        session['user_id'] = BENCH_USER_ID
+        start = time.perf_counter()
+        summary = AttendanceLogic.get_attendance_summary(**filters)
+        elapsed = time.perf_counter() - start
+
+        # tracemalloc slows allocation-heavy code several times over, so it gets its own run
+        tracemalloc.start()
+        AttendanceLogic.get_attendance_summary(**filters)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        'records': summary['total_records'],
+        'ms': round(elapsed * 1000, 2),
+        'peak_mb': round(peak / 1024 / 1024, 2),
+    }
+
+
+def run_size(teachers, years, scans, seed, max_summary_rows):
+    """Build one roster and measure it; returns a dict of timings"""
+    original_clock = AttendanceLogic.get_current_time
+    with tempfile.TemporaryDirectory() as workdir:
+        app = _make_app(os.path.join(workdir, 'bench.db'))
+        with app.app_context():
+            init_database()
+            start = time.perf_counter()
+            dataset = build_dataset(teachers, years=years, seed=seed, user_id=BENCH_USER_ID)
+            build_seconds = time.perf_counter() - start
+
+        result = {
+            'teachers': teachers,
+            'years': years,
+            'attendance_rows': dataset['attendance'],
+            'build_seconds': round(build_seconds, 2),
+        }
+
+        kiosk = app.test_client()
+        # The last teacher is kept back for the statement count pass
+        probe = dataset['unique_ids'][-1]
+        scanned = dataset['unique_ids'][:min(scans, teachers - 1)]
+        queries = {}
+        try:
+            result['check_in'] = _scan_latencies(kiosk, scanned, 'check_in', CHECK_IN_TIME)
+            result['check_out'] = _scan_latencies(kiosk, scanned, 'check_out', CHECK_OUT_TIME)
+            for action, hour_minute in (('check_in', CHECK_IN_TIME), ('check_out', CHECK_OUT_TIME)):
+                _set_clock(hour_minute)
+                queries[action] = _query_profile(kiosk, 'POST', '/attendance/process-qr',
+                                                 data={'qr_data': f'TEACHER:{probe}', 'action': action})
+        finally:
+            AttendanceLogic.get_current_time = original_clock
+
+        result['summary_today'] = _summary_cost(app, date_filter=date.today().isoformat())
+        if dataset['attendance'] <= max_summary_rows:
+            result['summary_all'] = _summary_cost(app)
+        else:
+            result['summary_all'] = {'skipped': f'more than {max_summary_rows} rows'}
+
+        admin = app.test_client()
+        with admin.session_transaction() as session:
+            session['user_id'] = BENCH_USER_ID
+        admin.get('/admin/')  # compile templates once
+        renders = []
+        for _ in range(DASHBOARD_RENDERS):
+            start = time.perf_counter()
+            response = admin.get('/admin/')
+            renders.append(time.perf_counter() - start)
+            assert response.status_code == 200
+        result['dashboard'] = _percentiles(renders)
+
+        today = date.today().isoformat()
+        queries['dashboard'] = _query_profile(admin, 'GET', '/admin/')
+        queries['reports'] = _query_profile(admin, 'GET', f'/admin/attendance?date={today}')
+        queries['summary_api'] = _query_profile(admin, 'GET', f'/admin/api/attendance/summary?date={today}')
+        with app.app_context():
+            from models import Teacher
+            teacher_id = Teacher.query.filter_by(unique_id=probe).one().id
+        queries['teacher_detail'] = _query_profile(admin, 'GET', f'/admin/teachers/{teacher_id}')
+        result['queries'] = queries
+
+        with app.app_context():
+            from models import db
+            db.engine.dispose()
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes=(100, 1000, 10000), years=2, scans=300, seed=0, max_summary_rows=200_000):
+    """Benchmark every roster size; returns metadata plus one result per size"""
+    return {
+        'commit': _commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [run_size(size, years, min(scans, size), seed, max_summary_rows) for size in sizes],
+    }
+
+
+def query_budget_violations(report):
+    """Requests over their statement budget or with N+1 groups, as readable lines"""
+    violations = []
+    for r in report['results']:
+        for name, profile in r['queries'].items():
+            if profile['queries'] > QUERY_BUDGETS[name]:
+                violations.append(f"{r['teachers']} teachers, {name}: {profile['queries']} statements "
+                                  f"(budget {QUERY_BUDGETS[name]})")
+            for group in profile['n_plus_one']:
+                violations.append(f"{r['teachers']} teachers, {name}: N+1, {group['count']}x "
+                                  f"{group['statement'][:80]} at {', '.join(group['call_sites'])}")
+    return violations
+
+
+def _print_results(report, baseline=None):
+    previous = {r['teachers']: r for r in baseline['results']} if baseline else {}
+    print(f"{'teachers':>9}{'rows':>10}{'in p50':>9}{'in p95':>9}{'out p95':>9}"
+          f"{'sum today':>11}{'sum all':>10}{'sum MB':>8}{'dash p50':>10}")
+    for r in report['results']:
+        summary_all = r['summary_all']
+        print(f"{r['teachers']:>9}{r['attendance_rows']:>10}{r['check_in']['p50_ms']:>9}"
+              f"{r['check_in']['p95_ms']:>9}{r['check_out']['p95_ms']:>9}{r['summary_today']['ms']:>11}"
+              f"{summary_all.get('ms', '-'):>10}{summary_all.get('peak_mb', '-'):>8}{r['dashboard']['p50_ms']:>10}")
+        print('          statements: ' + ', '.join(f"{name} {profile['queries']}"
+                                                 for name, profile in r['queries'].items()))
+        old = previous.get(r['teachers'])
+        if old:
+            deltas = {
+                'check-in p95': (old['check_in']['p95_ms'], r['check_in']['p95_ms']),
+                'summary today': (old['summary_today']['ms'], r['summary_today']['ms']),
+                'dashboard p50': (old['dashboard']['p50_ms'], r['dashboard']['p50_ms']),
+            }
+            print('          vs ' + baseline['commit'] + ': ' + ', '.join(
+                f'{name} {new / before:.2f}x' for name, (before, new) in deltas.items() if before
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help='Comma-separated roster sizes (up to 50000)')
+    parser.add_argument('--years', type=int, default=2, help='Years of attendance history')
+    parser.add_argument('--scans', type=int, default=300, help='Check-ins and check-outs timed per size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-summary-rows', type=int, default=200_000,
+                        help='Skip the unfiltered summary above this many rows')
+    parser.add_argument('--json', dest='json_path', help='Output file (default benchmarks/results/bench_checkin-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--no-query-budget', action='store_true', help='Report statement counts without failing')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    report = run(sizes, args.years, args.scans, args.seed, args.max_summary_rows)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print_results(report, baseline)
+
+    json_path = args.json_path or os.path.join(RESULTS_DIR, f"bench_checkin-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+    with open(json_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'results written to {json_path}')
+
+    violations = query_budget_violations(report)
+    for violation in violations:
+        print(f'query budget exceeded: {violation}')
+    if violations and not args.no_query_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
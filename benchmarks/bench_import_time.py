@@ -0,0 +1,97 @@
+"""
+Measure application cold start: importing app.py and building the app
+
+Every sample runs in a fresh interpreter, the way a gunicorn worker or a cron
+`flask` command starts. Exits non-zero when the median exceeds the budget or
+a module that should load on first use is imported at start-up.
+
+Usage:
+    python -m benchmarks.bench_import_time [--samples 10] [--budget-ms 650] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median cold start allowed, in milliseconds; measured medians 480-605 ms, mostly Flask and SQLAlchemy
+DEFAULT_BUDGET_MS = 650
+
+# Heavy modules the services import on first use, never at start-up
+DEFERRED_MODULES = (
+    'qrcode',
+    'PIL',
+    'requests',
+    'smtplib',
+    'email.mime',
+    'openpyxl',
+    'prometheus_client',
+    'orjson',
+    'brotli',
+    'sqlalchemy.dialects.postgresql',
+    'sqlalchemy.dialects.mysql',
+)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({'ms': elapsed * 1000, 'modules': sorted(m for m in %r if m in sys.modules)}))
+""" % (DEFERRED_MODULES,)
+
+
+def _sample(workdir):
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR, DATABASE_URL='sqlite://')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=workdir, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(samples=10):
+    """Time `samples` cold imports and report which deferred modules were loaded"""
+    with tempfile.TemporaryDirectory() as workdir:
+        # First run warms the filesystem and bytecode caches; don't count it
+        _sample(workdir)
+        results = [_sample(workdir) for _ in range(samples)]
+
+    timings = sorted(result['ms'] for result in results)
+    return {
+        'samples': samples,
+        'median_ms': round(statistics.median(timings), 1),
+        'min_ms': round(timings[0], 1),
+        'max_ms': round(timings[-1], 1),
+        'eager_modules': sorted({module for result in results for module in result['modules']}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--json', dest='json_path', help='Write results to this file')
+    args = parser.parse_args()
+
+    results = run(args.samples)
+    results['budget_ms'] = args.budget_ms
+    print(f"cold start: median {results['median_ms']} ms "
+          f"(min {results['min_ms']}, max {results['max_ms']}, budget {args.budget_ms})")
+    if results['eager_modules']:
+        print(f"loaded at start-up but should be deferred: {', '.join(results['eager_modules'])}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if results['median_ms'] > args.budget_ms or results['eager_modules']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare QR code output sizes and render times across formats
+
+Usage:
+    python -m benchmarks.bench_qr_formats [--samples 200] [--json results.json]
+"""
+import argparse
+import gzip
+import json
+import time
+import uuid
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+
+from utils.qrcode_utils import QRCodeGenerator
+
+
+def _legacy_qrcode(teacher_unique_id, image_factory=None):
+    """Build the image the original generator produced (box_size=10, border=4)"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(f"TEACHER:{teacher_unique_id}")
+    qr.make(fit=True)
+    if image_factory:
+        return qr.make_image(image_factory=image_factory)
+    return qr.make_image(fill_color="black", back_color="white")
+
+
+def _legacy_png(teacher_unique_id, rgb=False):
+    image = _legacy_qrcode(teacher_unique_id)
+    if rgb:
+        image = image.get_image().convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _legacy_svg(teacher_unique_id):
+    buffer = BytesIO()
+    _legacy_qrcode(teacher_unique_id, qrcode.image.svg.SvgPathImage).save(buffer)
+    return buffer.getvalue()
+
+
+def run(samples=200):
+    """Render every variant for `samples` random IDs and return size/time stats"""
+    generator = QRCodeGenerator.__new__(QRCodeGenerator)  # no QR folder needed
+    ids = [str(uuid.uuid4())[:8] for _ in range(samples)]
+
+    variants = {
+        'legacy_png_rgb': lambda uid: _legacy_png(uid, rgb=True),
+        'legacy_png_box10': _legacy_png,
+        'legacy_svg_path': _legacy_svg,
+        'png_1bit_box10': lambda uid: generator._render_uncached(uid, 'png', 10, 4)[0],
+        'png_1bit_email': lambda uid: generator._render_uncached(
+            uid, 'png', QRCodeGenerator.EMAIL_BOX_SIZE, 4)[0],
+        'svg_compact': lambda uid: generator._render_uncached(uid, 'svg', 10, 4)[0],
+    }
+
+    results = {}
+    for name, render in variants.items():
+        start = time.perf_counter()
+        images = [render(uid) for uid in ids]
+        elapsed = time.perf_counter() - start
+        sizes = [len(image) for image in images]
+        gzipped = [len(gzip.compress(image)) for image in images]
+        results[name] = {
+            'mean_bytes': round(sum(sizes) / len(sizes), 1),
+            'max_bytes': max(sizes),
+            'mean_gzip_bytes': round(sum(gzipped) / len(gzipped), 1),
+            'render_ms': round(elapsed * 1000 / len(ids), 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--json', dest='json_path', help='Write results to this file')
+    args = parser.parse_args()
+
+    results = run(args.samples)
+    baseline = results['legacy_png_box10']['mean_bytes']
+    print(f"{'variant':<20}{'mean bytes':>12}{'max bytes':>12}{'gzip bytes':>12}{'vs legacy':>12}{'ms/render':>12}")
+    for name, stats in results.items():
+        ratio = stats['mean_bytes'] / baseline
+        print(f"{name:<20}{stats['mean_bytes']:>12}{stats['max_bytes']:>12}{stats['mean_gzip_bytes']:>12}"
+              f"{ratio:>11.0%}{stats['render_ms']:>12}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Measure scan throughput of the production server under a morning-rush load
+
+Starts gunicorn with gunicorn.conf.py against a fresh SQLite database seeded
+with a roster, then has every kiosk post check-ins as fast as the server
+answers. Around 5% of scans are repeats (a teacher scanning twice) and a
+tenth of requests are kiosk status lookups, as on a real morning.
+
+Usage:
+    python -m benchmarks.bench_server [--teachers 2000] [--kiosks 16] [--workers 2] [--threads 8] [--json results.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED = """
+from app import create_app, init_database
+from models import db, Teacher
+from utils.id_allocator import teacher_id_allocator
+app = create_app()
+with app.app_context():
+    init_database()
+    unique_ids = teacher_id_allocator.allocate({count})
+    db.session.add_all(Teacher(name=f'Teacher {{i}}', unique_id=unique_id, user_id=1)
+                       for i, unique_id in enumerate(unique_ids))
+    db.session.commit()
+print('\\n'.join(unique_ids))
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(port, server, deadline=30):
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn exited during start-up')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/attendance/')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start in time')
+
+
+def _kiosk(port, unique_ids, latencies, errors, rng):
+    """One kiosk: a keep-alive connection posting scans back to back"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    queue = list(unique_ids)
+    # A few teachers scan twice
+    queue += rng.sample(queue, max(1, len(queue) // 20))
+    for unique_id in queue:
+        if rng.random() < 0.1:
+            method, path, body = 'GET', f'/attendance/api/attendance/today/{unique_id}', None
+            headers = {}
+        else:
+            method, path = 'POST', '/attendance/process-qr'
+            body = urlencode({'qr_data': f'TEACHER:{unique_id}', 'action': 'check_in'})
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(teachers=2000, kiosks=16, workers=2, threads=8):
+    """Seed a database, start gunicorn and drive the rush; returns throughput and latency stats"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ,
+                   PYTHONPATH=PROJECT_DIR,
+                   DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        env.pop('SMTP_USER', None)
+        unique_ids = subprocess.run(
+            [sys.executable, '-c', SEED.format(count=teachers)], cwd=workdir, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+
+        port = _free_port()
+        env.update(GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS=str(workers),
+                   GUNICORN_THREADS=str(threads), GUNICORN_ACCESS_LOG='', GUNICORN_LOG_LEVEL='warning')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(PROJECT_DIR, 'gunicorn.conf.py'), 'app:app'],
+            cwd=PROJECT_DIR, env=env
+        )
+        try:
+            _wait_until_up(port, server)
+            latencies, errors = [], []
+            kiosk_threads = [
+                threading.Thread(target=_kiosk, args=(
+                    port, unique_ids[i::kiosks], latencies, errors, random.Random(i)
+                ))
+                for i in range(kiosks)
+            ]
+            start = time.perf_counter()
+            for thread in kiosk_threads:
+                thread.start()
+            for thread in kiosk_threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    latencies.sort()
+    cores = min(workers, os.cpu_count() or 1)
+    requests_per_second = len(latencies) / elapsed
+    return {
+        'teachers': teachers,
+        'kiosks': kiosks,
+        'workers': workers,
+        'threads': threads,
+        'cores': cores,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 2),
+        'requests_per_second': round(requests_per_second, 1),
+        'requests_per_second_per_core': round(requests_per_second / cores, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--teachers', type=int, default=2000)
+    parser.add_argument('--kiosks', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--json', dest='json_path', help='Write results to this file')
+    args = parser.parse_args()
+
+    results = run(args.teachers, args.kiosks, args.workers, args.threads)
+    print(f"{results['requests']} requests from {results['kiosks']} kiosks in {results['seconds']} s "
+          f"({results['errors']} errors)")
+    print(f"{results['requests_per_second']} req/s, {results['requests_per_second_per_core']} req/s per core "
+          f"({results['workers']} workers x {results['threads']} threads on {results['cores']} cores)")
+    print(f"latency p50 {results['p50_ms']} ms, p95 {results['p95_ms']} ms, p99 {results['p99_ms']} ms")
+    if (os.cpu_count() or 1) <= results['workers']:
+        print('note: the load generator shares the CPUs with the server, so these numbers are a lower bound')
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
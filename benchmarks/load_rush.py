@@ -0,0 +1,343 @@
+"""
+Replay a morning rush from many kiosks against a running instance
+
+Arrival times follow the real morning: most teachers land in the 6:00-7:00
+on-time window, around a peak with a normal spread. The simulated window is
+compressed into --duration seconds of wall time. Each arrival goes to a random
+kiosk, which looks the teacher up on /attendance/api/teacher/<id> and then posts
+the scan to /attendance/process-qr. Admins refresh the dashboard meanwhile.
+
+Every request carries X-Simulated-Time, so the rush can run at any hour
+against a server started with SIMULATED_CLOCK=true. Without it the server uses
+its own clock and statuses reflect the real time of day.
+
+The roster is read from /admin/api/teachers with the admin login, or from
+--ids-file (one unique ID per line).
+
+Usage:
+    SIMULATED_CLOCK=true gunicorn app:app
+    python -m benchmarks.load_rush --url http://127.0.0.1:5000 --username admin --password admin123
+                                   [--kiosks 20] [--duration 60] [--peak 06:35] [--spread 20]
+                                   [--window 05:45-07:30] [--date 2026-03-02] [--dashboards 2] [--json out.json]
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+SIMULATED_TIME_HEADER = 'X-Simulated-Time'
+ROSTER_PAGE_SIZE = 100
+
+
+class Client:
+    """One keep-alive HTTP connection with a session cookie; reconnects after errors"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.cookie = None
+        self.connection = None
+
+    def request(self, method, path, form=None, headers=None):
+        """Send one request; returns (status, body bytes)"""
+        headers = dict(headers or {})
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if self.connection is None:
+            self.connection = self.connection_class(self.host, timeout=self.timeout)
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, payload
+
+    def login(self, username, password):
+        status, _ = self.request('POST', '/auth/login', form={'username': username, 'password': password})
+        # A successful login redirects to the dashboard; a failed one re-renders the form
+        if status != 302:
+            raise RuntimeError(f'login as {username!r} failed')
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def fetch_roster(base_url, username, password):
+    """Unique IDs of every teacher the admin owns"""
+    client = Client(base_url)
+    client.login(username, password)
+    unique_ids, page, pages = [], 1, 1
+    while page <= pages:
+        status, body = client.request(
+            'GET', f'/admin/api/teachers?fields=unique_id&per_page={ROSTER_PAGE_SIZE}&page={page}'
+        )
+        if status != 200:
+            raise RuntimeError(f'roster request failed with HTTP {status}')
+        directory = json.loads(body)
+        unique_ids += [item['unique_id'] for item in directory['items']]
+        pages = directory['pages']
+        page += 1
+    client.close()
+    return unique_ids
+
+
+def plan_arrivals(unique_ids, window, peak, spread_minutes, repeat_rate, rng):
+    """
+    Simulated scan times for the roster, sorted
+
+    Args:
+        unique_ids (list): Roster
+        window (tuple): (start, end) datetimes; arrivals are clipped to it
+        peak (datetime): Mean arrival time
+        spread_minutes (float): Standard deviation of arrivals
+        repeat_rate (float): Share of teachers who scan a second time a little later
+        rng (random.Random): Source of randomness
+
+    Returns:
+        list: (simulated datetime, unique_id) pairs
+    """
+    start, end = window
+    arrivals = []
+    for unique_id in unique_ids:
+        moment = peak + timedelta(minutes=rng.gauss(0, spread_minutes))
+        moment = min(max(moment, start), end)
+        arrivals.append((moment, unique_id))
+        if rng.random() < repeat_rate:
+            arrivals.append((min(moment + timedelta(seconds=rng.uniform(5, 90)), end), unique_id))
+    arrivals.sort()
+    return arrivals
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint, shared by every thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.rejected = 0
+        self.schedule_lag = []
+        self.clock_ignored = False
+
+    def add(self, endpoint, seconds, error=None):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if error is not None:
+                self.errors.setdefault(endpoint, {}).setdefault(str(error), 0)
+                self.errors[endpoint][str(error)] += 1
+
+
+def _timed(recorder, endpoint, client, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+        status, body = client.request(method, path, **kwargs)
+    except (OSError, http.client.HTTPException) as e:
+        recorder.add(endpoint, time.perf_counter() - start, type(e).__name__)
+        return None
+    recorder.add(endpoint, time.perf_counter() - start, None if status == 200 else f'HTTP {status}')
+    return body if status == 200 else None
+
+
+def _kiosk(base_url, arrivals, to_wall, lookup_rate, recorder, rng, day):
+    """One kiosk: waits for each arrival, looks the teacher up, then posts the scan"""
+    client = Client(base_url)
+    for moment, unique_id in arrivals:
+        delay = to_wall(moment) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # The generator is behind schedule; report it so results aren't mistaken for server time
+            with recorder.lock:
+                recorder.schedule_lag.append(-delay)
+        headers = {SIMULATED_TIME_HEADER: moment.isoformat(timespec='seconds')}
+        if rng.random() < lookup_rate:
+            _timed(recorder, 'api/teacher', client, 'GET', f'/attendance/api/teacher/{unique_id}', headers=headers)
+        body = _timed(recorder, 'process-qr', client, 'POST', '/attendance/process-qr', headers=headers,
+                      form={'qr_data': f'TEACHER:{unique_id}', 'action': 'check_in'})
+        if body is not None:
+            result = json.loads(body)
+            data = result.get('data') or {}
+            with recorder.lock:
+                if not result.get('success'):
+                    # Repeat scans and unknown IDs: the server answered correctly, the scan was refused
+                    recorder.rejected += 1
+                if data.get('date') and data['date'] != day.isoformat():
+                    recorder.clock_ignored = True
+    client.close()
+
+
+def _dashboard(base_url, username, password, interval, stop, to_simulated, recorder):
+    """One admin refreshing the dashboard until the rush is over"""
+    client = Client(base_url)
+    client.login(username, password)
+    while not stop.wait(interval):
+        headers = {SIMULATED_TIME_HEADER: to_simulated(time.perf_counter()).isoformat(timespec='seconds')}
+        _timed(recorder, 'dashboard', client, 'GET', '/admin/', headers=headers)
+    client.close()
+
+
+def _percentiles(values):
+    values = sorted(values)
+    pick = lambda fraction: values[min(len(values) - 1, int(len(values) * fraction))]
+    return {
+        'p50_ms': round(statistics.median(values) * 1000, 1),
+        'p95_ms': round(pick(0.95) * 1000, 1),
+        'p99_ms': round(pick(0.99) * 1000, 1),
+    }
+
+
+def run(base_url, unique_ids, kiosks=20, duration=60, day=None, window=('05:45', '07:30'), peak='06:35',
+        spread_minutes=20, lookup_rate=0.5, repeat_rate=0.05, dashboards=2, dashboard_interval=5,
+        username=None, password=None, seed=0):
+    """Drive one rush against base_url; returns throughput, error and latency stats"""
+    rng = random.Random(seed)
+    day = day or date.today()
+    at = lambda hh_mm: datetime.combine(day, datetime.strptime(hh_mm, '%H:%M').time())
+    window_start, window_end = at(window[0]), at(window[1])
+    arrivals = plan_arrivals(unique_ids, (window_start, window_end), at(peak),
+                             spread_minutes, repeat_rate, rng)
+
+    # Map the simulated window linearly onto the wall-clock run
+    scale = duration / max(1.0, (window_end - window_start).total_seconds())
+    started = time.perf_counter() + 0.5
+    to_wall = lambda moment: started + (moment - window_start).total_seconds() * scale
+    to_simulated = lambda wall: window_start + timedelta(seconds=max(0.0, wall - started) / scale)
+
+    per_kiosk = [[] for _ in range(kiosks)]
+    for arrival in arrivals:
+        per_kiosk[rng.randrange(kiosks)].append(arrival)
+
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_kiosk, args=(base_url, queue, to_wall, lookup_rate, recorder,
+                                              random.Random(seed * 1000 + i), day))
+        for i, queue in enumerate(per_kiosk)
+    ]
+    admin_threads = [
+        threading.Thread(target=_dashboard, args=(base_url, username, password, dashboard_interval,
+                                                  stop, to_simulated, recorder))
+        for _ in range(dashboards if username else 0)
+    ]
+    for thread in admin_threads + threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in admin_threads:
+        thread.join()
+
+    endpoints = {}
+    total = errors = 0
+    for endpoint, samples in sorted(recorder.samples.items()):
+        failed = sum(recorder.errors.get(endpoint, {}).values())
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': failed,
+            'error_rate': round(failed / len(samples), 4),
+            'error_kinds': recorder.errors.get(endpoint, {}),
+            **_percentiles(samples),
+        }
+        total += len(samples)
+        errors += failed
+    all_samples = [s for samples in recorder.samples.values() for s in samples]
+    return {
+        'url': base_url,
+        'date': day.isoformat(),
+        'window': list(window),
+        'peak': peak,
+        'teachers': len(unique_ids),
+        'scans': len(arrivals),
+        'kiosks': kiosks,
+        'seconds': round(elapsed, 2),
+        'requests': total,
+        'requests_per_second': round(total / elapsed, 1),
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'rejected_scans': recorder.rejected,
+        'late_arrivals': len(recorder.schedule_lag),
+        'max_schedule_lag_ms': round(max(recorder.schedule_lag, default=0) * 1000, 1),
+        'clock_ignored': recorder.clock_ignored,
+        **(_percentiles(all_samples) if all_samples else {}),
+        'endpoints': endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--username', help='Admin login, for the roster and dashboard polling')
+    parser.add_argument('--password')
+    parser.add_argument('--ids-file', help='Read the roster from this file instead of the admin API')
+    parser.add_argument('--limit', type=int, help='Use at most this many teachers')
+    parser.add_argument('--kiosks', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60, help='Wall-clock seconds the window is replayed in')
+    parser.add_argument('--date', type=date.fromisoformat, help='Simulated date (default today)')
+    parser.add_argument('--window', default='05:45-07:30', help='Simulated HH:MM-HH:MM arrival window')
+    parser.add_argument('--peak', default='06:35', help='Mean arrival time')
+    parser.add_argument('--spread', type=float, default=20, help='Arrival standard deviation in minutes')
+    parser.add_argument('--lookup-rate', type=float, default=0.5, help='Share of scans preceded by a teacher lookup')
+    parser.add_argument('--repeat-rate', type=float, default=0.05, help='Share of teachers who scan twice')
+    parser.add_argument('--dashboards', type=int, default=2, help='Admins refreshing the dashboard')
+    parser.add_argument('--dashboard-interval', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_path', help='Write results to this file')
+    args = parser.parse_args()
+
+    if args.ids_file:
+        with open(args.ids_file) as f:
+            unique_ids = [line.strip() for line in f if line.strip()]
+    elif args.username:
+        unique_ids = fetch_roster(args.url, args.username, args.password or '')
+    else:
+        parser.error('pass --username/--password or --ids-file')
+    unique_ids = unique_ids[:args.limit] if args.limit else unique_ids
+    if not unique_ids:
+        parser.error('the roster is empty')
+
+    results = run(args.url, unique_ids, kiosks=args.kiosks, duration=args.duration, day=args.date,
+                  window=tuple(args.window.split('-')), peak=args.peak, spread_minutes=args.spread,
+                  lookup_rate=args.lookup_rate, repeat_rate=args.repeat_rate, dashboards=args.dashboards,
+                  dashboard_interval=args.dashboard_interval, username=args.username,
+                  password=args.password or '', seed=args.seed)
+
+    print(f"{results['requests']} requests ({results['scans']} scans by {results['teachers']} teachers "
+          f"on {results['kiosks']} kiosks) in {results['seconds']} s: {results['requests_per_second']} req/s")
+    print(f"errors {results['errors']} ({results['error_rate']:.2%}), refused scans {results['rejected_scans']}")
+    print(f"{'endpoint':<14}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, stats in results['endpoints'].items():
+        print(f"{endpoint:<14}{stats['requests']:>9}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+    if results['late_arrivals']:
+        print(f"note: {results['late_arrivals']} scans left late (up to {results['max_schedule_lag_ms']} ms); "
+              'add kiosks or lengthen --duration if that is most of them')
+    if results['clock_ignored']:
+        print('note: the server ignored X-Simulated-Time; start it with SIMULATED_CLOCK=true')
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import os
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def database_url():
+    """Database URI from DATABASE_URL, defaulting to the local SQLite file"""
+    url = os.environ.get('DATABASE_URL', 'sqlite:///attendance.db')
+    # Heroku/Railway still hand out the postgres:// scheme SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """
+    SQLAlchemy engine options for the configured database
+
+    Pool sizing only applies to server databases; SQLite connections are
+    cheap and its pool is tuned separately.
+    """
+    options = {
+        # Test connections on checkout so a restarted server doesn't fail the next request
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        # Recycle before typical server/proxy idle timeouts close the socket
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    if not url.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        })
+    return options
+
+def replica_binds():
+    """SQLALCHEMY_BINDS entry for the read replica, if DATABASE_REPLICA_URL is set"""
+    url = os.environ.get('DATABASE_REPLICA_URL')
+    if not url:
+        return {}
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    # Binds don't inherit SQLALCHEMY_ENGINE_OPTIONS, so size the replica pool here
+    return {'replica': {'url': url, **engine_options(url)}}
+
+class Config:
+    """Application configuration, read from the environment"""
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = replica_binds()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Report views fall back to the primary when the replica is further behind than this
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 30))
+    # How long each worker trusts a replica lag measurement
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 10))
+    # Default admin credentials (for demo; change in production)
+    ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+    ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
+    # Per-tenant shards: '' (off), 'sqlite' (a file per admin) or 'schema' (a PostgreSQL schema per admin)
+    TENANT_SHARDING = os.environ.get('TENANT_SHARDING', '').strip().lower()
+    # Shard files live here, relative to the instance folder
+    TENANT_SQLITE_DIR = os.environ.get('TENANT_SQLITE_DIR', 'tenants')
+    TENANT_SCHEMA_PREFIX = os.environ.get('TENANT_SCHEMA_PREFIX', 'tenant_')
+    # Prometheus metrics (needs prometheus_client); /metrics is only served once METRICS_TOKEN is set
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Per-request statement log with N+1 detection (development only; see utils/sql_profiler.py)
+    SQL_PROFILER = _env_bool('SQL_PROFILER', False)
+    # Identical statements run this often with different parameters are flagged as N+1
+    SQL_PROFILER_N_PLUS_ONE = int(os.environ.get('SQL_PROFILER_N_PLUS_ONE', 5))
+    # Sampling profiler (see utils/sampling_profiler.py); all of these can be changed live at /admin/profiler
+    PROFILER_ENABLED = _env_bool('PROFILER_ENABLED', False)
+    # Endpoints profiled on every request, e.g. admin.dashboard
+    PROFILER_ENDPOINTS = os.environ.get('PROFILER_ENDPOINTS', '')
+    # Share of all other requests profiled
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.0))
+    # Endpoints whose profiles are kept only when slower than PROFILER_SLOW_MS
+    PROFILER_SLOW_ENDPOINTS = os.environ.get('PROFILER_SLOW_ENDPOINTS', 'admin.attendance_reports,admin.dashboard')
+    PROFILER_SLOW_MS = float(os.environ.get('PROFILER_SLOW_MS', 500))
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 200))
+    # Honour the X-Simulated-Time request header (load tests only; see utils/clock.py)
+    SIMULATED_CLOCK = _env_bool('SIMULATED_CLOCK', False)
+    # Teacher IDs each worker reserves per database round trip
+    TEACHER_ID_BLOCK_SIZE = int(os.environ.get('TEACHER_ID_BLOCK_SIZE', 100))
+    # SQLite production profile, applied on every connection (see utils/sqlite_profile.py)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))
+    # Off by default: teachers.user_id references the legacy users table while
+    # accounts are stored in user, so enforcement would reject every new teacher
+    SQLITE_FOREIGN_KEYS = _env_bool('SQLITE_FOREIGN_KEYS', False)
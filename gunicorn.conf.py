@@ -0,0 +1,106 @@
+"""
+Gunicorn configuration for production
+
+    gunicorn app:app              # picked up automatically from the working directory
+    gunicorn -c gunicorn.conf.py app:app
+
+Every knob can be overridden from the environment; see the README.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+# Import the app once in the master; workers fork from it and share its pages copy-on-write.
+# create_app() opens no connections, so nothing database-related is inherited.
+preload_app = _env_bool('GUNICORN_PRELOAD', True)
+
+# A scan is a couple of short queries plus an SMTP round trip, so a worker spends
+# most of its time waiting: one process per core, several threads per process
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', max(2, multiprocessing.cpu_count())))
+# Keep threads <= DB_POOL_SIZE + DB_MAX_OVERFLOW so no thread waits on the pool
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Recycle workers gradually so slow leaks can't grow forever; jitter stops them restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+# Let in-flight scans finish on deploys and recycling
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Kiosks post scans back to back over one connection
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Worker heartbeat files on tmpfs, so a slow disk can't get healthy workers killed
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Workers write Prometheus samples here and /metrics sums them. It must be set
+# before the app is imported, which preload_app does right after this file.
+# Give each gunicorn instance on a host its own directory.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'attendance-metrics'))
+
+# Set GUNICORN_ACCESS_LOG to an empty string to turn request logging off
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Start every server with empty metrics; files left by a previous run would be summed in"""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    """Let /metrics drop live gauges of a worker that has gone"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Send the welcome emails of roster imports still queued in this worker before it goes
+
+    Gunicorn has closed the worker's heartbeat file by now, so the copy kept by
+    post_fork tells the arbiter the worker is still busy rather than hung. A server
+    stop or reload still kills the worker after graceful_timeout.
+    """
+    from utils.teacher_import import import_batches
+    fd = getattr(worker, 'drain_heartbeat_fd', None)
+
+    def heartbeat():
+        if fd is not None:
+            now = time.monotonic()
+            os.utime(fd, (now, now))
+
+    import_batches.drain(heartbeat=heartbeat)
+
+
+def post_fork(server, worker):
+    """Drop any database connections inherited from the master"""
+    # worker_exit runs after gunicorn closes worker.tmp; keep our own handle for its heartbeat
+    worker.drain_heartbeat_fd = os.dup(worker.tmp.fileno())
+    from app import app
+    from models import db
+    from utils.db_routing import tenant_engines
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the sockets belong to the master, only forget them here
+            engine.dispose(close=False)
+    tenant_engines.dispose(close=False)
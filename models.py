@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import uuid
+from utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+# Reads in @read_replica views go to the replica bind when configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,13 +13,13 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
 
 
-
 class Teacher(db.Model):
     """Teacher model for storing teacher information and QR codes"""
     __tablename__ = 'teachers'
     
     id = db.Column(db.Integer, primary_key=True)
-    unique_id = db.Column(db.String(50), unique=True, nullable=False, default=lambda: str(uuid.uuid4())[:8])
+    # Allocated with utils.id_allocator before the insert's transaction begins
+    unique_id = db.Column(db.String(50), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=True)
     department = db.Column(db.String(100), nullable=True)
@@ -30,6 +31,9 @@ class Teacher(db.Model):
     # Relationship with attendance records
     attendance_records = db.relationship('Attendance', backref='teacher', lazy=True)
     
+    # Per-admin listing: filter by owner, sort by name
+    __table_args__ = (db.Index('ix_teachers_user_active_name', 'user_id', 'is_active', 'name'),)
+    
     def __repr__(self):
         return f'<Teacher {self.name} ({self.unique_id}) - {self.department}>'
     
@@ -46,6 +50,96 @@ class Teacher(db.Model):
             'is_active': self.is_active
         }
 
+# Case-insensitive name prefix search runs as a range scan over this index
+db.Index('ix_teachers_user_lower_name', Teacher.user_id, db.func.lower(Teacher.name))
+# Roster imports match existing emails case-insensitively
+db.Index('ix_teachers_lower_email', db.func.lower(Teacher.email))
+# PostgreSQL only serves LIKE 'prefix%' from an index under a non-C collation with text_pattern_ops
+db.Index('ix_teachers_user_lower_name_pattern', Teacher.user_id,
+         db.text('lower(name) text_pattern_ops')).ddl_if(dialect='postgresql')
+
+class TeacherIdBlock(db.Model):
+    """Block of teacher IDs reserved by one application worker: sequence numbers range_start to range_end - 1"""
+    __tablename__ = 'teacher_id_blocks'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Each block starts where the highest one ends, so ranges never overlap whatever the block size
+    range_start = db.Column(db.BigInteger, unique=True, nullable=False)
+    range_end = db.Column(db.BigInteger, nullable=False)
+    reserved_by = db.Column(db.String(120), nullable=True)
+    reserved_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TeacherShard(db.Model):
+    """Directory of which tenant shard holds a teacher, used by kiosk scans when sharding is on"""
+    __tablename__ = 'teacher_shards'
+    
+    unique_id = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+
+class Schedule(db.Model):
+    """A school's attendance windows: weekday NULL is the default, 0-6 (Monday-Sunday) overrides one day"""
+    __tablename__ = 'schedules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=True)
+    on_time_start = db.Column(db.Time, nullable=False)
+    on_time_end = db.Column(db.Time, nullable=False)
+    late_end = db.Column(db.Time, nullable=False)
+    absent_deadline = db.Column(db.Time, nullable=False)
+    checkout_start = db.Column(db.Time, nullable=False)
+    checkout_end = db.Column(db.Time, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'weekday', name='_schedule_user_weekday_uc'),)
+
+class SchoolCalendar(db.Model):
+    """A school's working days for one year: bit n of `days` is set when day n (Jan 1 = 0) is a school day"""
+    __tablename__ = 'school_calendars'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    days = db.Column(db.LargeBinary(46), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'year', name='_calendar_user_year_uc'),)
+
+class RosterVersion(db.Model):
+    """A school's latest roster version; bumped under a row lock, so versions follow commit order"""
+    __tablename__ = 'roster_versions'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class RosterChange(db.Model):
+    """A teacher added or deleted; kiosks sync their local roster from this log"""
+    __tablename__ = 'roster_changes'
+    __table_args__ = (db.Index('ix_roster_changes_user_version', 'user_id', 'version'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    # The school's RosterVersion when this change was written
+    version = db.Column(db.Integer, nullable=False)
+    unique_id = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(100), nullable=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ApiToken(db.Model):
+    """Bearer token for /api/v1 integrations; only the SHA-256 of the token is stored"""
+    __tablename__ = 'api_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(80), nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'name', name='_api_token_user_name_uc'),)
+
 class Attendance(db.Model):
     """Attendance model for storing check-in/check-out records"""
     __tablename__ = 'attendance'
@@ -77,4 +171,4 @@ class Attendance(db.Model):
             'check_out_time': self.check_out_time.isoformat() if self.check_out_time else None,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        } 
\ No newline at end of file
+        }
@@ -1,11 +1,21 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session, abort, send_from_directory
 from models import db, Teacher, Attendance
 from utils.qrcode_utils import qr_generator
 from utils.attendance_logic import AttendanceLogic
 from utils.sms_utils import sms_service
 from utils.email_notifications import email_service
-from datetime import datetime, date
-import uuid
+from utils.id_allocator import teacher_id_allocator
+from utils.kiosk_roster import record_changes, record_deleted
+from utils.db_routing import read_replica
+from utils.teacher_history import TeacherHistory, month_bounds
+from utils.teacher_directory import search_teachers, serialize_rows, FIELDS as TEACHER_FIELDS
+from utils.tenant_shards import tenant_directory
+from utils.sampling_profiler import sampling_profiler, PROFILE_SUFFIX
+from utils.schedules import schedule_store, DaySchedule, ScheduleError, WEEKDAYS
+from utils.school_calendar import calendar_store, attendance_rates, parse_days, format_days, weekday_mask, CalendarError
+from utils.teacher_import import parse_roster, import_teachers as import_roster, start_import_batch, RosterError
+from datetime import datetime, date, timedelta
+from sqlalchemy.orm import contains_eager
 import os
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -13,25 +23,31 @@ bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 
 @bp.route('/')
+@read_replica
 def dashboard():
     """Admin dashboard with attendance summary"""
     # If not logged in, redirect to login or register
     if not session.get('user_id'):
         return redirect(url_for('auth.login'))
-    today = date.today()
+    today = AttendanceLogic.get_current_time().date()
     # Get today's attendance summary
     summary = AttendanceLogic.get_attendance_summary(date_filter=today.strftime('%Y-%m-%d'))
     # Get recent attendance records for teachers added by this user
-    recent_records = Attendance.query.join(Teacher).filter(Teacher.user_id == session.get('user_id')).order_by(
+    recent_records = Attendance.query.join(Teacher).options(contains_eager(Attendance.teacher)).filter(
+        Teacher.user_id == session.get('user_id')
+    ).order_by(
         Attendance.date.desc(),
         Attendance.check_in_time.desc()
     ).limit(10).all()
+    # Whole active roster; summary only counts teachers with a record today
+    teacher_count = Teacher.query.filter_by(user_id=session.get('user_id'), is_active=True).count()
     from models import User
     user = User.query.get(session.get('user_id'))
     username = user.username if user else None
     first_name = user.first_name if user else None
     return render_template('admin/dashboard.html', 
                          summary=summary, 
+                         teacher_count=teacher_count,
                          recent_records=recent_records,
                          username=username,
                          first_name=first_name)
@@ -40,12 +56,42 @@ def dashboard():
 def teachers_list():
     """List all teachers"""
     user_id = session.get('user_id')
-    teachers = Teacher.query.filter_by(is_active=True, user_id=user_id).order_by(Teacher.name).all()
+    directory = search_teachers(
+        user_id,
+        search=request.args.get('q'),
+        sort=request.args.get('sort', 'name'),
+        direction=request.args.get('dir', 'asc'),
+        page=request.args.get('page', 1, type=int)
+    )
     from models import User
     user = User.query.get(user_id)
     username = user.username if user else None
     first_name = user.first_name if user else None
-    return render_template('admin/teachers_list.html', teachers=teachers, username=username, first_name=first_name)
+    return render_template('admin/teachers_list.html',
+                         teachers=directory['items'],
+                         directory=directory,
+                         username=username,
+                         first_name=first_name)
+
+@bp.route('/api/teachers')
+def api_teachers():
+    """Paginated teacher search for the list page and report filters"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'message': 'Login required'}), 401
+    
+    fields = request.args.get('fields')
+    directory = search_teachers(
+        user_id,
+        search=request.args.get('q'),
+        sort=request.args.get('sort', 'name'),
+        direction=request.args.get('dir', 'asc'),
+        page=request.args.get('page', 1, type=int),
+        per_page=request.args.get('per_page', type=int),
+        fields=fields.split(',') if fields else TEACHER_FIELDS.keys()
+    )
+    directory['items'] = serialize_rows(directory['items'])
+    return jsonify(directory)
 
 @bp.route('/teachers/add', methods=['GET', 'POST'])
 def add_teacher():
@@ -61,6 +107,10 @@ def add_teacher():
                 flash('Teacher name is required', 'error')
                 return render_template('admin/add_teacher.html')
             
+            # Before the session's first query: on SQLite, reserving an ID block
+            # while this session holds a lock would wait on itself
+            unique_id = teacher_id_allocator.next_id()
+            
             # Check if teacher with same name already exists
             existing_teacher = Teacher.query.filter_by(name=name).first()
             if existing_teacher:
@@ -73,23 +123,21 @@ def add_teacher():
                 email=email if email else None,
                 department=department if department else None,
                 phone_number=phone_number if phone_number else None,
-                unique_id=str(uuid.uuid4())[:8],
+                unique_id=unique_id,
                 user_id=session.get('user_id')
             )
             
             db.session.add(teacher)
+            tenant_directory.register(teacher.user_id, [teacher.unique_id])
+            record_changes(teacher.user_id, [{'unique_id': teacher.unique_id, 'name': teacher.name}])
             db.session.commit()
             
-            # Generate QR code
-            qr_filename, qr_data_url = qr_generator.generate_qr_code(
-                teacher.unique_id,
-                teacher.name
-            )
+            # Generate QR code file for the email attachment; pages load it from /qr
+            qr_path = qr_generator.save_qr_code(teacher.unique_id)
 
             # Send welcome email with QR code if email is provided
             email_result = None
             if teacher.email:
-                qr_path = qr_generator.get_qr_code_path(teacher.unique_id)
                 email_result = email_service.send_qr_code_email(
                     to_email=teacher.email,
                     teacher_name=teacher.name,
@@ -102,7 +150,6 @@ def add_teacher():
             flash(success_message, 'success')
             return render_template('admin/teacher_created.html', 
                                  teacher=teacher, 
-                                 qr_data_url=qr_data_url,
                                  email_result=email_result)
                                  
         except Exception as e:
@@ -112,19 +159,110 @@ def add_teacher():
     
     return render_template('admin/add_teacher.html')
 
+@bp.route('/teachers/import', methods=['GET', 'POST'])
+def import_teachers():
+    """Bulk import teachers from a CSV or XLSX roster"""
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login'))
+    
+    if request.method == 'POST':
+        roster = request.files.get('roster')
+        if not roster or not roster.filename:
+            flash('Please choose a roster file to upload', 'error')
+            return render_template('admin/import_teachers.html')
+        
+        try:
+            rows = parse_roster(roster.filename, roster.stream)
+        except RosterError as e:
+            flash(str(e), 'error')
+            return render_template('admin/import_teachers.html')
+        
+        results, created = import_roster(rows, session.get('user_id'))
+        
+        # QR files and welcome emails are produced in the background
+        start_import_batch(created)
+        
+        flash(f'Imported {len(created)} of {len(results)} teachers', 'success' if created else 'warning')
+        return render_template('admin/import_teachers.html', results=results)
+    
+    return render_template('admin/import_teachers.html')
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None when absent or invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+def _parse_month(value):
+    """Parse a YYYY-MM query parameter, defaulting to the current month"""
+    try:
+        parsed = datetime.strptime(value, '%Y-%m')
+        return parsed.year, parsed.month
+    except (TypeError, ValueError):
+        today = date.today()
+        return today.year, today.month
+
 @bp.route('/teachers/<int:teacher_id>')
+@read_replica
 def teacher_detail(teacher_id):
-    """View teacher details and attendance history"""
+    """View teacher details, monthly calendar and attendance history"""
     teacher = Teacher.query.get_or_404(teacher_id)
     
-    # Get teacher's attendance records
-    attendance_records = Attendance.query.filter_by(teacher_id=teacher_id).order_by(
-        Attendance.date.desc()
-    ).limit(30).all()
+    # Month calendar with its statistics
+    year, month = _parse_month(request.args.get('month'))
+    start, end = month_bounds(year, month)
+    month_calendar = TeacherHistory.get_calendar(teacher_id, start, end)
+    previous_month = (start - timedelta(days=1)).strftime('%Y-%m')
+    next_month = (end + timedelta(days=1)).strftime('%Y-%m')
+    
+    # Get teacher's attendance records, one page at a time going back by date
+    before = _parse_date(request.args.get('before'))
+    history = TeacherHistory.get_history_page(teacher_id, before=before)
     
     return render_template('admin/teacher_detail.html', 
                          teacher=teacher, 
-                         attendance_records=attendance_records)
+                         attendance_records=history['records'],
+                         next_before=history['next_before'],
+                         before=before,
+                         calendar=month_calendar,
+                         month_start=start,
+                         previous_month=previous_month,
+                         next_month=next_month,
+                         streak=TeacherHistory.get_on_time_streak(teacher_id))
+
+@bp.route('/api/teachers/<int:teacher_id>/calendar')
+@read_replica
+def api_teacher_calendar(teacher_id):
+    """Day-by-day calendar and statistics for a month (?month=YYYY-MM) or term (?start=&end=)"""
+    teacher = Teacher.query.filter_by(id=teacher_id, user_id=session.get('user_id')).first_or_404()
+    
+    start = _parse_date(request.args.get('start'))
+    end = _parse_date(request.args.get('end'))
+    if not (start and end):
+        start, end = month_bounds(*_parse_month(request.args.get('month')))
+    if end < start or (end - start).days > 366:
+        return jsonify({'success': False, 'message': 'Date range must span 1 to 366 days'}), 400
+    
+    result = TeacherHistory.get_calendar(teacher.id, start, end)
+    result['on_time_streak'] = TeacherHistory.get_on_time_streak(teacher.id)
+    return jsonify(result)
+
+@bp.route('/api/teachers/<int:teacher_id>/history')
+@read_replica
+def api_teacher_history(teacher_id):
+    """Keyset-paginated attendance history (?before=YYYY-MM-DD&limit=N)"""
+    teacher = Teacher.query.filter_by(id=teacher_id, user_id=session.get('user_id')).first_or_404()
+    
+    history = TeacherHistory.get_history_page(
+        teacher.id,
+        before=_parse_date(request.args.get('before')),
+        limit=request.args.get('limit', type=int)
+    )
+    return jsonify({
+        'records': [record.to_dict() for record in history['records']],
+        'next_before': history['next_before']
+    })
 
 @bp.route('/teachers/delete/<int:teacher_id>', methods=['POST'])
 def delete_teacher(teacher_id):
@@ -133,6 +271,8 @@ def delete_teacher(teacher_id):
         # Delete all attendance records for this teacher
         Attendance.query.filter_by(teacher_id=teacher.id).delete()
         db.session.delete(teacher)
+        tenant_directory.unregister(teacher.unique_id)
+        record_deleted(teacher.user_id, [teacher.unique_id])
         db.session.commit()
         flash(f'Teacher {teacher.name} has been deleted.', 'success')
     except Exception as e:
@@ -141,6 +281,7 @@ def delete_teacher(teacher_id):
     return redirect(url_for('admin.teachers_list'))
 
 @bp.route('/attendance')
+@read_replica
 def attendance_reports():
     """Attendance reports with filters"""
     # Get filter parameters
@@ -155,8 +296,8 @@ def attendance_reports():
         status_filter=status_filter
     )
     
-    # Get all teachers for filter dropdown
-    teachers = Teacher.query.filter_by(is_active=True).order_by(Teacher.name).all()
+    # First page of this admin's teachers for the filter; the rest load via /admin/api/teachers
+    teachers = search_teachers(session.get('user_id'), per_page=20, fields=('unique_id', 'name'))['items']
     
     return render_template('admin/attendance_reports.html',
                          summary=summary,
@@ -168,6 +309,7 @@ def attendance_reports():
                          })
 
 @bp.route('/api/attendance/summary')
+@read_replica
 def api_attendance_summary():
     """API endpoint for attendance summary"""
     date_filter = request.args.get('date')
@@ -182,6 +324,19 @@ def api_attendance_summary():
     
     return jsonify(summary)
 
+@bp.route('/api/attendance/rates')
+@read_replica
+def api_attendance_rates():
+    """Expected vs attended school days per teacher (?start=&end=&department=); defaults to this month so far"""
+    if not session.get('user_id'):
+        return jsonify({'success': False, 'message': 'Login required'}), 401
+    today = AttendanceLogic.get_current_time().date()
+    start = _parse_date(request.args.get('start')) or today.replace(day=1)
+    end = min(_parse_date(request.args.get('end')) or today, today)
+    if end < start or (end - start).days > 3 * 366:
+        return jsonify({'success': False, 'message': 'Date range must span 1 day to 3 years and not start in the future'}), 400
+    return jsonify(attendance_rates(session.get('user_id'), start, end, request.args.get('department') or None))
+
 @bp.route('/manual-entry', methods=['GET', 'POST'])
 def manual_entry():
     """Manual entry for check-in/check-out when QR fails"""
@@ -209,4 +364,138 @@ def manual_entry():
         
         return render_template('admin/manual_entry.html', result=result)
     
-    return render_template('admin/manual_entry.html') 
\ No newline at end of file
+    return render_template('admin/manual_entry.html')
+
+@bp.route('/schedule', methods=['GET', 'POST'])
+def schedule():
+    """Set this school's attendance windows, with optional per-weekday overrides"""
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login'))
+    user_id = session.get('user_id')
+    
+    if request.method == 'POST':
+        try:
+            default = _day_schedule(request.form, 'default')
+            overrides = {
+                weekday: _day_schedule(request.form, str(weekday))
+                for weekday in range(len(WEEKDAYS))
+                if request.form.get(f'custom-{weekday}') == 'on'
+            }
+            schedule_store.save(user_id, default, overrides)
+        except ScheduleError as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('admin.schedule'))
+        flash('Schedule saved; scanners use it within a second', 'success')
+        return redirect(url_for('admin.schedule'))
+    
+    default, overrides = schedule_store.load(user_id)
+    return render_template('admin/schedule.html',
+                         default=default,
+                         overrides=overrides,
+                         weekdays=WEEKDAYS,
+                         fields=DaySchedule._fields)
+
+def _day_schedule(form, prefix):
+    """Read one day's six HH:MM inputs named <prefix>-<field>"""
+    times = []
+    for field in DaySchedule._fields:
+        try:
+            times.append(datetime.strptime(form.get(f'{prefix}-{field}', ''), '%H:%M').time())
+        except ValueError:
+            raise ScheduleError(f"{field.replace('_', ' ').capitalize()} must be a time (HH:MM)")
+    return DaySchedule(*times).validate()
+
+@bp.route('/calendar', methods=['GET', 'POST'])
+def school_calendar():
+    """Mark holidays and extra school days for one year (?year=YYYY)"""
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login'))
+    user_id = session.get('user_id')
+    year = request.args.get('year', type=int) or AttendanceLogic.get_current_time().year
+    if not 2000 <= year <= 2100:
+        abort(404)
+    
+    if request.method == 'POST':
+        if request.form.get('reset'):
+            calendar_store.reset(user_id, year)
+            flash(f'{year} is back to Monday to Friday', 'success')
+            return redirect(url_for('admin.school_calendar', year=year))
+        try:
+            holidays = parse_days(request.form.get('holidays'), year)
+            extra_days = parse_days(request.form.get('extra_days'), year)
+        except CalendarError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('admin.school_calendar', year=year))
+        calendar_store.save(user_id, year, (weekday_mask(year) & ~holidays) | extra_days)
+        flash(f'{year} calendar saved', 'success')
+        return redirect(url_for('admin.school_calendar', year=year))
+    
+    working_year = calendar_store.year(user_id, year)
+    return render_template('admin/calendar.html',
+                         year=year,
+                         working_year=working_year,
+                         holidays=format_days(working_year.holidays()),
+                         extra_days=format_days(working_year.extra_days()))
+
+def _is_site_admin():
+    """True for the ADMIN_USERNAME account, the only one allowed to change process-wide settings"""
+    from flask import current_app
+    from routes.auth_routes import User as Account
+    account = db.session.get(Account, session.get('user_id'))
+    return account is not None and account.username == current_app.config.get('ADMIN_USERNAME')
+
+@bp.route('/profiler', methods=['GET', 'POST'])
+def profiler():
+    """Turn the sampling profiler on or off and list captured profiles"""
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login'))
+    # The profiler samples every tenant's requests, so school admins may not touch it
+    if not _is_site_admin():
+        abort(403)
+    
+    if request.method == 'POST':
+        if request.form.get('reset'):
+            sampling_profiler.reset_settings()
+            flash('Profiler settings reset to the configured defaults', 'success')
+            return redirect(url_for('admin.profiler'))
+        try:
+            sample_percent = float(request.form.get('sample_percent') or 0)
+            slow_ms = float(request.form.get('slow_ms') or 0)
+            interval_ms = float(request.form.get('interval_ms') or 5)
+        except ValueError:
+            flash('Sample rate, threshold and interval must be numbers', 'error')
+            return redirect(url_for('admin.profiler'))
+        if not 0 <= sample_percent <= 100 or slow_ms < 0 or not 1 <= interval_ms <= 1000:
+            flash('Sample rate must be 0-100%, the threshold positive and the interval 1-1000 ms', 'error')
+            return redirect(url_for('admin.profiler'))
+        sampling_profiler.save_settings({
+            'enabled': request.form.get('enabled') == 'on',
+            'endpoints': _endpoint_list(request.form.get('endpoints')),
+            'sample_rate': sample_percent / 100,
+            'slow_endpoints': _endpoint_list(request.form.get('slow_endpoints')),
+            'slow_ms': slow_ms,
+            'interval_ms': interval_ms,
+        })
+        flash('Profiler settings saved; workers pick them up within a second', 'success')
+        return redirect(url_for('admin.profiler'))
+    
+    from flask import current_app
+    return render_template('admin/profiler.html',
+                         settings=sampling_profiler.settings(),
+                         profiles=sampling_profiler.list_profiles(),
+                         endpoints=sorted(rule.endpoint for rule in current_app.url_map.iter_rules()))
+
+@bp.route('/profiler/<path:name>')
+def download_profile(name):
+    """Download one collapsed-stack profile"""
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login'))
+    if not _is_site_admin():
+        abort(403)
+    if not name.endswith(PROFILE_SUFFIX):
+        abort(404)
+    return send_from_directory(sampling_profiler.profile_dir(), name, as_attachment=True, mimetype='text/plain')
+
+def _endpoint_list(value):
+    return [item.strip() for item in (value or '').replace('\n', ',').split(',') if item.strip()]
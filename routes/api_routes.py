@@ -0,0 +1,113 @@
+from flask import Blueprint, request, session, g
+from datetime import date
+from utils.api_tokens import token_user
+from utils.db_routing import read_replica
+from utils.attendance_logic import AttendanceLogic
+from utils.fast_json import json_response
+from utils.hallway_board import today_board
+from utils.http_compression import compress_response
+from utils.kiosk_roster import roster_snapshot, roster_changes
+from utils.rest_api import (
+    ApiError, TEACHER_FIELDS, ATTENDANCE_FIELDS, ATTENDANCE_DEFAULT_FIELDS,
+    parse_fields, parse_limit, teacher_page, teacher_detail, attendance_page
+)
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+STATUSES = ('On Time', 'Late', 'Absent')
+
+@bp.before_request
+def authenticate():
+    """Bearer token (flask create-api-token) or a logged-in admin session"""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        user_id = token_user(header[len('Bearer '):].strip())
+    else:
+        user_id = session.get('user_id')
+    if not user_id:
+        return json_response({'success': False, 'message': 'A valid API token is required'}, 401)
+    g.api_user_id = user_id
+    # Tenant shards follow the token's admin, not the (absent) session
+    g.tenant_id = user_id
+
+@bp.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+@bp.errorhandler(ApiError)
+def api_error(error):
+    return json_response({'success': False, 'message': str(error)}, 400)
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(f'{name} must be a date (YYYY-MM-DD)')
+
+@bp.route('/teachers')
+@read_replica
+def teachers():
+    """Teachers, ?fields=&limit=&cursor=&department=&include_inactive=1"""
+    fields = parse_fields(request.args.get('fields'), TEACHER_FIELDS, TEACHER_FIELDS)
+    return json_response(teacher_page(
+        g.api_user_id, fields, parse_limit(request.args.get('limit')),
+        cursor=request.args.get('cursor'),
+        department=request.args.get('department') or None,
+        include_inactive=request.args.get('include_inactive') in ('1', 'true')
+    ))
+
+@bp.route('/teachers/<unique_id>')
+@read_replica
+def teacher(unique_id):
+    """One teacher by unique ID, ?fields="""
+    fields = parse_fields(request.args.get('fields'), TEACHER_FIELDS, TEACHER_FIELDS)
+    item = teacher_detail(g.api_user_id, unique_id, fields)
+    if item is None:
+        return json_response({'success': False, 'message': 'Teacher not found'}, 404)
+    return json_response({'data': item})
+
+@bp.route('/attendance')
+@read_replica
+def attendance():
+    """Attendance records, ?fields=&limit=&cursor=&since=&until=&teacher=&status="""
+    fields = parse_fields(request.args.get('fields'), ATTENDANCE_FIELDS, ATTENDANCE_DEFAULT_FIELDS)
+    status = request.args.get('status') or None
+    if status and status not in STATUSES:
+        raise ApiError(f"status must be one of {', '.join(STATUSES)}")
+    return json_response(attendance_page(
+        g.api_user_id, fields, parse_limit(request.args.get('limit')),
+        cursor=request.args.get('cursor'),
+        since=_date_arg('since'),
+        until=_date_arg('until'),
+        teacher=request.args.get('teacher') or None,
+        status=status
+    ))
+
+@bp.route('/roster')
+def roster():
+    """Kiosk roster: every teacher as [unique_id, name, is_active] plus a version token"""
+    return json_response(roster_snapshot(g.api_user_id))
+
+@bp.route('/roster/changes')
+def roster_delta():
+    """Roster changes after ?since=<version>, for kiosks holding a snapshot"""
+    try:
+        since = int(request.args.get('since', ''))
+    except ValueError:
+        raise ApiError('since must be a version from /roster or /roster/changes')
+    return json_response(roster_changes(g.api_user_id, since))
+
+@bp.route('/board')
+@read_replica
+def board():
+    """Today's status of every active teacher, ?department=; answers 304 while the board is unchanged"""
+    today = AttendanceLogic.get_current_time().date()
+    response = json_response(today_board(g.api_user_id, today, request.args.get('department') or None))
+    # Weak: the same board is also sent gzip- or Brotli-encoded
+    response.add_etag(weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, flash
 from models import db, Teacher, Attendance
 from utils.attendance_logic import AttendanceLogic
 from utils.qrcode_utils import qr_generator
+from utils.tenant_shards import tenant_directory
 import re
 
 bp = Blueprint('attendance', __name__, url_prefix='/attendance')
@@ -111,6 +112,7 @@ def error():
 def get_teacher_info(teacher_unique_id):
     """API endpoint to get teacher information"""
     try:
+        tenant_directory.use_teacher_tenant(teacher_unique_id)
         teacher = Teacher.query.filter_by(unique_id=teacher_unique_id, is_active=True).first()
         
         if not teacher:
@@ -134,6 +136,7 @@ def get_teacher_info(teacher_unique_id):
 def get_today_attendance(teacher_unique_id):
     """API endpoint to get today's attendance for a teacher"""
     try:
+        tenant_directory.use_teacher_tenant(teacher_unique_id)
         teacher = Teacher.query.filter_by(unique_id=teacher_unique_id, is_active=True).first()
         
         if not teacher:
@@ -142,8 +145,7 @@ def get_today_attendance(teacher_unique_id):
                 'message': 'Teacher not found'
             })
         
-        from datetime import date
-        today = date.today()
+        today = AttendanceLogic.get_current_time().date()
         
         attendance = Attendance.query.filter_by(
             teacher_id=teacher.id,
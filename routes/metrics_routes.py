@@ -0,0 +1,19 @@
+from flask import Blueprint, Response, current_app, request, abort
+from utils.metrics import metrics, metrics_registry
+import hmac
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint, summed across gunicorn workers"""
+    if not metrics.enabled:
+        abort(404)
+    token = current_app.config.get('METRICS_TOKEN')
+    # Endpoint names, latencies and scan counts are not public: no token, no scrape
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+    return Response(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,48 @@
+from flask import Blueprint, Response, request, abort, url_for
+from models import db, Teacher
+from utils.qrcode_utils import qr_generator
+from utils.tenant_shards import tenant_directory
+
+bp = Blueprint('qr', __name__, url_prefix='/qr')
+
+# A versioned QR URL never changes its bytes, so browsers may keep it for a year
+QR_MAX_AGE = 365 * 24 * 60 * 60
+
+# Bounds for the optional size/border query parameters
+MAX_BOX_SIZE = 40
+MAX_BORDER = 16
+
+def qr_url(teacher_unique_id, image_format='svg'):
+    """URL of a teacher's QR image, carrying the render fingerprint that makes it safe to cache forever"""
+    return url_for('qr.qr_image', teacher_unique_id=teacher_unique_id, image_format=image_format,
+                   v=qr_generator.render_version)
+
+@bp.app_context_processor
+def qr_helpers():
+    return {'qr_url': qr_url}
+
+@bp.route('/<teacher_unique_id>.<any(png, svg):image_format>')
+def qr_image(teacher_unique_id, image_format):
+    """Serve a teacher's QR code image; immutable when the URL carries the current render fingerprint"""
+    box_size = request.args.get('size', qr_generator.DEFAULT_BOX_SIZE, type=int)
+    border = request.args.get('border', qr_generator.DEFAULT_BORDER, type=int)
+    if not 1 <= box_size <= MAX_BOX_SIZE or not 0 <= border <= MAX_BORDER:
+        abort(400)
+
+    tenant_directory.use_teacher_tenant(teacher_unique_id)
+    exists = db.session.query(Teacher.id).filter_by(unique_id=teacher_unique_id).first()
+    if not exists:
+        abort(404)
+
+    data, etag = qr_generator.render_qr_code(teacher_unique_id, image_format, box_size, border)
+
+    response = Response(data, mimetype=qr_generator.MIME_TYPES[image_format])
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if request.args.get('v') == qr_generator.render_version:
+        response.cache_control.max_age = QR_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Unversioned or outdated URLs revalidate so a new rendering reaches them
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Attendance rate test
+Builds a small school with known check-ins and checks the bitset rates count
+only On Time and Late days as attended, like the dashboard's Present figure
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, datetime
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_DIR)
+
+from config import Config
+
+def test_absent_check_ins_do_not_count_as_attended():
+    """A check-in after late_end is stored as Absent and leaves the day unattended"""
+    workdir = tempfile.mkdtemp()
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'attendance.db')}"
+
+    from app import create_app, init_database
+    from models import db, Teacher, Attendance
+    from utils.school_calendar import attendance_rates
+    app = create_app(TestConfig)
+    app.instance_path = workdir
+    try:
+        with app.app_context():
+            init_database()
+            teacher = Teacher(name='Ama Mensah', unique_id='T0000000', user_id=1, created_at=datetime(2025, 3, 1))
+            db.session.add(teacher)
+            db.session.flush()
+            # Monday to Wednesday: on time, late, and a 10:30 check-in past the late cutoff
+            for day, hour, status in ((10, 7, 'On Time'), (11, 8, 'Late'), (12, 10, 'Absent')):
+                db.session.add(Attendance(teacher_id=teacher.id, date=date(2025, 3, day), status=status,
+                                          check_in_time=datetime(2025, 3, day, hour, 30)))
+            db.session.commit()
+
+            result = attendance_rates(1, date(2025, 3, 10), date(2025, 3, 12))
+            row, = result['teachers']
+            assert row['expected_days'] == 3
+            assert row['attended_days'] == 2
+            assert row['on_time_days'] == 1
+            assert row['absent_days'] == 1
+            assert row['attendance_rate'] == round(2 / 3, 4)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    test_absent_check_ins_do_not_count_as_attended()
+    print('Absent check-ins are left out of attendance rates')
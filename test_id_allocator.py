@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Teacher ID allocator test
+Reserves blocks with different TEACHER_ID_BLOCK_SIZE values, the way workers
+started with different settings share one database, and checks that no
+teacher ID is handed out twice
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_DIR)
+
+from config import Config
+
+def test_ids_stay_unique_across_block_size_changes():
+    """Blocks reserved after the block size shrinks or grows never overlap earlier ones"""
+    workdir = tempfile.mkdtemp()
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'attendance.db')}"
+        TEACHER_ID_BLOCK_SIZE = 100
+
+    from app import create_app, init_database
+    from models import TeacherIdBlock
+    from utils.id_allocator import TeacherIdAllocator, decode_teacher_id
+    app = create_app(TestConfig)
+    try:
+        with app.app_context():
+            init_database()
+            issued = []
+            # Each allocator stands for a worker; earlier ones keep drawing from their own blocks
+            workers = []
+            for block_size in (100, 10, 1, 250, 7):
+                app.config['TEACHER_ID_BLOCK_SIZE'] = block_size
+                worker = TeacherIdAllocator()
+                workers.append(worker)
+                for allocator in workers:
+                    issued.extend(allocator.allocate(block_size + 3))
+
+            assert len(issued) == len(set(issued))
+            assert all(decode_teacher_id(unique_id) is not None for unique_id in issued)
+
+            ranges = sorted((block.range_start, block.range_end) for block in TeacherIdBlock.query.all())
+            for (_, previous_end), (start, _) in zip(ranges, ranges[1:]):
+                assert start >= previous_end
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    test_ids_stay_unique_across_block_size_changes()
+    print('Teacher IDs stayed unique across block size changes')
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Read replica routing test
+Runs a Core UPDATE inside an @read_replica view with a replica bind configured
+and checks the write lands on the primary and later reads in the view see it
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_DIR)
+
+from config import Config
+
+def test_update_in_read_replica_view_goes_to_primary():
+    """An UPDATE from a replica-routed view writes the primary, not the read-only copy"""
+    workdir = tempfile.mkdtemp()
+    primary_path = os.path.join(workdir, 'attendance.db')
+    replica_path = os.path.join(workdir, 'replica.db')
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary_path}'
+        SQLALCHEMY_BINDS = {'replica': f'sqlite:///{replica_path}'}
+        TENANT_SHARDING = None
+
+    from app import create_app, init_database
+    from models import db, Teacher
+    from utils.db_routing import read_replica
+    app = create_app(TestConfig)
+    app.instance_path = workdir
+
+    @app.route('/test/rename/<unique_id>')
+    @read_replica
+    def rename(unique_id):
+        db.session.execute(db.update(Teacher).where(Teacher.unique_id == unique_id).values(name='Renamed'))
+        db.session.commit()
+        return db.session.execute(db.select(Teacher.name).where(Teacher.unique_id == unique_id)).scalar()
+
+    try:
+        with app.app_context():
+            init_database()
+            db.session.add(Teacher(name='Ama Mensah', unique_id='T0000000', user_id=1))
+            db.session.commit()
+            db.engine.dispose()
+        # The replica starts as an exact copy of the primary
+        with sqlite3.connect(primary_path) as source, sqlite3.connect(replica_path) as target:
+            source.backup(target)
+
+        response = app.test_client().get('/test/rename/T0000000')
+        assert response.get_data(as_text=True) == 'Renamed'
+
+        with sqlite3.connect(primary_path) as primary, sqlite3.connect(replica_path) as replica:
+            assert primary.execute("SELECT name FROM teachers WHERE unique_id = 'T0000000'").fetchone() == ('Renamed',)
+            assert replica.execute("SELECT name FROM teachers WHERE unique_id = 'T0000000'").fetchone() == ('Ama Mensah',)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    test_update_in_read_replica_view_goes_to_primary()
+    print('Writes from read replica views went to the primary')
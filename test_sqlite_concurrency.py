@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the SQLite production profile
+Runs parallel check-ins from several worker processes against one database file,
+the way multiple gunicorn workers share it, and checks none hit "database is locked"
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKERS = 6
+TEACHERS_PER_WORKER = 40
+
+def _load_app(workdir, database_path):
+    """Import the app in a fresh process pointed at the shared test database"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    os.environ.pop('SMTP_USER', None)
+    os.chdir(workdir)
+    sys.path.insert(0, PROJECT_DIR)
+    from app import create_app
+    return create_app()
+
+def _seed(workdir, database_path, count):
+    app = _load_app(workdir, database_path)
+    from models import db, Teacher
+    from app import init_database
+    from utils.id_allocator import teacher_id_allocator
+    with app.app_context():
+        init_database()
+        unique_ids = teacher_id_allocator.allocate(count)
+        db.session.add_all(Teacher(name=f'Teacher {i}', unique_id=unique_id, user_id=1)
+                           for i, unique_id in enumerate(unique_ids))
+        db.session.commit()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    return unique_ids, journal_mode
+
+def _check_in_worker(workdir, database_path, unique_ids, results):
+    app = _load_app(workdir, database_path)
+    from datetime import datetime
+    from utils.attendance_logic import AttendanceLogic
+    # Inside the on-time window so every scan is a real write
+    AttendanceLogic.get_current_time = staticmethod(lambda: datetime.now().replace(hour=6, minute=30))
+    client = app.test_client()
+    failures = []
+    for unique_id in unique_ids:
+        response = client.post('/attendance/process-qr', data={
+            'qr_data': f'TEACHER:{unique_id}',
+            'action': 'check_in'
+        })
+        result = response.get_json()
+        if not result['success']:
+            failures.append(result['message'])
+    results.put(failures)
+
+def test_parallel_check_ins():
+    """Parallel check-ins from several processes all succeed against one SQLite file"""
+    workdir = tempfile.mkdtemp()
+    database_path = os.path.join(workdir, 'attendance.db')
+    context = multiprocessing.get_context('spawn')
+    try:
+        with context.Pool(1) as pool:
+            unique_ids, journal_mode = pool.apply(_seed, (workdir, database_path, WORKERS * TEACHERS_PER_WORKER))
+        assert journal_mode == 'wal'
+
+        results = context.Queue()
+        processes = [
+            context.Process(target=_check_in_worker, args=(
+                workdir, database_path, unique_ids[i::WORKERS], results
+            ))
+            for i in range(WORKERS)
+        ]
+        for process in processes:
+            process.start()
+        failures = [message for _ in processes for message in results.get(timeout=120)]
+        for process in processes:
+            process.join(timeout=30)
+
+        assert failures == []
+
+        import sqlite3
+        connection = sqlite3.connect(database_path)
+        checked_in = connection.execute(
+            'SELECT COUNT(*) FROM attendance WHERE check_in_time IS NOT NULL'
+        ).fetchone()[0]
+        connection.close()
+        assert checked_in == len(unique_ids)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    print("🔒 Running parallel SQLite check-in test...")
+    test_parallel_check_ins()
+    print(f"✅ {WORKERS * TEACHERS_PER_WORKER} check-ins from {WORKERS} processes, no lock errors")
@@ -0,0 +1,55 @@
+"""
+Bearer tokens for the /api/v1 integrations (payroll, SIS)
+
+Each token belongs to one admin and reads only that admin's teachers and
+attendance. The token is shown once when created; the database keeps its
+SHA-256, so a leaked backup cannot be replayed against the API.
+"""
+import hashlib
+import secrets
+from models import db, ApiToken
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def create_token(user_id, name):
+    """
+    Issue a new token for an admin
+
+    Args:
+        user_id (int): Admin whose data the token can read
+        name (str): Label, unique per admin, e.g. 'payroll'
+
+    Returns:
+        str: The token; it cannot be recovered later
+
+    Raises:
+        ValueError: When the name is empty or already used by this admin
+    """
+    name = (name or '').strip()
+    if not name:
+        raise ValueError('Token name is required')
+    if ApiToken.query.filter_by(user_id=user_id, name=name).first():
+        raise ValueError(f'Admin {user_id} already has a token named "{name}"')
+    token = secrets.token_urlsafe(32)
+    db.session.add(ApiToken(user_id=user_id, name=name, token_hash=_digest(token)))
+    db.session.commit()
+    return token
+
+
+def revoke_token(user_id, name):
+    """Delete an admin's token by name; returns True when one was deleted"""
+    deleted = ApiToken.query.filter_by(user_id=user_id, name=name).delete()
+    db.session.commit()
+    return bool(deleted)
+
+
+def token_user(token):
+    """Admin user ID for a presented token, or None when it is unknown or revoked"""
+    if not token:
+        return None
+    return db.session.execute(
+        db.select(ApiToken.user_id).where(ApiToken.token_hash == _digest(token))
+    ).scalar()
@@ -1,58 +1,59 @@
 from datetime import datetime, time, date
+from sqlalchemy.orm import contains_eager
 from models import db, Teacher, Attendance
 from utils.email_notifications import email_service
+from utils.id_allocator import normalize_teacher_id
+from utils.clock import clock
+from utils.metrics import metrics
+from utils.tenant_shards import tenant_directory
+from utils.schedules import schedule_store, DEFAULT_DAY, DEFAULT_SCHEDULE, format_time
 
 class AttendanceLogic:
     """Core business logic for attendance management"""
     
-    # Attendance time windows
-    ON_TIME_START = time(6, 0)  # 6:00 AM
-    ON_TIME_END = time(7, 0)    # 7:00 AM
-    LATE_END = time(10, 0)      # 10:00 AM
-    ABSENT_DEADLINE = time(11, 0)  # 11:00 AM
-    CHECKOUT_START = time(14, 0)   # 2:00 PM
-    CHECKOUT_END = time(18, 0)     # 6:00 PM
+    # Default attendance time windows; schools can set their own at /admin/schedule
+    ON_TIME_START = DEFAULT_DAY.on_time_start      # 6:00 AM
+    ON_TIME_END = DEFAULT_DAY.on_time_end          # 7:00 AM
+    LATE_END = DEFAULT_DAY.late_end                # 10:00 AM
+    ABSENT_DEADLINE = DEFAULT_DAY.absent_deadline  # 11:00 AM
+    CHECKOUT_START = DEFAULT_DAY.checkout_start    # 2:00 PM
+    CHECKOUT_END = DEFAULT_DAY.checkout_end        # 6:00 PM
     
     @staticmethod
     def get_current_time():
-        """Get current time in local timezone"""
-        return datetime.now()
+        """Get current time in local timezone (shifted by X-Simulated-Time when SIMULATED_CLOCK is on)"""
+        return clock.now()
     
     @staticmethod
-    def determine_attendance_status(check_in_time):
+    def determine_attendance_status(check_in_time, schedule=None):
         """
         Determine attendance status based on check-in time
         
         Args:
             check_in_time (datetime): Teacher's check-in time
+            schedule (CompiledSchedule): School's windows (default DEFAULT_SCHEDULE)
             
         Returns:
             str: 'On Time', 'Late', or 'Absent'
         """
-        check_in_time_only = check_in_time.time()
-        
-        if AttendanceLogic.ON_TIME_START <= check_in_time_only <= AttendanceLogic.ON_TIME_END:
-            return 'On Time'
-        elif AttendanceLogic.ON_TIME_END < check_in_time_only <= AttendanceLogic.LATE_END:
-            return 'Late'
-        else:
-            return 'Absent'
+        return (schedule or DEFAULT_SCHEDULE).status_at(check_in_time)
     
     @staticmethod
-    def can_check_out(check_out_time):
+    def can_check_out(check_out_time, schedule=None):
         """
         Check if teacher can check out at the given time
         
         Args:
             check_out_time (datetime): Proposed check-out time
+            schedule (CompiledSchedule): School's windows (default DEFAULT_SCHEDULE)
             
         Returns:
             bool: True if check-out is allowed
         """
-        check_out_time_only = check_out_time.time()
-        return AttendanceLogic.CHECKOUT_START <= check_out_time_only <= AttendanceLogic.CHECKOUT_END
+        return (schedule or DEFAULT_SCHEDULE).can_check_out(check_out_time)
     
     @staticmethod
+    @metrics.counted_scan('check_in')
     def process_check_in(teacher_unique_id):
         """
         Process teacher check-in
@@ -64,8 +65,10 @@ class AttendanceLogic:
             dict: Result with status, message, and attendance data
         """
         try:
-            # Find teacher
-            teacher = Teacher.query.filter_by(unique_id=teacher_unique_id, is_active=True).first()
+            # Find teacher; IDs with a bad check character are rejected without a query
+            teacher_unique_id = normalize_teacher_id(teacher_unique_id)
+            tenant_directory.use_teacher_tenant(teacher_unique_id)
+            teacher = teacher_unique_id and Teacher.query.filter_by(unique_id=teacher_unique_id, is_active=True).first()
             if not teacher:
                 return {
                     'success': False,
@@ -89,8 +92,9 @@ class AttendanceLogic:
                     'data': existing_attendance.to_dict()
                 }
             
-            # Determine attendance status
-            status = AttendanceLogic.determine_attendance_status(current_time)
+            # Determine attendance status from the school's cached schedule
+            schedule = schedule_store.get(teacher.user_id)
+            status = AttendanceLogic.determine_attendance_status(current_time, schedule)
             
             # Create or update attendance record
             if existing_attendance:
@@ -143,6 +147,7 @@ class AttendanceLogic:
             }
     
     @staticmethod
+    @metrics.counted_scan('check_out')
     def process_check_out(teacher_unique_id):
         """
         Process teacher check-out
@@ -154,8 +159,10 @@ class AttendanceLogic:
             dict: Result with status, message, and attendance data
         """
         try:
-            # Find teacher
-            teacher = Teacher.query.filter_by(unique_id=teacher_unique_id, is_active=True).first()
+            # Find teacher; IDs with a bad check character are rejected without a query
+            teacher_unique_id = normalize_teacher_id(teacher_unique_id)
+            tenant_directory.use_teacher_tenant(teacher_unique_id)
+            teacher = teacher_unique_id and Teacher.query.filter_by(unique_id=teacher_unique_id, is_active=True).first()
             if not teacher:
                 return {
                     'success': False,
@@ -194,10 +201,12 @@ class AttendanceLogic:
                 }
             
             # Check if check-out is allowed at this time
-            if not AttendanceLogic.can_check_out(current_time):
+            schedule = schedule_store.get(teacher.user_id)
+            if not AttendanceLogic.can_check_out(current_time, schedule):
+                day = schedule.day(current_time)
                 return {
                     'success': False,
-                    'message': 'Check-out is only allowed between 2:00 PM and 6:00 PM',
+                    'message': f'Check-out is only allowed between {format_time(day.checkout_start)} and {format_time(day.checkout_end)}',
                     'data': None
                 }
             
@@ -245,7 +254,8 @@ class AttendanceLogic:
         """
         from flask import session
         user_id = session.get('user_id')
-        query = Attendance.query.join(Teacher).filter(Teacher.user_id == user_id)
+        # Fill record.teacher from the join; to_dict would otherwise load each teacher separately
+        query = Attendance.query.join(Teacher).options(contains_eager(Attendance.teacher)).filter(Teacher.user_id == user_id)
 
         # Apply filters
         if date_filter:
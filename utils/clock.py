@@ -0,0 +1,47 @@
+"""
+Wall clock for attendance decisions, optionally shifted per request
+
+With SIMULATED_CLOCK enabled, a request may carry an X-Simulated-Time header
+(ISO 8601 local time) and every attendance decision made while serving it
+uses that time instead of the server clock. Load tests use this to replay a
+6:00-7:00 morning rush at any hour. Leave it off in production: anyone who can
+reach the kiosk endpoints could otherwise backdate a check-in.
+"""
+from datetime import datetime
+from flask import current_app, has_request_context, request
+
+SIMULATED_TIME_HEADER = 'X-Simulated-Time'
+
+class Clock:
+    """Current time, honouring X-Simulated-Time when SIMULATED_CLOCK is on"""
+
+    def simulated_time(self):
+        """
+        The time requested by the current request, if any
+
+        Returns:
+            datetime: Parsed header value, or None outside a request, with the
+            feature off, or when the header is missing or malformed
+        """
+        if not has_request_context() or not current_app.config.get('SIMULATED_CLOCK'):
+            return None
+        value = request.headers.get(SIMULATED_TIME_HEADER)
+        if not value:
+            return None
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        # Attendance times are naive local times; drop any offset the caller sent
+        return moment.replace(tzinfo=None)
+
+    def now(self):
+        """Current local time"""
+        return self.simulated_time() or datetime.now()
+
+    def today(self):
+        """Current local date"""
+        return self.now().date()
+
+# Global instance
+clock = Clock()
@@ -0,0 +1,90 @@
+"""
+End-of-day close: record an Absent row for every teacher who never scanned
+
+Until a day is closed, a teacher who did not scan simply has no attendance
+row, so reports only see the absences of teachers who scanned too late.
+Closing a day adds the missing rows with one INSERT ... SELECT per school: an
+anti-join of the active roster against that day's attendance, with ON CONFLICT
+DO NOTHING on (teacher_id, date) so reruns and scans racing the close are
+harmless. Absence reports then read rows through the usual indexes.
+
+A teacher who scans after the close keeps the row: process_check_in fills in
+check_in_time and the real status.
+"""
+from datetime import datetime, time, timedelta
+from sqlalchemy import exists, literal, select
+from models import db, Teacher, Attendance
+from utils.clock import clock
+from utils.db_dialect import insert_ignoring_conflicts
+from utils.db_routing import use_tenant
+from utils.schedules import schedule_store, format_time
+from utils.school_calendar import calendar_store
+from utils.tenant_shards import tenant_ids
+
+
+def close_school_day(user_id, day):
+    """
+    Insert Absent rows for one school's active teachers without a record on `day`
+
+    Teachers added after `day` are left out. Run inside use_tenant(user_id)
+    when TENANT_SHARDING is on.
+
+    Args:
+        user_id (int): Owning admin
+        day (date): Day to close
+
+    Returns:
+        int: Rows inserted
+    """
+    teachers = Teacher.__table__
+    attendance = Attendance.__table__
+    stamp = clock.now()
+    missing = select(
+        teachers.c.id, literal(day), literal('Absent'), literal(stamp), literal(stamp)
+    ).where(
+        teachers.c.user_id == user_id,
+        teachers.c.is_active == True,
+        teachers.c.created_at < datetime.combine(day + timedelta(days=1), time(0)),
+        ~exists().where(attendance.c.teacher_id == teachers.c.id, attendance.c.date == day),
+    )
+    result = db.session.execute(insert_ignoring_conflicts(Attendance).from_select(
+        ['teacher_id', 'date', 'status', 'created_at', 'updated_at'], missing
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def close_day(day, user_ids=None, force=False, include_closed=False):
+    """
+    Close `day` for several schools, one statement each
+
+    Schools whose calendar marks `day` as a non-school day are skipped, and
+    today is only closed once the school's absent deadline for that weekday
+    has passed, unless `force` is set.
+
+    Args:
+        day (date): Day to close; must not be in the future
+        user_ids (list): Schools to close (default every school with teachers)
+        force (bool): Close today even before the absent deadline
+        include_closed (bool): Close the day even where it is not a school day
+
+    Yields:
+        dict: user_id plus either inserted (row count) or skipped (reason), per school
+
+    Raises:
+        ValueError: When `day` is in the future
+    """
+    now = clock.now()
+    if day > now.date():
+        raise ValueError(f'{day.isoformat()} has not happened yet')
+    for user_id in user_ids or tenant_ids():
+        if not include_closed and not calendar_store.is_working(user_id, day):
+            yield {'user_id': user_id, 'skipped': 'not a school day'}
+            continue
+        if day == now.date() and not force:
+            deadline = schedule_store.get(user_id).day(day).absent_deadline
+            if now.time() < deadline:
+                yield {'user_id': user_id, 'skipped': f'absent deadline {format_time(deadline)} not reached'}
+                continue
+        with use_tenant(user_id):
+            yield {'user_id': user_id, 'inserted': close_school_day(user_id, day)}
@@ -0,0 +1,62 @@
+from sqlalchemy import Integer, String, cast, func, insert, literal
+from models import db
+
+def dialect_name(model=None):
+    """Name of the dialect serving model's table, or the default bind ('sqlite', 'postgresql', ...)"""
+    return db.session.get_bind(mapper=model).dialect.name
+
+def insert_ignoring_conflicts(model):
+    """
+    INSERT statement that skips rows violating a unique constraint
+
+    Uses ON CONFLICT DO NOTHING on PostgreSQL/SQLite and INSERT IGNORE on MySQL.
+    """
+    name = dialect_name(model)
+    # Dialect modules are imported on demand so worker boot doesn't load all three
+    if name == 'postgresql':
+        from sqlalchemy.dialects import postgresql
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if name == 'sqlite':
+        from sqlalchemy.dialects import sqlite
+        return sqlite.insert(model).on_conflict_do_nothing()
+    if name in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects import mysql
+        return mysql.insert(model).prefix_with('IGNORE')
+    return insert(model)
+
+def supports_bulk_returning(model=None):
+    """True if executemany INSERT ... RETURNING works on the dialect serving model's table"""
+    return db.session.get_bind(mapper=model).dialect.insert_executemany_returning
+
+def prefix_match(column, term):
+    """
+    Case-insensitive "starts with" filter that can use an index on lower(column)
+
+    PostgreSQL gets LIKE against a text_pattern_ops index; elsewhere a range
+    comparison lets the plain lower(column) index serve the search.
+
+    The term is lowered by the database, with the same lower() as the index,
+    so both sides always agree. SQLite's lower() only folds ASCII letters:
+    there, "émile" does not find "Émile", while PostgreSQL folds every letter.
+    """
+    if dialect_name(getattr(column, 'class_', None)) == 'postgresql':
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return func.lower(column).like(func.lower(literal(f'{escaped}%', String)), escape='\\')
+    lowered = func.lower(literal(term, String), type_=String)
+    return (func.lower(column) >= lowered) & (func.lower(column) < lowered + '\uffff')
+
+def days_since(column, origin, model=None):
+    """
+    Whole days from the date `origin` to a DATE column, as an integer expression
+
+    Args:
+        column: DATE column
+        origin (date): Day 0
+        model: Model whose bind decides the dialect
+    """
+    name = dialect_name(model)
+    if name == 'postgresql':
+        return column - origin
+    if name in ('mysql', 'mariadb'):
+        return func.datediff(column, origin)
+    return cast(func.julianday(column) - func.julianday(origin), Integer)
@@ -0,0 +1,280 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+import sqlalchemy as sa
+from sqlalchemy import MetaData, text
+from sqlalchemy.schema import CreateSchema
+from sqlalchemy.sql.util import find_tables
+
+logger = logging.getLogger(__name__)
+
+# SQLALCHEMY_BINDS key of the read replica engine
+REPLICA_BIND = 'replica'
+
+# Tables moved into each tenant's shard when TENANT_SHARDING is enabled, in creation order
+TENANT_TABLES = ('teachers', 'attendance')
+
+# Seconds of replay delay, 0 when the standby has replayed everything it received
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaHealth:
+    """Per-worker cache of replica lag, so routing costs one probe per check interval"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    @staticmethod
+    def measure_lag(engine):
+        """
+        Measure how far a replica is behind its primary
+
+        Returns:
+            float: Lag in seconds (0 for databases that cannot report it), or None if unknown
+        """
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql':
+                lag = connection.execute(POSTGRES_LAG_SQL).scalar()
+                return float(lag) if lag is not None else None
+            connection.execute(text('SELECT 1'))
+            return 0.0
+
+    def is_usable(self, engine, max_lag, check_interval):
+        """
+        Whether reads may go to the replica, re-probing at most once per check_interval
+
+        Args:
+            engine: Replica engine
+            max_lag (float): Largest tolerated lag in seconds
+            check_interval (float): Seconds a probe result is reused
+
+        Returns:
+            bool: True when the replica is reachable and within max_lag
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._checked.get(engine)
+        if cached and now - cached[0] < check_interval:
+            return cached[1]
+
+        try:
+            lag = self.measure_lag(engine)
+            usable = lag is not None and lag <= max_lag
+            if not usable:
+                logger.warning('Read replica lag %s exceeds %ss; reading from primary', lag, max_lag)
+        except Exception as e:
+            usable = False
+            logger.warning('Read replica unavailable, reading from primary: %s', e)
+
+        with self._lock:
+            self._checked[engine] = (now, usable)
+        return usable
+
+
+def read_replica(view):
+    """Route a read-only view's queries to the replica when one is configured and healthy"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def replica_engine(db):
+    """The replica engine for this request, or None to use the primary"""
+    if not has_app_context() or not g.get('read_replica'):
+        return None
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return None
+    # Decide once per request so one page never mixes primary and replica reads
+    if 'replica_usable' not in g:
+        config = current_app.config
+        g.replica_usable = replica_health.is_usable(
+            engine,
+            config.get('REPLICA_MAX_LAG_SECONDS', 30),
+            config.get('REPLICA_CHECK_INTERVAL', 10)
+        )
+    return engine if g.replica_usable else None
+
+
+def current_tenant():
+    """
+    Tenant (admin user ID) whose shard serves teacher and attendance queries
+
+    Returns:
+        int: The tenant from use_tenant() or the logged-in admin, or None when
+            sharding is off or no tenant is known
+    """
+    if not has_app_context() or not current_app.config.get('TENANT_SHARDING'):
+        return None
+    if 'tenant_id' in g:
+        return g.tenant_id
+    if has_request_context():
+        return session.get('user_id')
+    return None
+
+
+@contextmanager
+def use_tenant(tenant_id):
+    """Route tenant table queries to tenant_id's shard inside the block"""
+    missing = object()
+    previous = g.get('tenant_id', missing)
+    g.tenant_id = tenant_id
+    try:
+        yield
+    finally:
+        if previous is missing:
+            g.pop('tenant_id', None)
+        else:
+            g.tenant_id = previous
+
+
+def _touches_tenant_tables(mapper, clause):
+    """Whether a statement reads or writes one of the TENANT_TABLES"""
+    if mapper is not None:
+        return sa.inspect(mapper).local_table.name in TENANT_TABLES
+    if clause is not None:
+        return any(getattr(table, 'name', None) in TENANT_TABLES
+                   for table in find_tables(clause, include_crud=True))
+    return False
+
+
+def tenant_metadata(metadata):
+    """
+    Copies of the tenant tables for creating a shard
+
+    Foreign keys to shared tables (users) are dropped: those rows live on the
+    primary, outside the shard.
+    """
+    tenant = MetaData()
+    for name in TENANT_TABLES:
+        source = metadata.tables[name]
+        table = source.to_metadata(tenant)
+        # to_metadata doesn't carry dialect conditions, e.g. PostgreSQL-only indexes
+        conditions = {index.name: index._ddl_if for index in source.indexes}
+        for index in table.indexes:
+            index._ddl_if = conditions.get(index.name)
+        for constraint in list(table.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split('.')[0] not in TENANT_TABLES:
+                table.constraints.discard(constraint)
+                for element in constraint.elements:
+                    element.parent.foreign_keys.discard(element)
+                    table.foreign_keys.discard(element)
+    return tenant
+
+
+class TenantEngines:
+    """Per-worker registry of tenant shard engines, creating each shard on first use
+
+    TENANT_SHARDING='sqlite' gives every tenant its own database file under
+    TENANT_SQLITE_DIR; 'schema' keeps one PostgreSQL connection pool and maps
+    the tenant tables into a per-tenant schema with schema_translate_map.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}
+
+    def engine_for(self, db, tenant_id, base_engine=None):
+        """
+        Engine serving tenant_id's teachers and attendance
+
+        Args:
+            db: The SQLAlchemy extension
+            tenant_id (int): Admin user ID
+            base_engine: Engine to translate in schema mode (the replica for routed reads)
+
+        Returns:
+            Engine for the tenant's shard
+        """
+        config = current_app.config
+        mode = config['TENANT_SHARDING']
+        base_engine = base_engine or db.engine
+        key = (mode, base_engine if mode == 'schema' else current_app.instance_path, tenant_id)
+        engine = self._engines.get(key)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(key)
+                if engine is None:
+                    engine = self._create(db, mode, base_engine, int(tenant_id), config)
+                    self._engines[key] = engine
+        return engine
+
+    def _create(self, db, mode, base_engine, tenant_id, config):
+        from config import engine_options
+        from utils.sqlite_profile import apply_sqlite_profile
+
+        metadata = tenant_metadata(db.metadata)
+        if mode == 'schema':
+            schema = f"{config.get('TENANT_SCHEMA_PREFIX', 'tenant_')}{tenant_id}"
+            engine = base_engine.execution_options(schema_translate_map={None: schema})
+            if base_engine is db.engine:
+                with engine.begin() as connection:
+                    connection.execute(CreateSchema(schema, if_not_exists=True))
+                    metadata.create_all(connection)
+            return engine
+
+        if mode != 'sqlite':
+            raise ValueError(f'Unknown TENANT_SHARDING mode: {mode}')
+        directory = os.path.join(current_app.instance_path, config.get('TENANT_SQLITE_DIR', 'tenants'))
+        os.makedirs(directory, exist_ok=True)
+        url = f"sqlite:///{os.path.join(directory, f'tenant_{tenant_id}.db')}"
+        engine = sa.create_engine(url, **engine_options(url))
+        apply_sqlite_profile(engine, config)
+        metadata.create_all(engine)
+        return engine
+
+    def dispose(self, close=True):
+        """
+        Drop every shard engine
+
+        Args:
+            close (bool): Close pooled connections; pass False in a forked
+                worker, where they still belong to the parent process
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose(close=close)
+            self._engines.clear()
+
+
+class RoutingSession(Session):
+    """Session that picks the engine per statement
+
+    Teacher and attendance statements go to the current tenant's shard when
+    sharding is on. Reads from @read_replica views go to the replica. Flushes
+    and Core INSERT/UPDATE/DELETE statements always use the primary (or the
+    tenant's primary shard), so a routed view that does write still writes to
+    the right place; the rest of that request then reads from the primary too.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        writing = self._flushing or (clause is not None and getattr(clause, 'is_dml', False))
+        if writing and has_app_context():
+            # The replica doesn't have this write yet, so later reads must not go there
+            g.pop('read_replica', None)
+        replica = None if writing else replica_engine(self._db)
+        tenant_id = current_tenant()
+        if tenant_id is not None and _touches_tenant_tables(mapper, clause):
+            return tenant_engines.engine_for(self._db, tenant_id, replica)
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+# Global instances
+replica_health = ReplicaHealth()
+tenant_engines = TenantEngines()
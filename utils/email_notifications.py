@@ -1,20 +1,28 @@
 from models import db, Teacher, Attendance
 from datetime import date, datetime, time
-import smtplib
-import ssl
 import os
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+from werkzeug.local import LocalProxy
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    # smtplib, ssl and the MIME classes are imported when mail is actually sent
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
 
 def send_missed_signin_notifications():
     today = date.today()
-    # Teachers who have not checked in today
-    teachers = Teacher.query.filter_by(is_active=True).all()
+    # Teachers with an email and no check-in today, in one query; rows written
+    # by `flask close-day` are Absent without a check-in and still count as missed
+    teachers = Teacher.query.outerjoin(
+        Attendance, (Attendance.teacher_id == Teacher.id) & (Attendance.date == today)
+        & Attendance.check_in_time.isnot(None)
+    ).filter(
+        Teacher.is_active == True, Teacher.email.isnot(None), Attendance.id.is_(None)
+    ).all()
     for teacher in teachers:
-        attendance = Attendance.query.filter_by(teacher_id=teacher.id, date=today).first()
-        if not attendance and teacher.email:
+        if teacher.email:
             # Send missed sign-in email
             send_notification_email(
                 teacher.email,
@@ -30,10 +38,17 @@ def send_missed_signout_notifications():
     # Only run after sign-out window closes
     if now < time(18, 0):
         return
-    teachers = Teacher.query.filter_by(is_active=True).all()
+    # Teachers who checked in today but not out, in one query
+    teachers = Teacher.query.join(
+        Attendance, (Attendance.teacher_id == Teacher.id) & (Attendance.date == today)
+    ).filter(
+        Teacher.is_active == True,
+        Teacher.email.isnot(None),
+        Attendance.check_in_time.isnot(None),
+        Attendance.check_out_time.is_(None)
+    ).all()
     for teacher in teachers:
-        attendance = Attendance.query.filter_by(teacher_id=teacher.id, date=today).first()
-        if attendance and attendance.check_in_time and not attendance.check_out_time and teacher.email:
+        if teacher.email:
             # Send missed sign-out email
             send_notification_email(
                 teacher.email,
@@ -63,6 +78,7 @@ class EmailNotifications:
         self.from_email = os.environ.get('FROM_EMAIL', self.smtp_user)
         self.from_name = os.environ.get('FROM_NAME', 'Teachers Attendance System')
         
+    @metrics.timed_notification('qr_code')
     def send_qr_code_email(self, to_email: str, teacher_name: str, qr_path: str, 
                           teacher_unique_id: str) -> Dict[str, Any]:
         """
@@ -84,40 +100,11 @@ class EmailNotifications:
             }
         
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f'Welcome to Teachers Attendance System - Your QR Code'
-            msg['From'] = f'{self.from_name} <{self.from_email}>'
-            msg['To'] = to_email
-            
-            # Create HTML content
-            html_content = self._create_welcome_html(teacher_name, teacher_unique_id)
-            msg.attach(MIMEText(html_content, 'html'))
-            
-            # Attach QR code image
-            if os.path.exists(qr_path):
-                with open(qr_path, 'rb') as f:
-                    img_data = f.read()
-                    image = MIMEImage(img_data)
-                    image.add_header('Content-ID', '<qr_code>')
-                    image.add_header('Content-Disposition', 'attachment', 
-                                   filename=f'qr_code_{teacher_unique_id}.png')
-                    msg.attach(image)
+            msg = self._create_qr_code_message(to_email, teacher_name, qr_path, teacher_unique_id)
             
             # Send email
-            context = ssl.create_default_context()
-            
-            if self.smtp_port == 465:
-                # Use SMTP_SSL for port 465
-                with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                    server.login(self.smtp_user, self.smtp_pass)
-                    server.send_message(msg)
-            else:
-                # Use SMTP with STARTTLS for other ports
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    server.starttls(context=context)
-                    server.login(self.smtp_user, self.smtp_pass)
-                    server.send_message(msg)
+            with self._open_connection() as server:
+                server.send_message(msg)
             
             return {
                 'success': True,
@@ -132,6 +119,57 @@ class EmailNotifications:
                 'timestamp': datetime.now().isoformat()
             }
     
+    @metrics.timed_notification('qr_code')
+    def send_qr_code_emails(self, recipients: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Send welcome emails to many teachers over a single SMTP connection
+        
+        Args:
+            recipients: Dicts with to_email, teacher_name, qr_path and teacher_unique_id
+            
+        Returns:
+            List of result dicts, in the same order as recipients
+        """
+        if not recipients:
+            return []
+        if not all([self.smtp_user, self.smtp_pass]):
+            return [{
+                'success': False,
+                'error': 'SMTP credentials not configured in environment variables'
+            } for _ in recipients]
+        
+        import smtplib
+        
+        results = []
+        try:
+            with self._open_connection() as server:
+                for recipient in recipients:
+                    to_email = recipient['to_email']
+                    try:
+                        server.send_message(self._create_qr_code_message(**recipient))
+                        results.append({
+                            'success': True,
+                            'message': f'Welcome email sent successfully to {to_email}',
+                            'timestamp': datetime.now().isoformat()
+                        })
+                    # One rejected message (recipient, sender or data) must not fail the rest
+                    except smtplib.SMTPException as e:
+                        results.append({
+                            'success': False,
+                            'error': f'Failed to send email to {to_email}: {str(e)}',
+                            'timestamp': datetime.now().isoformat()
+                        })
+        except Exception as e:
+            # Connection-level failure: everything not yet sent has failed
+            for recipient in recipients[len(results):]:
+                results.append({
+                    'success': False,
+                    'error': f'Failed to send email to {recipient["to_email"]}: {str(e)}',
+                    'timestamp': datetime.now().isoformat()
+                })
+        return results
+    
+    @metrics.timed_notification('attendance')
     def send_attendance_notification(self, to_email: str, teacher_name: str, 
                                    attendance_type: str, timestamp: str) -> Dict[str, Any]:
         """
@@ -152,6 +190,9 @@ class EmailNotifications:
                 'error': 'SMTP credentials not configured in environment variables'
             }
         
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        
         try:
             msg = MIMEMultipart('alternative')
             msg['Subject'] = f'Attendance {attendance_type.replace("_", " ").title()} Confirmation'
@@ -161,17 +202,8 @@ class EmailNotifications:
             html_content = self._create_attendance_html(teacher_name, attendance_type, timestamp)
             msg.attach(MIMEText(html_content, 'html'))
             
-            context = ssl.create_default_context()
-            
-            if self.smtp_port == 465:
-                with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                    server.login(self.smtp_user, self.smtp_pass)
-                    server.send_message(msg)
-            else:
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    server.starttls(context=context)
-                    server.login(self.smtp_user, self.smtp_pass)
-                    server.send_message(msg)
+            with self._open_connection() as server:
+                server.send_message(msg)
             
             return {
                 'success': True,
@@ -186,6 +218,54 @@ class EmailNotifications:
                 'timestamp': datetime.now().isoformat()
             }
     
+    def _open_connection(self) -> 'smtplib.SMTP':
+        """Open an authenticated SMTP connection; use it as a context manager"""
+        import smtplib
+        import ssl
+        
+        context = ssl.create_default_context()
+        
+        if self.smtp_port == 465:
+            # Use SMTP_SSL for port 465
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
+        else:
+            # Use SMTP with STARTTLS for other ports
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            server.starttls(context=context)
+        try:
+            server.login(self.smtp_user, self.smtp_pass)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def _create_qr_code_message(self, to_email: str, teacher_name: str, qr_path: str,
+                                teacher_unique_id: str) -> 'MIMEMultipart':
+        """Build the welcome email with the QR code attached"""
+        from email.mime.image import MIMEImage
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = f'Welcome to Teachers Attendance System - Your QR Code'
+        msg['From'] = f'{self.from_name} <{self.from_email}>'
+        msg['To'] = to_email
+        
+        # Create HTML content
+        html_content = self._create_welcome_html(teacher_name, teacher_unique_id)
+        msg.attach(MIMEText(html_content, 'html'))
+        
+        # Attach QR code image
+        if os.path.exists(qr_path):
+            with open(qr_path, 'rb') as f:
+                img_data = f.read()
+                image = MIMEImage(img_data)
+                image.add_header('Content-ID', '<qr_code>')
+                image.add_header('Content-Disposition', 'attachment', 
+                               filename=f'qr_code_{teacher_unique_id}.png')
+                msg.attach(image)
+        return msg
+    
     def _create_welcome_html(self, teacher_name: str, teacher_unique_id: str) -> str:
         """Create HTML content for welcome email"""
         return f"""
@@ -313,5 +393,10 @@ class EmailNotifications:
         </html>
         """
 
-# Global instance
-email_service = EmailNotifications()
+@lru_cache(maxsize=None)
+def get_email_service():
+    """Build the shared EmailNotifications on first use, after .env has been loaded"""
+    return EmailNotifications()
+
+# Global instance, constructed on first use
+email_service = LocalProxy(get_email_service)
@@ -0,0 +1,64 @@
+"""
+Today's status of every teacher of a school, for hallway displays
+
+One query covers the whole board. Active teachers are read in name order
+through ix_teachers_user_active_name, and each one is LEFT JOINed to today's
+attendance row through the (teacher_id, date) unique index. Teachers who
+have not scanned yet come back with NULLs.
+
+The board is columnar: one list per column instead of one object per teacher,
+so keys are not repeated for every row. Clock times are HH:MM, which is all a
+display shows.
+"""
+from collections import Counter
+from sqlalchemy import and_, select
+from models import db, Teacher, Attendance
+from utils.school_calendar import calendar_store
+
+COLUMNS = ('unique_id', 'name', 'department', 'status', 'check_in', 'check_out')
+
+
+def _clock(value):
+    return value.strftime('%H:%M') if value else None
+
+
+def today_board(user_id, day, department=None):
+    """
+    Every active teacher's attendance on `day`
+
+    Args:
+        user_id (int): Owning admin
+        day (date): Usually today
+        department (str): Only teachers of this department
+
+    Returns:
+        dict: date, school_day, counts per status ('Not recorded' for teachers
+            without a row) and columns (one list per name in COLUMNS)
+    """
+    query = select(
+        Teacher.unique_id, Teacher.name, Teacher.department,
+        Attendance.status, Attendance.check_in_time, Attendance.check_out_time
+    ).outerjoin(
+        Attendance, and_(Attendance.teacher_id == Teacher.id, Attendance.date == day)
+    ).where(Teacher.user_id == user_id, Teacher.is_active == True)
+    if department:
+        query = query.where(Teacher.department == department)
+    rows = db.session.execute(query.order_by(Teacher.name)).all()
+
+    unique_ids, names, departments, statuses, check_ins, check_outs = ([] for _ in COLUMNS)
+    for unique_id, name, teacher_department, status, check_in, check_out in rows:
+        unique_ids.append(unique_id)
+        names.append(name)
+        departments.append(teacher_department)
+        statuses.append(status)
+        check_ins.append(_clock(check_in))
+        check_outs.append(_clock(check_out))
+
+    counts = Counter(status or 'Not recorded' for status in statuses)
+    counts['Checked out'] = sum(1 for check_out in check_outs if check_out)
+    return {
+        'date': day.isoformat(),
+        'school_day': calendar_store.is_working(user_id, day),
+        'counts': dict(counts),
+        'columns': dict(zip(COLUMNS, (unique_ids, names, departments, statuses, check_ins, check_outs))),
+    }
@@ -0,0 +1,153 @@
+import os
+import socket
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from models import db, TeacherIdBlock
+
+# Crockford base32: no I, L, O or U, so IDs survive being read aloud or retyped
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+BASE = len(ALPHABET)
+DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+
+# Legacy IDs are lowercase hex, so an uppercase prefix keeps the two spaces disjoint
+PREFIX = 'T'
+MIN_BODY_LENGTH = 6
+
+DEFAULT_BLOCK_SIZE = 100
+# Attempts at reserving a block when another worker takes the same range first
+RESERVE_ATTEMPTS = 5
+
+
+def _check_character(body):
+    """Luhn mod 32 check character; catches every single-character error and most swaps"""
+    factor = 2
+    total = 0
+    for char in reversed(body):
+        addend = factor * DIGITS[char]
+        total += addend // BASE + addend % BASE
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(BASE - total % BASE) % BASE]
+
+
+def encode_teacher_id(number):
+    """
+    Encode a sequence number as a checksummed teacher ID
+
+    Args:
+        number (int): Non-negative sequence number
+
+    Returns:
+        str: e.g. 'T0000Z8H' for 1000 - prefix, base32 body, check character
+    """
+    digits = []
+    while True:
+        number, remainder = divmod(number, BASE)
+        digits.append(ALPHABET[remainder])
+        if not number:
+            break
+    body = ''.join(reversed(digits)).rjust(MIN_BODY_LENGTH, '0')
+    return f'{PREFIX}{body}{_check_character(body)}'
+
+
+def decode_teacher_id(teacher_unique_id):
+    """
+    Decode a checksummed teacher ID back to its sequence number
+
+    Returns:
+        int or None: The sequence number, or None if the ID is malformed
+    """
+    candidate = (teacher_unique_id or '').upper()
+    body, check = candidate[1:-1], candidate[-1:]
+    if not candidate.startswith(PREFIX) or len(body) < MIN_BODY_LENGTH:
+        return None
+    if any(char not in DIGITS for char in body) or check != _check_character(body):
+        return None
+    number = 0
+    for char in body:
+        number = number * BASE + DIGITS[char]
+    return number
+
+
+def normalize_teacher_id(teacher_unique_id):
+    """
+    Canonicalize a scanned or typed teacher ID
+
+    Returns:
+        str or None: The ID to look up, or None if it is a corrupt allocator ID
+            (legacy IDs are returned unchanged)
+    """
+    if teacher_unique_id[:1] not in ('T', 't'):
+        return teacher_unique_id
+    if decode_teacher_id(teacher_unique_id) is None:
+        return None
+    return teacher_unique_id.upper()
+
+
+class TeacherIdAllocator:
+    """Hands out unique teacher IDs from blocks reserved in the database"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = None
+
+    def _reserve_block(self):
+        """
+        Reserve the next block on its own connection so it survives a caller's rollback
+
+        The block starts at the highest reserved end, read and written by one
+        INSERT ... SELECT, so ranges never overlap even when workers use
+        different block sizes. Two workers racing for the same start hit the
+        unique range_start and the loser tries again.
+        """
+        block_size = current_app.config.get('TEACHER_ID_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+        blocks = TeacherIdBlock.__table__
+        highest = func.coalesce(func.max(blocks.c.range_end), 0)
+        statement = insert(TeacherIdBlock).from_select(
+            ['range_start', 'range_end', 'reserved_by', 'reserved_at'],
+            select(highest, highest + block_size,
+                   literal(f'{socket.gethostname()}:{os.getpid()}'), literal(datetime.utcnow()))
+        )
+        for attempt in range(RESERVE_ATTEMPTS):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(statement)
+                    # Still ours until commit: a racing insert computed the same start and waits on it
+                    start, end = connection.execute(
+                        select(blocks.c.range_start, blocks.c.range_end).order_by(blocks.c.range_end.desc()).limit(1)
+                    ).one()
+                break
+            except IntegrityError:
+                if attempt == RESERVE_ATTEMPTS - 1:
+                    raise
+        self._next = start
+        self._end = end
+        self._pid = os.getpid()
+
+    def allocate(self, count):
+        """
+        Allocate `count` new teacher IDs
+
+        Call this before opening a write transaction: on SQLite, reserving a
+        block while the session holds the write lock would wait on itself.
+        """
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                # A forked worker must not reuse the block inherited from its parent
+                if self._pid != os.getpid() or self._next >= self._end:
+                    self._reserve_block()
+                ids.append(encode_teacher_id(self._next))
+                self._next += 1
+        return ids
+
+    def next_id(self):
+        """Allocate a single teacher ID"""
+        return self.allocate(1)[0]
+
+# Global instance
+teacher_id_allocator = TeacherIdAllocator()
@@ -0,0 +1,159 @@
+"""
+Roster snapshots and deltas so kiosks can validate QR codes locally
+
+A kiosk downloads its school's roster once (unique ID, name, active flag)
+together with a version token. It then asks only for what changed since that
+version. The kiosk rejects unknown codes and greets teachers by name without
+a round trip, and only posts the check-in itself.
+
+Changes come from roster_changes, an append-only log written with every
+teacher insert and delete. Deleted teachers stay in the log as tombstones. A
+delta is one range scan of the (user_id, version) index.
+
+The log lives on the primary even when teachers are sharded. One commit
+can't cover the shard and the primary, so with sharding on the log writes are
+held until the caller's session has committed the teachers, then written in
+their own primary transaction; a rollback drops them. The two databases can
+only diverge one way: if that second transaction fails (it is logged), the
+teachers exist but kiosks holding a snapshot don't hear of them until they
+download a fresh one. Kiosks never receive a teacher whose insert was rolled
+back. Without sharding the log is written in the caller's
+transaction.
+
+Versions must follow commit order. Otherwise a change holding a lower number
+could commit after a kiosk had already seen a higher one, and the kiosk
+would never receive it. Sequence or autoincrement IDs do not guarantee that
+on PostgreSQL. Each write therefore bumps the school's row in roster_versions
+with an UPDATE. The row lock is held until commit, so the next writer of the
+same school waits and gets the next number only after this one is visible.
+As a result, roster writes of one school are serialized. Writes of different
+schools are not affected.
+"""
+import logging
+from sqlalchemy import event, insert, select, update
+from models import db, Teacher, RosterChange, RosterVersion
+from utils.db_dialect import insert_ignoring_conflicts
+from utils.db_routing import RoutingSession
+from utils.tenant_shards import sharding_enabled
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('unique_id', 'name', 'is_active')
+
+# Session.info key holding log writes that wait for the caller's commit
+PENDING_KEY = 'kiosk_roster_pending'
+
+
+def _next_version(connection, user_id):
+    """Bump and return the school's roster version; the row stays locked until the transaction commits"""
+    connection.execute(insert_ignoring_conflicts(RosterVersion).values(user_id=user_id, version=0))
+    connection.execute(update(RosterVersion).where(RosterVersion.user_id == user_id)
+                       .values(version=RosterVersion.version + 1))
+    return connection.execute(select(RosterVersion.version).where(RosterVersion.user_id == user_id)).scalar()
+
+
+def _append(connection, user_id, rows):
+    """Write rows to the log under a new version"""
+    version = _next_version(connection, user_id)
+    connection.execute(insert(RosterChange), [dict(row, version=version) for row in rows])
+
+
+def _record(user_id, rows):
+    """Log rows now, or once the caller's commit has reached the tenant shard"""
+    if not rows:
+        return
+    if sharding_enabled():
+        db.session.info.setdefault(PENDING_KEY, []).append((user_id, rows))
+    else:
+        _append(db.session, user_id, rows)
+
+
+def record_changes(user_id, teachers):
+    """
+    Log added teachers with the caller's transaction
+
+    Args:
+        user_id (int): Owning admin
+        teachers (iterable): Dicts with unique_id, name and optionally is_active
+    """
+    _record(user_id, [{'user_id': user_id, 'unique_id': teacher['unique_id'], 'name': teacher['name'],
+                       'is_active': bool(teacher.get('is_active', True)), 'deleted': False}
+                      for teacher in teachers])
+
+
+def record_deleted(user_id, unique_ids):
+    """Log deleted teachers as tombstones with the caller's transaction"""
+    _record(user_id, [{'user_id': user_id, 'unique_id': unique_id, 'name': None, 'is_active': False, 'deleted': True}
+                      for unique_id in unique_ids])
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _write_log(session):
+    """The teacher rows are committed on their shard; now tell the kiosks"""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        with db.engine.begin() as connection:
+            for user_id, rows in pending:
+                _append(connection, user_id, rows)
+    except Exception:
+        logger.exception('Roster log update failed for %s', pending)
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _drop_log_writes(session, previous_transaction):
+    """Nothing was committed, so kiosks have nothing to hear about"""
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+
+
+def current_version(user_id):
+    """The school's latest committed roster version, 0 before the first change"""
+    return db.session.execute(
+        select(RosterVersion.version).where(RosterVersion.user_id == user_id)
+    ).scalar() or 0
+
+
+def roster_snapshot(user_id):
+    """
+    Every teacher of a school as compact rows
+
+    The version is read before the roster, so a change committed in between
+    is also returned by the next delta; applying it twice is harmless.
+
+    Returns:
+        dict: version, fields and teachers ([unique_id, name, is_active] lists)
+    """
+    version = current_version(user_id)
+    rows = db.session.execute(
+        select(Teacher.unique_id, Teacher.name, Teacher.is_active).where(Teacher.user_id == user_id)
+    ).all()
+    return {'version': version, 'fields': list(FIELDS), 'teachers': [list(row) for row in rows]}
+
+
+def roster_changes(user_id, since):
+    """
+    What changed in a school's roster after version `since`
+
+    Several changes to one teacher collapse into the latest.
+
+    Returns:
+        dict: version (pass it as `since` next time), upserts ([unique_id, name,
+            is_active] lists) and deletes (unique IDs)
+    """
+    latest = {}
+    version = since
+    for change_version, unique_id, name, is_active, deleted in db.session.execute(
+        select(RosterChange.version, RosterChange.unique_id, RosterChange.name, RosterChange.is_active, RosterChange.deleted)
+        .where(RosterChange.user_id == user_id, RosterChange.version > since)
+        .order_by(RosterChange.version, RosterChange.id)
+    ):
+        latest.pop(unique_id, None)
+        latest[unique_id] = None if deleted else [unique_id, name, is_active]
+        version = change_version
+    return {
+        'version': version,
+        'upserts': [row for row in latest.values() if row is not None],
+        'deletes': [unique_id for unique_id, row in latest.items() if row is None],
+    }
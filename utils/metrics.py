@@ -0,0 +1,202 @@
+"""
+Prometheus metrics for the scan path, notifications and QR rendering
+
+Instrumentation is a few counter increments per request, and nothing at all
+when prometheus_client is not installed or METRICS_ENABLED is off. Under
+gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR (set by
+gunicorn.conf.py) and /metrics adds them up across workers.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds; scans take single-digit milliseconds, notifications and reports far longer
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+class Metrics:
+    """Holds the metric objects; every observe method is a no-op until enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self._unavailable = False
+        self._lock = threading.Lock()
+
+    def _create(self):
+        """Create the metric objects once per process; returns False without prometheus_client"""
+        with self._lock:
+            if self.enabled:
+                return True
+            if self._unavailable:
+                return False
+            try:
+                from prometheus_client import Counter, Histogram
+            except ImportError:
+                logger.warning('prometheus_client is not installed; /metrics is disabled')
+                self._unavailable = True
+                return False
+            self.request_seconds = Histogram(
+                'attendance_request_duration_seconds', 'Request latency by endpoint',
+                ['endpoint', 'method'], buckets=LATENCY_BUCKETS)
+            self.requests = Counter(
+                'attendance_requests_total', 'Requests by endpoint and status code',
+                ['endpoint', 'method', 'status'])
+            self.db_queries = Histogram(
+                'attendance_db_queries_per_request', 'Database statements executed per request',
+                ['endpoint'], buckets=QUERY_COUNT_BUCKETS)
+            self.db_seconds = Histogram(
+                'attendance_db_query_seconds_per_request', 'Time spent in database statements per request',
+                ['endpoint'], buckets=LATENCY_BUCKETS)
+            self.notification_seconds = Histogram(
+                'attendance_notification_duration_seconds', 'Notification send latency',
+                ['provider', 'kind'], buckets=LATENCY_BUCKETS)
+            self.notification_failures = Counter(
+                'attendance_notification_failures_total', 'Notifications that were not delivered',
+                ['provider', 'kind'])
+            self.qr_render_seconds = Histogram(
+                'attendance_qr_render_seconds', 'QR image render time (cache misses only)',
+                ['format'], buckets=LATENCY_BUCKETS)
+            self.scans = Counter(
+                'attendance_scans_total', 'Check-in and check-out outcomes',
+                ['action', 'outcome'])
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _query_failed)
+            self.enabled = True
+            return True
+
+    def init_app(self, app):
+        """
+        Time every request of `app` once METRICS_ENABLED is set
+
+        prometheus_client is imported by the first request, not at start-up.
+
+        Args:
+            app (Flask): Application to instrument
+
+        Returns:
+            bool: True when METRICS_ENABLED is set
+        """
+        if not app.config.get('METRICS_ENABLED'):
+            return False
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        return True
+
+    def _start_request(self):
+        if self.enabled or self._create():
+            g.metrics_started = time.perf_counter()
+            g.metrics_db = (0, 0.0)
+
+    def _finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.request_seconds.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        self.requests.labels(endpoint, request.method, str(response.status_code)).inc()
+        queries, seconds = g.pop('metrics_db', (0, 0.0))
+        self.db_queries.labels(endpoint).observe(queries)
+        self.db_seconds.labels(endpoint).observe(seconds)
+        return response
+
+    def observe_notification(self, provider, kind, seconds, failures):
+        if self.enabled:
+            self.notification_seconds.labels(provider, kind).observe(seconds)
+            if failures:
+                self.notification_failures.labels(provider, kind).inc(failures)
+
+    def observe_qr_render(self, image_format, seconds):
+        if self.enabled:
+            self.qr_render_seconds.labels(image_format).observe(seconds)
+
+    def counted_scan(self, action):
+        """
+        Decorator counting check-in/check-out results by attendance status, or as refused
+
+        Args:
+            action (str): 'check_in' or 'check_out'
+
+        Returns:
+            callable: Decorator for functions returning {'success': ..., 'status': ...} dicts
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                result = function(*args, **kwargs)
+                if self.enabled:
+                    if result.get('success'):
+                        outcome = result.get('status') or 'Checked Out'
+                    else:
+                        outcome = 'Refused'
+                    self.scans.labels(action, outcome).inc()
+                return result
+            return wrapper
+        return decorator
+
+    def timed_notification(self, kind):
+        """
+        Decorator for notification methods returning {'success': ...} dicts (or lists of them)
+
+        Args:
+            kind (str): Label for the notification type
+
+        Returns:
+            callable: Decorator recording latency and failures under the instance's class name
+        """
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(service, *args, **kwargs):
+                if not self.enabled:
+                    return method(service, *args, **kwargs)
+                start = time.perf_counter()
+                result = None
+                try:
+                    result = method(service, *args, **kwargs)
+                    return result
+                finally:
+                    results = result if isinstance(result, list) else [result]
+                    failures = sum(1 for item in results if not (item or {}).get('success'))
+                    self.observe_notification(type(service).__name__, kind, time.perf_counter() - start, failures)
+            return wrapper
+        return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if has_request_context() and 'metrics_db' in g:
+        queries, seconds = g.metrics_db
+        g.metrics_db = (queries + 1, seconds + elapsed)
+
+
+def _query_failed(context):
+    starts = context.connection.info.get('metrics_query_start') if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def metrics_registry():
+    """Registry to expose: the per-worker files under gunicorn, else this process's metrics"""
+    from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+# Global instance
+metrics = Metrics()
@@ -1,64 +1,188 @@
-import qrcode
 import os
+import hashlib
+from functools import cached_property, lru_cache
 from io import BytesIO
 import base64
+import time
+from werkzeug.local import LocalProxy
+from utils.metrics import metrics
 
 class QRCodeGenerator:
     """Utility class for generating and managing QR codes"""
-    
+
+    # Default rendering parameters
+    DEFAULT_BOX_SIZE = 10
+    DEFAULT_BORDER = 4
+
+    # Per-channel output: pages scale the SVG, email clients need a small PNG
+    WEB_FORMAT = 'svg'
+    EMAIL_BOX_SIZE = 8
+
+    # Teacher ID rendered to fingerprint the renderer (see render_version)
+    RENDER_PROBE_ID = 'T0000000'
+
+    # MIME types for the supported output formats
+    MIME_TYPES = {
+        'png': 'image/png',
+        'svg': 'image/svg+xml'
+    }
+
     def __init__(self, qr_folder='static/qrcodes'):
         self.qr_folder = qr_folder
-        self._ensure_qr_folder()
-    
-    def _ensure_qr_folder(self):
-        """Ensure the QR codes folder exists"""
-        if not os.path.exists(self.qr_folder):
-            os.makedirs(self.qr_folder)
-    
-    def generate_qr_code(self, teacher_unique_id, teacher_name):
+
+    @cached_property
+    def render_version(self):
         """
-        Generate QR code for a teacher
-        
-        Args:
-            teacher_unique_id (str): Unique identifier for the teacher
-            teacher_name (str): Teacher's name for display purposes
-            
+        Fingerprint of the current rendering, computed once per worker
+
+        Pages link to /qr/<id>.<fmt>?v=<render_version>, and only that exact URL
+        is cached as immutable. The fingerprint hashes a probe image in every
+        format, so any change to the renderer or the qrcode/Pillow output
+        yields new URLs without anyone having to remember a version bump.
+
         Returns:
-            tuple: (qr_filename, qr_data_url)
+            str: 16 hex characters
         """
+        digest = hashlib.sha256()
+        for image_format in sorted(self.MIME_TYPES):
+            data, _ = self.render_qr_code(self.RENDER_PROBE_ID, image_format)
+            digest.update(data)
+        return digest.hexdigest()[:16]
+
+    def _ensure_qr_folder(self):
+        """Ensure the QR codes folder exists"""
+        os.makedirs(self.qr_folder, exist_ok=True)
+
+    def _make_matrix(self, teacher_unique_id, border=DEFAULT_BORDER):
+        """Build the QR module matrix (including the quiet zone) for a teacher"""
+        # Imported on first render so worker boot doesn't pay for qrcode/Pillow
+        import qrcode
+
         # Create QR code data
         qr_data = f"TEACHER:{teacher_unique_id}"
-        
+
         # Generate QR code
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
+            border=border,
         )
         qr.add_data(qr_data)
         qr.make(fit=True)
-        
-        # Create QR code image
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-        
+        return qr.get_matrix()
+
+    def render_qr_code(self, teacher_unique_id, image_format='png', box_size=DEFAULT_BOX_SIZE,
+                       border=DEFAULT_BORDER):
+        """
+        Render a teacher's QR code to bytes, memoized per worker
+
+        Args:
+            teacher_unique_id (str): Unique identifier for the teacher
+            image_format (str): 'png' or 'svg'
+            box_size (int): Pixels per QR module
+            border (int): Quiet zone width in modules
+
+        Returns:
+            tuple: (image_bytes, etag) where etag is a hash of the image bytes
+        """
+        if image_format not in self.MIME_TYPES:
+            raise ValueError(f'Unsupported QR image format: {image_format}')
+        return _render_cached(self, teacher_unique_id, image_format, box_size, border)
+
+    def _render_uncached(self, teacher_unique_id, image_format, box_size, border):
+        """Render QR code bytes without consulting the cache"""
+        start = time.perf_counter()
+        matrix = self._make_matrix(teacher_unique_id, border)
+        if image_format == 'svg':
+            data = self._matrix_to_svg(matrix, box_size)
+        else:
+            data = self._matrix_to_png(matrix, box_size)
+        etag = hashlib.sha256(data).hexdigest()[:32]
+        metrics.observe_qr_render(image_format, time.perf_counter() - start)
+        return data, etag
+
+    @staticmethod
+    def _matrix_to_png(matrix, box_size):
+        """Encode a module matrix as a 1-bit palette PNG"""
+        from PIL import Image
+
+        modules = len(matrix)
+        image = Image.new('P', (modules, modules))
+        image.putpalette([255, 255, 255, 0, 0, 0])
+        image.putdata([1 if dark else 0 for row in matrix for dark in row])
+        if box_size > 1:
+            image = image.resize((modules * box_size, modules * box_size), Image.NEAREST)
+        buffer = BytesIO()
+        image.save(buffer, format='PNG', optimize=True, bits=1)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _matrix_to_svg(matrix, box_size):
+        """Encode a module matrix as a single-path SVG, one stroke per run of dark modules"""
+        modules = len(matrix)
+        segments = []
+        for y, row in enumerate(matrix):
+            x = 0
+            while x < modules:
+                if not row[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < modules and row[x]:
+                    x += 1
+                segments.append(f'M{start} {y}.5h{x - start}')
+        size = modules * box_size
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+            f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+            f'<rect width="100%" height="100%" fill="#fff"/>'
+            f'<path stroke="#000" d="{"".join(segments)}"/></svg>'
+        ).encode()
+
+    def save_qr_code(self, teacher_unique_id):
+        """
+        Write a teacher's email-sized PNG QR code to the QR folder
+
+        Args:
+            teacher_unique_id (str): Unique identifier for the teacher
+
+        Returns:
+            str: Path of the written file
+        """
+        data, _ = self.render_qr_code(teacher_unique_id, 'png', box_size=self.EMAIL_BOX_SIZE)
+        filepath = self.get_qr_code_path(teacher_unique_id)
+        self._ensure_qr_folder()
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        return filepath
+
+    def generate_qr_code(self, teacher_unique_id, teacher_name):
+        """
+        Generate QR code for a teacher
+
+        Args:
+            teacher_unique_id (str): Unique identifier for the teacher
+            teacher_name (str): Teacher's name for display purposes
+
+        Returns:
+            tuple: (qr_filename, qr_data_url)
+        """
         # Save to file
-        filename = f"teacher_{teacher_unique_id}.png"
-        filepath = os.path.join(self.qr_folder, filename)
-        qr_image.save(filepath)
-        
+        filepath = self.save_qr_code(teacher_unique_id)
+        filename = os.path.basename(filepath)
+
         # Generate data URL for web display
-        buffer = BytesIO()
-        qr_image.save(buffer, format='PNG')
-        qr_data_url = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
-        
+        data, _ = self.render_qr_code(teacher_unique_id, self.WEB_FORMAT)
+        mime_type = self.MIME_TYPES[self.WEB_FORMAT]
+        qr_data_url = f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+
         return filename, qr_data_url
-    
+
     def get_qr_code_path(self, teacher_unique_id):
         """Get the file path for a teacher's QR code"""
         filename = f"teacher_{teacher_unique_id}.png"
         return os.path.join(self.qr_folder, filename)
-    
+
     def delete_qr_code(self, teacher_unique_id):
         """Delete QR code file for a teacher"""
         filepath = self.get_qr_code_path(teacher_unique_id)
@@ -67,5 +191,16 @@ class QRCodeGenerator:
             return True
         return False
 
-# Global instance
-qr_generator = QRCodeGenerator() 
\ No newline at end of file
+
+@lru_cache(maxsize=2048)
+def _render_cached(generator, teacher_unique_id, image_format, box_size, border):
+    # QR content depends only on the unique ID, so rendered bytes never go stale
+    return generator._render_uncached(teacher_unique_id, image_format, box_size, border)
+
+@lru_cache(maxsize=None)
+def get_qr_generator():
+    """Build the shared QRCodeGenerator on first use"""
+    return QRCodeGenerator()
+
+# Global instance, constructed on first use
+qr_generator = LocalProxy(get_qr_generator)
@@ -0,0 +1,186 @@
+"""
+Re-classify stored attendance after a school changes its schedule
+
+Attendance.status is decided once, at scan time. When a school moves its
+on-time or late cutoff, `flask reclassify-attendance` recomputes the status of
+every stored check-in against the school's current schedule (per weekday) and
+writes back only the rows that changed.
+
+Check-ins are streamed a group of teachers at a time. Each chunk becomes a
+NumPy datetime64 array, and the statuses are computed with array comparisons
+against per-weekday window arrays. Changed rows go back as one UPDATE ... WHERE
+id IN (...) per status and batch, never row by row. Needs numpy.
+"""
+import time
+from collections import Counter
+from sqlalchemy import func, select, update
+from models import db, Teacher, Attendance, Schedule
+from utils.schedules import compile_schedule
+
+# Check-ins read per chunk (approximate: chunks are whole teachers)
+CHUNK_SIZE = 50000
+# IDs per IN (...) list, kept under SQLite's bound-parameter limit
+ID_BATCH = 500
+# Changed rows listed in a dry run
+SAMPLE_SIZE = 20
+
+# Array codes; index into STATUSES
+STATUSES = ('On Time', 'Late', 'Absent')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+UNKNOWN = len(STATUSES)
+
+
+class ReclassifyError(RuntimeError):
+    """Raised when re-classification cannot run"""
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ReclassifyError('Re-classification requires the numpy package')
+    return numpy
+
+
+def _microseconds(value):
+    """Time of day in microseconds"""
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+def window_arrays(np, schedule):
+    """
+    A compiled schedule as three arrays indexed by weekday
+
+    Returns:
+        tuple: (on-time start, on-time end, late end) in microseconds after midnight
+    """
+    return tuple(
+        np.array([_microseconds(getattr(day, field)) for day in schedule.days], dtype=np.int64)
+        for field in ('on_time_start', 'on_time_end', 'late_end')
+    )
+
+
+def classify(np, check_ins, windows):
+    """
+    Statuses for many check-ins at once, matching DaySchedule.status
+
+    Args:
+        np: The numpy module
+        check_ins (numpy.ndarray): datetime64[us] check-in times
+        windows (tuple): window_arrays() of the school's schedule
+
+    Returns:
+        numpy.ndarray: int8 codes into STATUSES
+    """
+    days = check_ins.astype('datetime64[D]')
+    time_of_day = (check_ins - days).astype(np.int64)
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekdays = (days.astype(np.int64) + 3) % 7
+    on_time_start, on_time_end, late_end = (window[weekdays] for window in windows)
+    codes = np.full(len(check_ins), STATUS_CODES['Absent'], dtype=np.int8)
+    codes[(time_of_day > on_time_end) & (time_of_day <= late_end)] = STATUS_CODES['Late']
+    codes[(time_of_day >= on_time_start) & (time_of_day <= on_time_end)] = STATUS_CODES['On Time']
+    return codes
+
+
+def reclassify_tenant(user_id, since=None, until=None, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Re-classify one school's check-ins against its current schedule
+
+    Run inside use_tenant(user_id) when TENANT_SHARDING is on. Each chunk's
+    updates are committed on their own, so a long run never holds the write
+    lock for more than one chunk.
+
+    Args:
+        user_id (int): Owning admin
+        since (date): First attendance date to consider (default: all history)
+        until (date): Last attendance date to consider
+        dry_run (bool): Count and sample the changes without writing them
+        chunk_size (int): Check-ins read per chunk
+
+    Returns:
+        dict: examined and changed row counts, transitions {(old, new): count},
+        samples of changed rows (dry run only) and elapsed seconds
+
+    Raises:
+        ReclassifyError: When numpy is not installed
+    """
+    np = _numpy()
+    start = time.perf_counter()
+    windows = window_arrays(np, compile_schedule(Schedule.query.filter_by(user_id=user_id).all()))
+
+    attendance = Attendance.__table__
+    teachers = Teacher.__table__
+    conditions = [attendance.c.check_in_time.isnot(None)]
+    if since:
+        conditions.append(attendance.c.date >= since)
+    if until:
+        conditions.append(attendance.c.date <= until)
+
+    # Chunks are groups of teachers sized to about chunk_size check-ins, read
+    # through the (teacher_id, date) index; paging on attendance.id instead would
+    # sort the school's whole history again for every chunk.
+    teacher_ids = db.session.execute(
+        select(teachers.c.id).where(teachers.c.user_id == user_id).order_by(teachers.c.id)
+    ).scalars().all()
+    total = db.session.execute(
+        select(func.count()).select_from(attendance).where(
+            attendance.c.teacher_id.in_(select(teachers.c.id).where(teachers.c.user_id == user_id)), *conditions)
+    ).scalar() if teacher_ids else 0
+    per_chunk = min(ID_BATCH, max(1, chunk_size * len(teacher_ids) // max(total, 1)))
+    query = select(attendance.c.id, attendance.c.check_in_time, attendance.c.status).where(*conditions)
+
+    examined = 0
+    transitions = Counter()
+    samples = []
+    for chunk_start in range(0, len(teacher_ids), per_chunk):
+        rows = db.session.execute(
+            query.where(attendance.c.teacher_id.in_(teacher_ids[chunk_start:chunk_start + per_chunk]))
+        ).all()
+        if not rows:
+            continue
+        ids, check_ins, statuses = zip(*rows)
+        ids = np.array(ids, dtype=np.int64)
+        old = np.array([STATUS_CODES.get(status, UNKNOWN) for status in statuses], dtype=np.int8)
+        new = classify(np, np.array(check_ins, dtype='datetime64[us]'), windows)
+        changed = np.flatnonzero(old != new)
+
+        pairs, counts = np.unique(old[changed].astype(np.int16) * len(STATUSES) + new[changed], return_counts=True)
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            transitions[(_label(pair // len(STATUSES)), STATUSES[pair % len(STATUSES)])] += count
+
+        if dry_run:
+            for index in changed[:SAMPLE_SIZE - len(samples)].tolist():
+                samples.append({
+                    'id': int(ids[index]),
+                    'check_in_time': check_ins[index],
+                    'old': statuses[index],
+                    'new': STATUSES[new[index]],
+                })
+        else:
+            for code, status in enumerate(STATUSES):
+                targets = ids[changed[new[changed] == code]].tolist()
+                for batch_start in range(0, len(targets), ID_BATCH):
+                    db.session.execute(
+                        update(attendance)
+                        .where(attendance.c.id.in_(targets[batch_start:batch_start + ID_BATCH]))
+                        .values(status=status)
+                    )
+            db.session.commit()
+
+        examined += len(rows)
+
+    if dry_run:
+        db.session.rollback()
+    return {
+        'user_id': user_id,
+        'examined': examined,
+        'changed': sum(transitions.values()),
+        'transitions': dict(transitions),
+        'samples': samples,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _label(code):
+    return STATUSES[code] if code < len(STATUSES) else 'unknown'
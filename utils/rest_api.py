@@ -0,0 +1,180 @@
+"""
+Queries behind the versioned /api/v1 endpoints
+
+Each endpoint selects only the columns named in ?fields=, so a payroll export
+that needs unique_id and status never reads or serializes names and
+timestamps. Pages use keyset cursors instead of OFFSET: the cursor holds the
+sort key of the last row returned, and the next page starts right after it
+through an index. Page 500 costs the same as page 1, and rows written
+between requests do not shift the pages.
+
+Teachers are ordered by id. Attendance is ordered by (teacher_id, date), the
+unique constraint's index, so no tie-breaker column is needed.
+"""
+import base64
+import json
+from datetime import date
+from sqlalchemy import and_, or_, select
+from models import db, Teacher, Attendance
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+TEACHER_FIELDS = {
+    'id': Teacher.id,
+    'unique_id': Teacher.unique_id,
+    'name': Teacher.name,
+    'email': Teacher.email,
+    'department': Teacher.department,
+    'phone_number': Teacher.phone_number,
+    'created_at': Teacher.created_at,
+    'is_active': Teacher.is_active,
+}
+
+ATTENDANCE_FIELDS = {
+    'id': Attendance.id,
+    'teacher_unique_id': Teacher.unique_id,
+    'teacher_name': Teacher.name,
+    'department': Teacher.department,
+    'date': Attendance.date,
+    'check_in_time': Attendance.check_in_time,
+    'check_out_time': Attendance.check_out_time,
+    'status': Attendance.status,
+    'created_at': Attendance.created_at,
+    'updated_at': Attendance.updated_at,
+}
+ATTENDANCE_DEFAULT_FIELDS = ('id', 'teacher_unique_id', 'date', 'check_in_time', 'check_out_time', 'status')
+
+
+class ApiError(ValueError):
+    """Raised for request parameters the API cannot use; the message is returned to the client"""
+
+
+def parse_fields(value, allowed, default):
+    """
+    Field names from a comma-separated ?fields= value
+
+    Raises:
+        ApiError: When a name is not one of `allowed`
+    """
+    if not value:
+        return tuple(default)
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise ApiError(f"Unknown field(s) {', '.join(unknown) or '(none)'}; choose from {', '.join(allowed)}")
+    return names
+
+
+def parse_limit(value):
+    """Page size from ?limit=, defaulting to DEFAULT_LIMIT and capped at MAX_LIMIT"""
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError('limit must be a number')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def encode_cursor(key):
+    """Opaque cursor for a sort key (a list of JSON values)"""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """
+    Sort key from a cursor made by encode_cursor()
+
+    Raises:
+        ApiError: When the cursor was not produced by this API
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ApiError('Invalid cursor')
+    if not isinstance(key, list) or len(key) != length:
+        raise ApiError('Invalid cursor')
+    return key
+
+
+def _page(rows, fields, limit, key):
+    """Rows (requested columns followed by the sort key) as dicts plus the next cursor"""
+    width = len(fields)
+    data = [dict(zip(fields, row[:width])) for row in rows[:limit]]
+    next_cursor = encode_cursor(key(rows[limit - 1][width:])) if len(rows) > limit else None
+    return {'data': data, 'next_cursor': next_cursor}
+
+
+def teacher_page(user_id, fields, limit, cursor=None, department=None, include_inactive=False):
+    """
+    One page of an admin's teachers, ordered by id
+
+    Returns:
+        dict: data (list of dicts with only `fields`) and next_cursor (None on the last page)
+    """
+    query = select(*(TEACHER_FIELDS[name] for name in fields), Teacher.id).where(Teacher.user_id == user_id)
+    if not include_inactive:
+        query = query.where(Teacher.is_active == True)
+    if department:
+        query = query.where(Teacher.department == department)
+    if cursor:
+        last_id, = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise ApiError('Invalid cursor')
+        query = query.where(Teacher.id > last_id)
+    rows = db.session.execute(query.order_by(Teacher.id).limit(limit + 1)).all()
+    return _page(rows, fields, limit, lambda key: [key[0]])
+
+
+def teacher_detail(user_id, unique_id, fields):
+    """One of the admin's teachers by unique ID as a dict of `fields`, or None"""
+    row = db.session.execute(
+        select(*(TEACHER_FIELDS[name] for name in fields))
+        .where(Teacher.user_id == user_id, Teacher.unique_id == unique_id)
+    ).first()
+    return dict(zip(fields, row)) if row else None
+
+
+def attendance_page(user_id, fields, limit, cursor=None, since=None, until=None, teacher=None, status=None):
+    """
+    One page of an admin's attendance records, ordered by teacher then date
+
+    Args:
+        user_id (int): Owning admin
+        fields (tuple): Names from ATTENDANCE_FIELDS
+        limit (int): Page size
+        cursor (str): next_cursor of the previous page
+        since (date): First date
+        until (date): Last date
+        teacher (str): Only this teacher's unique ID
+        status (str): Only On Time, Late or Absent records
+
+    Returns:
+        dict: data (list of dicts with only `fields`) and next_cursor (None on the last page)
+    """
+    query = select(
+        *(ATTENDANCE_FIELDS[name] for name in fields), Attendance.teacher_id, Attendance.date
+    ).join(Teacher, Attendance.teacher_id == Teacher.id).where(Teacher.user_id == user_id)
+    if since:
+        query = query.where(Attendance.date >= since)
+    if until:
+        query = query.where(Attendance.date <= until)
+    if teacher:
+        query = query.where(Teacher.unique_id == teacher)
+    if status:
+        query = query.where(Attendance.status == status)
+    if cursor:
+        last_teacher, last_date = decode_cursor(cursor, 2)
+        try:
+            if not isinstance(last_teacher, int):
+                raise TypeError
+            last_date = date.fromisoformat(last_date)
+        except (TypeError, ValueError):
+            raise ApiError('Invalid cursor')
+        # The >= bound lets the (teacher_id, date) index start the scan at the cursor
+        query = query.where(Attendance.teacher_id >= last_teacher, or_(
+            Attendance.teacher_id > last_teacher,
+            and_(Attendance.teacher_id == last_teacher, Attendance.date > last_date)))
+    rows = db.session.execute(query.order_by(Attendance.teacher_id, Attendance.date).limit(limit + 1)).all()
+    return _page(rows, fields, limit, lambda key: [key[0], key[1].isoformat()])
@@ -0,0 +1,264 @@
+"""
+Sampling profiler for live requests, written as collapsed stacks
+
+A background thread looks at the stacks of the threads serving profiled
+requests every few milliseconds (sys._current_frames) and counts them. The
+request itself runs unmodified, so the cost is one wake-up per interval while
+a profiled request is in flight and nothing otherwise.
+
+A request is profiled when its endpoint is listed, when it falls in the random
+sample, or when its endpoint is watched for slowness; watched requests are only
+kept if they exceed the latency threshold. Each kept profile becomes one
+instance/profiles/*.folded file, one "frame;frame;frame count" line per stack,
+ready for flamegraph.pl or speedscope.
+
+Settings start from the PROFILER_* config values and can be changed at runtime
+from /admin/profiler; they are stored in instance/profiles/settings.json so
+every gunicorn worker picks them up.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = 'profiles'
+SETTINGS_FILE = 'settings.json'
+PROFILE_SUFFIX = '.folded'
+MAX_STACK_DEPTH = 200
+# How often a worker looks for settings changed by another worker
+SETTINGS_CHECK_SECONDS = 1.0
+
+SETTING_KEYS = ('enabled', 'endpoints', 'sample_rate', 'slow_endpoints', 'slow_ms', 'interval_ms')
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(PROJECT_DIR):
+        filename = os.path.relpath(filename, PROJECT_DIR)
+    else:
+        # Library frames: keep the path from the package name on
+        marker = 'site-packages' + os.sep
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame):
+    """One stack as root;...;leaf, in the collapsed format flamegraph tools read"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Per-process sampler thread plus the settings deciding which requests it watches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._interval = 0.005
+        self._settings = None
+        self._settings_mtime = None
+        self._settings_checked = 0.0
+
+    # Settings
+
+    def default_settings(self, app):
+        config = app.config
+        return {
+            'enabled': bool(config.get('PROFILER_ENABLED')),
+            'endpoints': _split(config.get('PROFILER_ENDPOINTS', '')),
+            'sample_rate': float(config.get('PROFILER_SAMPLE_RATE', 0.0)),
+            'slow_endpoints': _split(config.get('PROFILER_SLOW_ENDPOINTS', '')),
+            'slow_ms': float(config.get('PROFILER_SLOW_MS', 500)),
+            'interval_ms': float(config.get('PROFILER_INTERVAL_MS', 5)),
+        }
+
+    def profile_dir(self, app=None):
+        app = app or current_app
+        return os.path.join(app.instance_path, PROFILE_DIR)
+
+    def settings(self, app=None):
+        """Current settings: config defaults overridden by the admin page's settings.json"""
+        app = app or current_app
+        now = time.monotonic()
+        if self._settings is not None and now - self._settings_checked < SETTINGS_CHECK_SECONDS:
+            return self._settings
+        self._settings_checked = now
+        path = os.path.join(self.profile_dir(app), SETTINGS_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if self._settings is None or mtime != self._settings_mtime:
+            settings = self.default_settings(app)
+            if mtime is not None:
+                try:
+                    with open(path) as f:
+                        settings.update({k: v for k, v in json.load(f).items() if k in SETTING_KEYS})
+                except (OSError, ValueError) as e:
+                    logger.warning('Ignoring unreadable profiler settings %s: %s', path, e)
+            self._settings = settings
+            self._settings_mtime = mtime
+        return self._settings
+
+    def save_settings(self, settings, app=None):
+        """
+        Store settings for every worker of this instance
+
+        Args:
+            settings (dict): Values for any of SETTING_KEYS
+            app (Flask): Application (default current_app)
+        """
+        app = app or current_app
+        directory = self.profile_dir(app)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, SETTINGS_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({k: v for k, v in settings.items() if k in SETTING_KEYS}, f, indent=2)
+        os.replace(path + '.tmp', path)
+        self._settings = None
+
+    def reset_settings(self, app=None):
+        """Drop runtime overrides and go back to the config values"""
+        path = os.path.join(self.profile_dir(app), SETTINGS_FILE)
+        if os.path.exists(path):
+            os.remove(path)
+        self._settings = None
+
+    # Sampling
+
+    def _ensure_sampler(self):
+        # A forked worker does not inherit the parent's thread
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._active = {}
+            self._wake = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self._interval)
+            with self._lock:
+                active = list(self._active.items())
+            frames = sys._current_frames()
+            for ident, stacks in active:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks[collapse_stack(frame)] += 1
+
+    def start(self, interval_ms):
+        """Start sampling the calling thread; returns the Counter its stacks go into"""
+        stacks = Counter()
+        with self._lock:
+            self._ensure_sampler()
+            self._interval = max(0.001, interval_ms / 1000.0)
+            self._active[threading.get_ident()] = stacks
+            self._wake.set()
+        return stacks
+
+    def stop(self):
+        """Stop sampling the calling thread"""
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            if not self._active:
+                self._wake.clear()
+
+    # Flask integration
+
+    def init_app(self, app):
+        """
+        Profile selected requests of `app`
+
+        Args:
+            app (Flask): Application to instrument
+        """
+        @app.before_request
+        def start_sampling():
+            settings = self.settings(app)
+            if not settings['enabled']:
+                return
+            endpoint = request.endpoint or ''
+            if endpoint in settings['endpoints'] or random.random() < settings['sample_rate']:
+                keep_after_ms = 0.0
+            elif endpoint in settings['slow_endpoints']:
+                keep_after_ms = settings['slow_ms']
+            else:
+                return
+            request.environ['profiler'] = (self.start(settings['interval_ms']), time.perf_counter(), keep_after_ms)
+
+        @app.teardown_request
+        def stop_sampling(exception=None):
+            sampled = request.environ.pop('profiler', None)
+            if sampled is None:
+                return
+            self.stop()
+            stacks, started, keep_after_ms = sampled
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= keep_after_ms and stacks:
+                try:
+                    self.write_profile(app, request.endpoint or 'unmatched', elapsed_ms, stacks)
+                except OSError as e:
+                    logger.warning('Could not write profile: %s', e)
+
+    def write_profile(self, app, endpoint, elapsed_ms, stacks):
+        """Write one request's stacks and prune the oldest files beyond PROFILER_MAX_FILES"""
+        directory = self.profile_dir(app)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{endpoint}-{int(elapsed_ms)}ms-{os.getpid()}{PROFILE_SUFFIX}"
+        with open(os.path.join(directory, name), 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+
+        profiles = self.list_profiles(app)
+        for old in profiles[app.config.get('PROFILER_MAX_FILES', 200):]:
+            try:
+                os.remove(os.path.join(directory, old['name']))
+            except OSError:
+                pass
+        return name
+
+    def list_profiles(self, app=None):
+        """
+        Captured profiles, newest first
+
+        Returns:
+            list: dicts with name, size and modified time
+        """
+        directory = self.profile_dir(app)
+        if not os.path.isdir(directory):
+            return []
+        profiles = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(PROFILE_SUFFIX):
+                stat = entry.stat()
+                profiles.append({
+                    'name': entry.name,
+                    'size': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime),
+                })
+        return sorted(profiles, key=lambda profile: profile['name'], reverse=True)
+
+
+def _split(value):
+    if isinstance(value, (list, tuple)):
+        return [item for item in value if item]
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+# Global instance
+sampling_profiler = SamplingProfiler()
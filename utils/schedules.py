@@ -0,0 +1,192 @@
+"""
+Per-school attendance schedules, compiled into a per-worker lookup
+
+Each admin (school) may store a default set of windows plus overrides for
+single weekdays in the schedules table. A school's rows are compiled once into
+a CompiledSchedule: an immutable tuple of seven DaySchedule entries indexed by
+weekday, so classifying a scan is a tuple index and a few time comparisons.
+
+Compiled schedules are cached per worker. Saving a schedule touches
+instance/schedules.stamp; every worker looks at the stamp at most once per
+SCHEDULE_CHECK_SECONDS and drops its cache when it changes, so scans never
+query the schedule except for the first scan of a school after a change.
+"""
+from datetime import time
+from typing import NamedTuple
+from models import db, Schedule
+from utils.worker_cache import StampedCache
+
+STAMP_FILE = 'schedules.stamp'
+# How often a worker looks for schedules changed by another worker
+SCHEDULE_CHECK_SECONDS = 1.0
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+class ScheduleError(ValueError):
+    """Raised when a schedule's windows are out of order"""
+
+
+class DaySchedule(NamedTuple):
+    """Attendance windows for one day"""
+    on_time_start: time
+    on_time_end: time
+    late_end: time
+    absent_deadline: time
+    checkout_start: time
+    checkout_end: time
+
+    def status(self, moment):
+        """'On Time', 'Late' or 'Absent' for a check-in at `moment` (a time)"""
+        if self.on_time_start <= moment <= self.on_time_end:
+            return 'On Time'
+        if self.on_time_end < moment <= self.late_end:
+            return 'Late'
+        return 'Absent'
+
+    def can_check_out(self, moment):
+        """True when `moment` (a time) is inside the check-out window"""
+        return self.checkout_start <= moment <= self.checkout_end
+
+    def validate(self):
+        """
+        Check the windows follow each other
+
+        Raises:
+            ScheduleError: When a window ends before it starts or overlaps the next
+        """
+        if not self.on_time_start <= self.on_time_end <= self.late_end <= self.absent_deadline:
+            raise ScheduleError('Check-in times must run on-time start, on-time end, late end, absent deadline')
+        if not self.checkout_start <= self.checkout_end:
+            raise ScheduleError('Check-out must end after it starts')
+        return self
+
+
+class CompiledSchedule(NamedTuple):
+    """A school's windows for Monday (0) to Sunday (6)"""
+    days: tuple
+
+    def day(self, moment):
+        """Windows for the weekday of `moment` (a date or datetime)"""
+        return self.days[moment.weekday()]
+
+    def status_at(self, moment):
+        """Attendance status for a check-in at `moment` (a datetime)"""
+        return self.days[moment.weekday()].status(moment.time())
+
+    def can_check_out(self, moment):
+        """True when check-out is allowed at `moment` (a datetime)"""
+        return self.days[moment.weekday()].can_check_out(moment.time())
+
+
+# Windows for schools that have not configured their own
+DEFAULT_DAY = DaySchedule(
+    on_time_start=time(6, 0),     # 6:00 AM
+    on_time_end=time(7, 0),       # 7:00 AM
+    late_end=time(10, 0),         # 10:00 AM
+    absent_deadline=time(11, 0),  # 11:00 AM
+    checkout_start=time(14, 0),   # 2:00 PM
+    checkout_end=time(18, 0),     # 6:00 PM
+)
+DEFAULT_SCHEDULE = CompiledSchedule((DEFAULT_DAY,) * 7)
+
+
+def _day_from_row(row):
+    return DaySchedule(*(getattr(row, field) for field in DaySchedule._fields))
+
+
+def split_rows(rows):
+    """
+    Separate a school's schedule rows into its default and weekday overrides
+
+    Args:
+        rows (list): Schedule rows; weekday None is the default, 0-6 a single day
+
+    Returns:
+        tuple: (default DaySchedule, {weekday: DaySchedule} overrides)
+    """
+    default = DEFAULT_DAY
+    overrides = {}
+    for row in rows:
+        if row.weekday is None:
+            default = _day_from_row(row)
+        else:
+            overrides[row.weekday] = _day_from_row(row)
+    return default, overrides
+
+
+def compile_schedule(rows):
+    """
+    Build a school's lookup from its schedule rows
+
+    Returns:
+        CompiledSchedule: Default windows on days without an override
+    """
+    default, overrides = split_rows(rows)
+    if not overrides and default == DEFAULT_DAY:
+        return DEFAULT_SCHEDULE
+    return CompiledSchedule(tuple(overrides.get(weekday, default) for weekday in range(7)))
+
+
+def format_time(value):
+    """A window edge as the kiosk shows it, e.g. 2:00 PM"""
+    return value.strftime('%I:%M %p').lstrip('0')
+
+
+class ScheduleStore:
+    """Loads, saves and caches every school's compiled schedule"""
+
+    def __init__(self):
+        self._cache = StampedCache(STAMP_FILE, SCHEDULE_CHECK_SECONDS)
+
+    def get(self, user_id, app=None):
+        """
+        A school's compiled schedule, from this worker's cache when possible
+
+        Args:
+            user_id (int): Owning admin
+            app (Flask): Application (default current_app)
+
+        Returns:
+            CompiledSchedule: DEFAULT_SCHEDULE for schools without rows
+        """
+        return self._cache.get(
+            user_id, lambda: compile_schedule(Schedule.query.filter_by(user_id=user_id).all()), app)
+
+    def load(self, user_id):
+        """
+        A school's stored windows, uncompiled, for editing
+
+        Returns:
+            tuple: (default DaySchedule, {weekday: DaySchedule} overrides)
+        """
+        return split_rows(Schedule.query.filter_by(user_id=user_id).all())
+
+    def save(self, user_id, default, overrides, app=None):
+        """
+        Replace a school's schedule and tell every worker to recompile it
+
+        Args:
+            user_id (int): Owning admin
+            default (DaySchedule): Windows for days without an override
+            overrides (dict): {weekday (0-6): DaySchedule}
+            app (Flask): Application (default current_app)
+
+        Raises:
+            ScheduleError: When any day's windows are out of order
+        """
+        for day in (default, *overrides.values()):
+            day.validate()
+        Schedule.query.filter_by(user_id=user_id).delete()
+        db.session.add(Schedule(user_id=user_id, weekday=None, **default._asdict()))
+        for weekday, day in sorted(overrides.items()):
+            db.session.add(Schedule(user_id=user_id, weekday=weekday, **day._asdict()))
+        db.session.commit()
+        self.invalidate(app)
+
+    def invalidate(self, app=None):
+        """Drop this worker's cache and touch the stamp so the others drop theirs"""
+        self._cache.touch(app)
+
+# Global instance
+schedule_store = ScheduleStore()
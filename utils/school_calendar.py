@@ -0,0 +1,283 @@
+"""
+Per-school working-day calendars, one bitset per year, and attendance rates
+
+A school's year is a 366-bit integer: bit n is set when day n of the year
+(January 1 = 0) is a school day. Years without a stored row default to Monday
+to Friday. Each year is stored as 46 bytes in school_calendars and cached per
+worker, invalidated through instance/calendars.stamp like the schedules.
+
+Rates are computed with bitwise operations instead of per-day queries. One
+aggregate query returns each teacher's attended days as 62-bit words, so about
+one row per teacher per two months instead of one per check-in. Each word is
+SUM(1 << day), and the sum is exact because (teacher_id, date) is unique. The
+words become one integer per teacher with the calendar's bit layout. Expected,
+attended and on-time day counts are then popcounts of masks ANDed together.
+"""
+from calendar import isleap
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+from sqlalchemy import BigInteger, case, func, literal, select
+from models import db, Teacher, Attendance, SchoolCalendar
+from utils.db_dialect import days_since
+from utils.worker_cache import StampedCache
+
+STAMP_FILE = 'calendars.stamp'
+# How often a worker looks for calendars changed by another worker
+CALENDAR_CHECK_SECONDS = 1.0
+MASK_BYTES = 46  # 366 bits
+# Days per word summed by the database, kept under a signed BIGINT
+WORD_BITS = 62
+
+
+class CalendarError(ValueError):
+    """Raised when holiday or school-day input cannot be read"""
+
+
+def days_in_year(year):
+    return 366 if isleap(year) else 365
+
+
+@lru_cache(maxsize=64)
+def weekday_mask(year):
+    """Default calendar: every Monday to Friday of `year`"""
+    first = date(year, 1, 1).weekday()
+    mask = 0
+    for offset in range(days_in_year(year)):
+        if (first + offset) % 7 < 5:
+            mask |= 1 << offset
+    return mask
+
+
+class WorkingYear(NamedTuple):
+    """One school's working days in one year"""
+    year: int
+    mask: int
+
+    def is_working(self, day):
+        """True when `day` (in this year) is a school day"""
+        return bool(self.mask >> (day.toordinal() - date(self.year, 1, 1).toordinal()) & 1)
+
+    @property
+    def count(self):
+        return self.mask.bit_count()
+
+    def holidays(self):
+        """Weekdays that are not school days"""
+        return _dates(self.year, weekday_mask(self.year) & ~self.mask)
+
+    def extra_days(self):
+        """Weekend days that are school days"""
+        return _dates(self.year, self.mask & ~weekday_mask(self.year))
+
+    def month_counts(self):
+        """School days per month, January first"""
+        counts = []
+        offset = 0
+        for month in range(1, 13):
+            length = (date(self.year + month // 12, month % 12 + 1, 1) - date(self.year, month, 1)).days
+            counts.append((self.mask >> offset & ((1 << length) - 1)).bit_count())
+            offset += length
+        return counts
+
+
+def _dates(year, mask):
+    first = date(year, 1, 1)
+    return [first + timedelta(days=offset) for offset in range(days_in_year(year)) if mask >> offset & 1]
+
+
+def parse_days(text, year):
+    """
+    Read one date (YYYY-MM-DD) or range (YYYY-MM-DD..YYYY-MM-DD) per line
+
+    Returns:
+        int: Mask of the listed days of `year`
+
+    Raises:
+        CalendarError: On an unreadable line or a date outside `year`
+    """
+    mask = 0
+    first = date(year, 1, 1).toordinal()
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        start_text, _, end_text = line.partition('..')
+        try:
+            start = date.fromisoformat(start_text.strip())
+            end = date.fromisoformat(end_text.strip()) if end_text else start
+        except ValueError:
+            raise CalendarError(f'"{line}" is not a date (YYYY-MM-DD) or range (YYYY-MM-DD..YYYY-MM-DD)')
+        if start.year != year or end.year != year or end < start:
+            raise CalendarError(f'"{line}" is not a range within {year}')
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            mask |= 1 << (ordinal - first)
+    return mask
+
+
+def format_days(days):
+    """Dates as parse_days() lines, consecutive days collapsed into ranges"""
+    lines = []
+    run_start = previous = None
+    for day in days:
+        if previous is not None and day == previous + timedelta(days=1):
+            previous = day
+            continue
+        if run_start is not None:
+            lines.append(_format_run(run_start, previous))
+        run_start = previous = day
+    if run_start is not None:
+        lines.append(_format_run(run_start, previous))
+    return '\n'.join(lines)
+
+
+def _format_run(start, end):
+    return start.isoformat() if start == end else f'{start.isoformat()}..{end.isoformat()}'
+
+
+class CalendarStore:
+    """Loads, saves and caches every school's working-day calendars"""
+
+    def __init__(self):
+        self._cache = StampedCache(STAMP_FILE, CALENDAR_CHECK_SECONDS)
+
+    def year(self, user_id, year, app=None):
+        """
+        A school's calendar for one year, from this worker's cache when possible
+
+        Returns:
+            WorkingYear: Monday to Friday when the school has not stored one
+        """
+        return self._cache.get((user_id, year), lambda: self._load(user_id, year), app)
+
+    def _load(self, user_id, year):
+        days = db.session.execute(
+            select(SchoolCalendar.days).where(SchoolCalendar.user_id == user_id, SchoolCalendar.year == year)
+        ).scalar()
+        if days is None:
+            return WorkingYear(year, weekday_mask(year))
+        return WorkingYear(year, int.from_bytes(days, 'little'))
+
+    def is_working(self, user_id, day, app=None):
+        """True when `day` is a school day for the school"""
+        return self.year(user_id, day.year, app).is_working(day)
+
+    def range_mask(self, user_id, start, end, app=None):
+        """
+        School days from `start` to `end` inclusive as one mask, bit 0 = `start`
+
+        Returns:
+            int: Working-day mask spanning however many years the range covers
+        """
+        mask = 0
+        shift = 0
+        for year in range(start.year, end.year + 1):
+            first = max(start, date(year, 1, 1))
+            last = min(end, date(year, 12, 31))
+            offset = first.toordinal() - date(year, 1, 1).toordinal()
+            length = last.toordinal() - first.toordinal() + 1
+            mask |= (self.year(user_id, year, app).mask >> offset & ((1 << length) - 1)) << shift
+            shift += length
+        return mask
+
+    def save(self, user_id, year, mask, app=None):
+        """Store a school's working days for `year` and tell every worker to reload"""
+        mask &= (1 << days_in_year(year)) - 1
+        row = SchoolCalendar.query.filter_by(user_id=user_id, year=year).first()
+        if row is None:
+            row = SchoolCalendar(user_id=user_id, year=year)
+            db.session.add(row)
+        row.days = mask.to_bytes(MASK_BYTES, 'little')
+        db.session.commit()
+        self._cache.touch(app)
+
+    def reset(self, user_id, year, app=None):
+        """Go back to Monday to Friday for `year`"""
+        SchoolCalendar.query.filter_by(user_id=user_id, year=year).delete()
+        db.session.commit()
+        self._cache.touch(app)
+
+
+def attendance_rates(user_id, start, end, department=None):
+    """
+    Expected versus attended school days for every active teacher of a school
+
+    A teacher is expected on every school day from the day they were added
+    and attends it with an On Time or Late record. Check-ins on days the
+    calendar marks as closed are reported separately and do not raise the
+    rate.
+
+    Args:
+        user_id (int): Owning admin
+        start (date): First day
+        end (date): Last day
+        department (str): Only teachers of this department
+
+    Returns:
+        dict: range, school_days, one entry per teacher and totals
+    """
+    working = calendar_store.range_mask(user_id, start, end)
+    span = end.toordinal() - start.toordinal() + 1
+
+    attendance = Attendance.__table__
+    day = days_since(attendance.c.date, start, Attendance)
+    word = (day // WORD_BITS).label('word')
+    bit = literal(1, BigInteger).bitwise_lshift(day % WORD_BITS)
+    teachers = select(Teacher.id, Teacher.unique_id, Teacher.name, Teacher.department, Teacher.created_at).where(
+        Teacher.user_id == user_id, Teacher.is_active == True)
+    words = select(
+        attendance.c.teacher_id, word, func.sum(bit), func.sum(case((attendance.c.status == 'On Time', bit), else_=0))
+    ).join(Teacher.__table__).where(
+        Teacher.user_id == user_id, Teacher.is_active == True,
+        attendance.c.date >= start, attendance.c.date <= end,
+        # A check-in after late_end is stored as Absent and must not count, as on the dashboard
+        attendance.c.status.in_(('On Time', 'Late'))
+    ).group_by(attendance.c.teacher_id, word)
+    if department:
+        teachers = teachers.where(Teacher.department == department)
+        words = words.where(Teacher.department == department)
+
+    attended = defaultdict(int)
+    on_time = defaultdict(int)
+    for teacher_id, index, attended_word, on_time_word in db.session.execute(words):
+        attended[teacher_id] |= int(attended_word) << (index * WORD_BITS)
+        on_time[teacher_id] |= int(on_time_word) << (index * WORD_BITS)
+
+    results = []
+    totals = {'expected_days': 0, 'attended_days': 0, 'on_time_days': 0}
+    for teacher_id, unique_id, name, teacher_department, created_at in db.session.execute(teachers.order_by(Teacher.name)):
+        joined = created_at.date().toordinal() - start.toordinal() if created_at else 0
+        expected_mask = working & ~((1 << min(max(joined, 0), span)) - 1)
+        expected = expected_mask.bit_count()
+        present = (attended[teacher_id] & expected_mask).bit_count()
+        punctual = (on_time[teacher_id] & expected_mask).bit_count()
+        results.append({
+            'teacher_id': teacher_id,
+            'unique_id': unique_id,
+            'name': name,
+            'department': teacher_department,
+            'expected_days': expected,
+            'attended_days': present,
+            'on_time_days': punctual,
+            'absent_days': expected - present,
+            'non_school_day_checkins': (attended[teacher_id] & ~working).bit_count(),
+            'attendance_rate': round(present / expected, 4) if expected else None,
+            'punctuality_rate': round(punctual / present, 4) if present else None,
+        })
+        totals['expected_days'] += expected
+        totals['attended_days'] += present
+        totals['on_time_days'] += punctual
+
+    totals['attendance_rate'] = (round(totals['attended_days'] / totals['expected_days'], 4)
+                                 if totals['expected_days'] else None)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'school_days': working.bit_count(),
+        'teachers': results,
+        'totals': totals,
+    }
+
+# Global instance
+calendar_store = CalendarStore()
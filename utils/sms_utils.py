@@ -1,6 +1,8 @@
-import requests
 import os
+from functools import lru_cache
 from typing import Dict, Any, Optional
+from werkzeug.local import LocalProxy
+from utils.metrics import metrics
 
 class RapidAPISMS:
     """RapidAPI SMS integration utility"""
@@ -30,6 +32,7 @@ class RapidAPISMS:
             }
         }
         
+    @metrics.timed_notification('sms')
     def send_sms(self, phone_number: str, message: str, sender_name: str = "TeacherTracker") -> Dict[str, Any]:
         """
         Send SMS using RapidAPI SMS service
@@ -75,6 +78,9 @@ class RapidAPISMS:
             payload['AccountSid'] = os.environ.get('TWILIO_ACCOUNT_SID', '')
             payload['AuthToken'] = os.environ.get('TWILIO_AUTH_TOKEN', '')
         
+        # Imported on first send so worker boot doesn't pay for requests/urllib3
+        import requests
+        
         try:
             response = requests.post(
                 f"{self.base_url}{service_config['endpoint']}",
@@ -130,6 +136,8 @@ class RapidAPISMS:
             'X-RapidAPI-Host': self.api_host
         }
         
+        import requests
+        
         try:
             # Try to get service info or test endpoint
             response = requests.get(
@@ -186,5 +194,10 @@ class RapidAPISMS:
         
         return self.send_sms(phone_number, message)
 
-# Global instance
-sms_service = RapidAPISMS() 
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_sms_service():
+    """Build the shared RapidAPISMS on first use, after .env has been loaded"""
+    return RapidAPISMS()
+
+# Global instance, constructed on first use
+sms_service = LocalProxy(get_sms_service)
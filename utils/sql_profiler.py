@@ -0,0 +1,196 @@
+"""
+Opt-in SQL profiler: every statement, its duration and call site, per request
+
+With SQL_PROFILER enabled each response carries an X-SQL-Profile header
+(statement count, database time and number of N+1 groups) and a log line.
+Statements run at least SQL_PROFILER_N_PLUS_ONE times with differing
+parameters are reported as N+1 groups, with the lines of our code that issued
+them. Outside requests, wrap code in `sql_profiler.profile()`.
+
+Finding the call site walks the stack on every statement, so keep this off in
+production.
+"""
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_HEADER = 'X-SQL-Profile'
+DEFAULT_N_PLUS_ONE = 5
+
+_current_profile = contextvars.ContextVar('sql_profile', default=None)
+
+
+def _call_site():
+    """First frame in this project's code outside the profiler, as path:line in function"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_DIR) and filename != __file__
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryProfile:
+    """Statements recorded while a profile is active"""
+
+    def __init__(self, n_plus_one=DEFAULT_N_PLUS_ONE):
+        self.n_plus_one = n_plus_one
+        self.statements = []
+
+    def record(self, statement, parameters, seconds, call_site):
+        self.statements.append((statement, repr(parameters), seconds, call_site))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def seconds(self):
+        return sum(seconds for _, _, seconds, _ in self.statements)
+
+    def repeated(self):
+        """
+        Statements run n_plus_one or more times with differing parameters
+
+        Returns:
+            list: dicts with statement, count, ms and call_sites (most frequent first)
+        """
+        groups = {}
+        for statement, parameters, seconds, call_site in self.statements:
+            groups.setdefault(statement, []).append((parameters, seconds, call_site))
+        found = []
+        for statement, runs in groups.items():
+            if len(runs) >= self.n_plus_one and len({parameters for parameters, _, _ in runs}) > 1:
+                found.append({
+                    'statement': ' '.join(statement.split()),
+                    'count': len(runs),
+                    'ms': round(sum(seconds for _, seconds, _ in runs) * 1000, 2),
+                    'call_sites': [site for site, _ in Counter(site for _, _, site in runs).most_common(3)],
+                })
+        return sorted(found, key=lambda group: -group['count'])
+
+    def summary(self):
+        """Statement count, total milliseconds and N+1 groups"""
+        return {
+            'queries': self.count,
+            'ms': round(self.seconds * 1000, 2),
+            'n_plus_one': self.repeated(),
+        }
+
+    def header_value(self):
+        return f"queries={self.count}; time={self.seconds * 1000:.1f}ms; n+1={len(self.repeated())}"
+
+
+class SQLProfiler:
+    """Installs the engine listeners on first use and manages active profiles"""
+
+    def __init__(self):
+        self._listening = False
+        self._lock = threading.Lock()
+
+    def _listen(self):
+        with self._lock:
+            if not self._listening:
+                event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+                event.listen(Engine, 'handle_error', _statement_failed)
+                self._listening = True
+
+    def init_app(self, app):
+        """
+        Profile every request of `app` when SQL_PROFILER is set
+
+        Args:
+            app (Flask): Application to instrument
+
+        Returns:
+            bool: True when requests are being profiled
+        """
+        if not app.config.get('SQL_PROFILER'):
+            return False
+        self._listen()
+        n_plus_one = app.config.get('SQL_PROFILER_N_PLUS_ONE', DEFAULT_N_PLUS_ONE)
+
+        @app.before_request
+        def start_profile():
+            request.environ['sql_profile_token'] = _current_profile.set(QueryProfile(n_plus_one))
+
+        @app.after_request
+        def report_profile(response):
+            profile = _current_profile.get()
+            if profile is not None:
+                response.headers[PROFILE_HEADER] = profile.header_value()
+                _log(profile, f'{request.method} {request.path}')
+            return response
+
+        @app.teardown_request
+        def end_profile(exception=None):
+            token = request.environ.pop('sql_profile_token', None)
+            if token is not None:
+                _current_profile.reset(token)
+
+        return True
+
+    @contextmanager
+    def profile(self, n_plus_one=DEFAULT_N_PLUS_ONE):
+        """
+        Record statements run inside the block, e.g. a CLI job or one benchmark request
+
+        Args:
+            n_plus_one (int): Repetitions that make a statement an N+1 group
+
+        Yields:
+            QueryProfile: Filled in as statements run
+        """
+        self._listen()
+        profile = QueryProfile(n_plus_one)
+        token = _current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            _current_profile.reset(token)
+
+
+def _log(profile, label):
+    groups = profile.repeated()
+    if not groups:
+        logger.info('%s: %s', label, profile.header_value())
+        return
+    details = '; '.join(f"{group['count']}x {group['statement'][:120]} at {', '.join(group['call_sites'])}"
+                        for group in groups)
+    logger.warning('%s: %s; N+1: %s', label, profile.header_value(), details)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault('sql_profile_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get('sql_profile_start')
+    if profile is None or not starts:
+        return
+    profile.record(statement, parameters, time.perf_counter() - starts.pop(), _call_site())
+
+
+def _statement_failed(context):
+    starts = context.connection.info.get('sql_profile_start') if context.connection else None
+    if starts:
+        starts.pop()
+
+# Global instance
+sql_profiler = SQLProfiler()
@@ -0,0 +1,48 @@
+from sqlalchemy import event
+
+def sqlite_pragmas(config):
+    """PRAGMA statements applied to every new SQLite connection, in order"""
+    pragmas = [
+        # Readers no longer block the writer (and vice versa) across gunicorn workers
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        # Wait for the write lock instead of failing with "database is locked"
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT', 5000))),
+        # Durable at each checkpoint; in WAL mode this skips an fsync per commit
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+        # Negative values are KiB rather than pages
+        ('cache_size', int(config.get('SQLITE_CACHE_SIZE', -64000))),
+        ('temp_store', 'MEMORY'),
+    ]
+    if config.get('SQLITE_FOREIGN_KEYS'):
+        pragmas.append(('foreign_keys', 'ON'))
+    return pragmas
+
+def apply_sqlite_profile(engine, config):
+    """Register the production PRAGMA profile on a SQLite engine (no-op for other databases)"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def run_sqlite_maintenance(engine):
+    """
+    Checkpoint the WAL back into the database file and refresh planner statistics
+
+    Returns:
+        dict: Checkpoint result (busy flag, WAL frames, frames checkpointed)
+    """
+    if engine.dialect.name != 'sqlite':
+        return None
+    with engine.connect() as connection:
+        busy, log_frames, checkpointed = connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').one()
+        connection.exec_driver_sql('PRAGMA optimize')
+    return {'busy': bool(busy), 'log_frames': log_frames, 'checkpointed_frames': checkpointed}
@@ -0,0 +1,177 @@
+"""
+Seeded synthetic tenants, rosters and attendance history for performance work
+
+`flask generate-dataset` fills a database with admin accounts (tenants), their
+teachers and years of attendance; benchmarks/bench_checkin.py builds one roster
+per run. Rows go in through Core executemany batches, so millions of
+attendance records load in minutes. Output is fully determined by the seed
+and the end date, which `flask generate-dataset` fixes at DEFAULT_END.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+
+from models import db, Teacher, Attendance
+from utils.attendance_logic import AttendanceLogic
+from utils.db_routing import use_tenant
+from utils.id_allocator import TeacherIdAllocator
+from utils.kiosk_roster import record_changes
+from utils.tenant_shards import tenant_directory
+
+# Last day of generated history unless --end is given, so a seed means the same rows on any day
+DEFAULT_END = date(2025, 7, 1)
+
+# Rows per executemany batch
+BATCH_SIZE = 10000
+
+# Share of school days a teacher has a record on
+ATTENDANCE_RATE = 0.95
+# Arrival time: mean 6:45 with a 25 minute spread, so most land in the on-time window
+ARRIVAL_MEAN_MINUTES = 6 * 60 + 45
+ARRIVAL_SPREAD_MINUTES = 25
+# Share of present teachers who also check out, between 14:00 and 17:30
+CHECK_OUT_RATE = 0.9
+
+FIRST_NAMES = ('Ama', 'Kwame', 'Abena', 'Kofi', 'Efua', 'Yaw', 'Akosua', 'Kojo', 'Adwoa', 'Kwesi',
+               'Grace', 'Samuel', 'Mary', 'Joseph', 'Esther', 'Daniel', 'Ruth', 'Emmanuel', 'Sarah', 'Isaac')
+LAST_NAMES = ('Mensah', 'Owusu', 'Boateng', 'Asante', 'Osei', 'Appiah', 'Addo', 'Agyeman', 'Ofori', 'Darko',
+              'Amoah', 'Acheampong', 'Annan', 'Badu', 'Frimpong', 'Nkansah', 'Quaye', 'Tetteh', 'Yeboah', 'Sarpong')
+DEPARTMENTS = ('Mathematics', 'English', 'Science', 'Social Studies', 'ICT', 'French',
+               'Religious Studies', 'Creative Arts', 'Physical Education', 'Home Economics', 'Music', 'Ghanaian Language')
+
+
+def school_days(start, end):
+    """Weekdays from start up to but excluding end"""
+    current = start
+    while current < end:
+        if current.weekday() < 5:
+            yield current
+        current += timedelta(days=1)
+
+
+def _attendance_row(rng, teacher_id, day):
+    minutes = int(rng.gauss(ARRIVAL_MEAN_MINUTES, ARRIVAL_SPREAD_MINUTES))
+    minutes = max(5 * 60 + 30, min(minutes, 11 * 60))
+    check_in = datetime.combine(day, time(minutes // 60, minutes % 60, rng.randrange(60)))
+    status = AttendanceLogic.determine_attendance_status(check_in)
+    check_out = None
+    if status != 'Absent' and rng.random() < CHECK_OUT_RATE:
+        leave = rng.randrange(14 * 60, 17 * 60 + 30)
+        check_out = datetime.combine(day, time(leave // 60, leave % 60))
+    return {
+        'teacher_id': teacher_id,
+        'date': day,
+        'check_in_time': check_in,
+        'check_out_time': check_out,
+        'status': status,
+        'created_at': check_in,
+        'updated_at': check_out or check_in,
+    }
+
+
+def _insert(table, rows):
+    # Core insert: one executemany per batch. The ORM bulk path splits a batch
+    # whenever a row's NULL columns differ, which here is every few rows.
+    db.session.execute(table.insert(), rows)
+
+
+def build_dataset(teachers, years=2, seed=0, user_id=1, end=None):
+    """
+    Insert a roster and its attendance history into the current app's database
+
+    Args:
+        teachers (int): Roster size
+        years (int): Years of history before `end`
+        seed (int): Random seed; the same seed and `end` always yield the same rows
+        user_id (int): Owning admin
+        end (date): First day without history (default today)
+
+    Returns:
+        dict: unique_ids of the roster, teacher and attendance row counts
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    days = list(school_days(end - timedelta(days=365 * years), end))
+    created_at = datetime.combine(days[0] if days else end, time(0))
+
+    # A fresh allocator: the global one may hold a block reserved in another database
+    unique_ids = TeacherIdAllocator().allocate(teachers)
+    teacher_rows = [{
+        'unique_id': unique_id,
+        'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+        'created_at': created_at,
+        'is_active': True,
+        'user_id': user_id,
+    } for i, unique_id in enumerate(unique_ids)]
+    for start in range(0, len(teacher_rows), BATCH_SIZE):
+        _insert(Teacher.__table__, teacher_rows[start:start + BATCH_SIZE])
+    tenant_directory.register(user_id, unique_ids)
+    record_changes(user_id, teacher_rows)
+
+    teacher_ids = db.session.query(Teacher.id).filter(Teacher.user_id == user_id).order_by(Teacher.id).all()
+    teacher_ids = [row[0] for row in teacher_ids][-teachers:]
+
+    attendance = 0
+    batch = []
+    for day in days:
+        for teacher_id in teacher_ids:
+            if rng.random() < ATTENDANCE_RATE:
+                batch.append(_attendance_row(rng, teacher_id, day))
+                if len(batch) >= BATCH_SIZE:
+                    _insert(Attendance.__table__, batch)
+                    attendance += len(batch)
+                    batch = []
+    if batch:
+        _insert(Attendance.__table__, batch)
+        attendance += len(batch)
+    db.session.commit()
+
+    return {'unique_ids': unique_ids, 'teachers': teachers, 'attendance': attendance}
+
+
+def generate_tenants(tenants, teachers, years=2, seed=0, password='password', prefix='tenant', end=DEFAULT_END):
+    """
+    Create admin accounts and fill each one with a roster and history
+
+    With TENANT_SHARDING on, every tenant's teachers and attendance go to its
+    own shard and the teacher directory is filled in.
+
+    Args:
+        tenants (int): Number of admin accounts, named <prefix>001, <prefix>002, ...
+        teachers (int): Roster size per tenant
+        years (int): Years of history per teacher
+        seed (int): Random seed for the whole dataset
+        password (str): Password for every generated account
+        prefix (str): Username prefix
+        end (date): First day without history
+
+    Yields:
+        dict: username, user_id, teachers and attendance row counts, once per tenant
+
+    Raises:
+        ValueError: When one of the usernames already exists
+    """
+    # The login form authenticates against the auth blueprint's user table
+    from routes.auth_routes import User
+    from werkzeug.security import generate_password_hash
+
+    usernames = [f'{prefix}{n:03d}' for n in range(1, tenants + 1)]
+    taken = {row[0] for row in db.session.query(User.username).filter(User.username.in_(usernames))}
+    if taken:
+        raise ValueError(f'Users already exist: {", ".join(sorted(taken))}; use another --prefix or a fresh database')
+
+    # Hashing is deliberately slow, and every account shares the password
+    password_hash = generate_password_hash(password)
+    for n, username in enumerate(usernames):
+        user = User(username=username, first_name=f'Tenant {n + 1}',
+                    email=f'{username}@example.com', password_hash=password_hash)
+        db.session.add(user)
+        db.session.commit()
+        with use_tenant(user.id):
+            result = build_dataset(teachers, years=years, seed=seed * 1_000_003 + n, user_id=user.id, end=end)
+        yield {
+            'username': username,
+            'user_id': user.id,
+            'teachers': result['teachers'],
+            'attendance': result['attendance'],
+        }
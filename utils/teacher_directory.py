@@ -0,0 +1,92 @@
+from sqlalchemy import or_
+from models import db, Teacher
+from utils.db_dialect import prefix_match
+
+# Columns callers may request, and the ones the teacher list page renders
+FIELDS = {
+    'id': Teacher.id,
+    'unique_id': Teacher.unique_id,
+    'name': Teacher.name,
+    'email': Teacher.email,
+    'department': Teacher.department,
+    'phone_number': Teacher.phone_number,
+    'created_at': Teacher.created_at,
+}
+LIST_FIELDS = ('id', 'unique_id', 'name', 'email', 'department', 'created_at')
+
+SORT_COLUMNS = {
+    'name': Teacher.name,
+    'department': Teacher.department,
+    'created': Teacher.created_at,
+    'unique_id': Teacher.unique_id,
+}
+
+DEFAULT_PER_PAGE = 24
+MAX_PER_PAGE = 100
+
+
+def _prefix_filter(search):
+    """Match names or unique IDs starting with `search`, case-insensitively"""
+    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    # Allocator IDs are upper-case Crockford and legacy IDs lower-case hex; LIKE is case-sensitive on PostgreSQL
+    id_prefixes = sorted({escaped.upper(), escaped.lower()})
+    return or_(prefix_match(Teacher.name, search),
+               *(Teacher.unique_id.like(f'{prefix}%', escape='\\') for prefix in id_prefixes))
+
+
+def search_teachers(user_id, search=None, sort='name', direction='asc', page=1,
+                    per_page=DEFAULT_PER_PAGE, fields=LIST_FIELDS):
+    """
+    Page through an admin's active teachers
+
+    Args:
+        user_id (int): Owning admin's user ID
+        search (str): Optional name or unique ID prefix
+        sort (str): One of SORT_COLUMNS
+        direction (str): 'asc' or 'desc'
+        page (int): 1-based page number
+        per_page (int): Page size, capped at MAX_PER_PAGE
+        fields (iterable): Column names from FIELDS to return
+
+    Returns:
+        dict: items (rows with attribute access), page, per_page, total, pages
+    """
+    columns = [FIELDS[name] for name in fields if name in FIELDS] or [FIELDS['id']]
+    per_page = max(1, min(per_page or DEFAULT_PER_PAGE, MAX_PER_PAGE))
+    page = max(1, page or 1)
+
+    query = db.session.query(*columns).filter(Teacher.user_id == user_id, Teacher.is_active == True)
+    search = (search or '').strip()
+    if search:
+        query = query.filter(_prefix_filter(search))
+
+    total = query.with_entities(db.func.count(Teacher.id)).scalar()
+
+    sort_column = SORT_COLUMNS.get(sort, Teacher.name)
+    if direction == 'desc':
+        query = query.order_by(sort_column.desc(), Teacher.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Teacher.id.asc())
+    items = query.offset((page - 1) * per_page).limit(per_page).all()
+
+    return {
+        'items': items,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': max(1, -(-total // per_page)),
+        'sort': sort if sort in SORT_COLUMNS else 'name',
+        'direction': 'desc' if direction == 'desc' else 'asc',
+        'search': search
+    }
+
+
+def serialize_rows(rows):
+    """Convert directory rows to JSON-ready dicts"""
+    items = []
+    for row in rows:
+        item = dict(row._mapping)
+        if item.get('created_at'):
+            item['created_at'] = item['created_at'].isoformat()
+        items.append(item)
+    return items
@@ -0,0 +1,153 @@
+import calendar
+from datetime import date, timedelta
+from sqlalchemy import case, func
+from models import db, Attendance
+from utils.db_dialect import dialect_name
+
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 200
+
+
+def _hours_worked():
+    """SQL expression for hours between check-in and check-out on the current dialect"""
+    dialect = dialect_name(Attendance)
+    if dialect == 'postgresql':
+        seconds = func.extract('epoch', Attendance.check_out_time - Attendance.check_in_time)
+        return seconds / 3600.0
+    if dialect in ('mysql', 'mariadb'):
+        return func.timestampdiff(db.text('SECOND'), Attendance.check_in_time, Attendance.check_out_time) / 3600.0
+    return (func.julianday(Attendance.check_out_time) - func.julianday(Attendance.check_in_time)) * 24.0
+
+
+def month_bounds(year, month):
+    """First and last day of a calendar month"""
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+class TeacherHistory:
+    """Attendance calendars, statistics and history paging for one teacher
+
+    Every query is a range scan over the (teacher_id, date) index created by
+    the _teacher_date_uc unique constraint.
+    """
+
+    @staticmethod
+    def get_period_summary(teacher_id, start, end):
+        """
+        Aggregate attendance for a date range in one query
+
+        Returns:
+            dict: record counts per status, days attended, total hours and punctuality rate
+        """
+        row = db.session.query(
+            func.count(Attendance.id),
+            func.sum(case((Attendance.status == 'On Time', 1), else_=0)),
+            func.sum(case((Attendance.status == 'Late', 1), else_=0)),
+            func.sum(case((Attendance.status == 'Absent', 1), else_=0)),
+            func.count(Attendance.check_in_time),
+            func.sum(_hours_worked())
+        ).filter(
+            Attendance.teacher_id == teacher_id,
+            Attendance.date >= start,
+            Attendance.date <= end
+        ).one()
+
+        total, on_time, late, absent, attended, hours = row
+        on_time = on_time or 0
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'total_records': total,
+            'on_time_count': on_time,
+            'late_count': late or 0,
+            'absent_count': absent or 0,
+            'days_attended': attended,
+            'hours_worked': round(hours or 0.0, 2),
+            'punctuality_rate': round(on_time / attended, 4) if attended else None
+        }
+
+    @staticmethod
+    def get_on_time_streak(teacher_id):
+        """
+        Count consecutive On Time records since the most recent other status
+
+        Returns:
+            int: Length of the current on-time streak
+        """
+        last_miss = db.session.query(func.max(Attendance.date)).filter(
+            Attendance.teacher_id == teacher_id,
+            Attendance.status != 'On Time'
+        ).scalar_subquery()
+
+        return db.session.query(func.count(Attendance.id)).filter(
+            Attendance.teacher_id == teacher_id,
+            Attendance.status == 'On Time',
+            Attendance.date > func.coalesce(last_miss, date.min)
+        ).scalar()
+
+    @staticmethod
+    def get_calendar(teacher_id, start, end):
+        """
+        Build a day-by-day calendar for a date range
+
+        Returns:
+            dict: summary statistics plus one entry per day (status None when no record)
+        """
+        rows = db.session.query(
+            Attendance.date,
+            Attendance.status,
+            Attendance.check_in_time,
+            Attendance.check_out_time,
+            _hours_worked()
+        ).filter(
+            Attendance.teacher_id == teacher_id,
+            Attendance.date >= start,
+            Attendance.date <= end
+        ).all()
+        by_date = {row[0]: row for row in rows}
+
+        days = []
+        current = start
+        while current <= end:
+            row = by_date.get(current)
+            days.append({
+                'date': current.isoformat(),
+                'weekday': current.weekday(),
+                'status': row[1] if row else None,
+                'check_in_time': row[2].strftime('%H:%M') if row and row[2] else None,
+                'check_out_time': row[3].strftime('%H:%M') if row and row[3] else None,
+                'hours_worked': round(row[4], 2) if row and row[4] is not None else None
+            })
+            current += timedelta(days=1)
+
+        return {
+            'summary': TeacherHistory.get_period_summary(teacher_id, start, end),
+            'days': days
+        }
+
+    @staticmethod
+    def get_history_page(teacher_id, before=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Page backwards through a teacher's records by date (keyset pagination)
+
+        Args:
+            teacher_id (int): Teacher's primary key
+            before (date): Only return records strictly before this date
+            limit (int): Page size
+
+        Returns:
+            dict: records (newest first) and next_before, the cursor for the next page
+        """
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        query = Attendance.query.filter(Attendance.teacher_id == teacher_id)
+        if before:
+            query = query.filter(Attendance.date < before)
+        records = query.order_by(Attendance.date.desc()).limit(limit + 1).all()
+
+        has_more = len(records) > limit
+        records = records[:limit]
+        return {
+            'records': records,
+            'next_before': records[-1].date.isoformat() if has_more else None
+        }
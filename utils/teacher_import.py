@@ -0,0 +1,305 @@
+import csv
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from sqlalchemy import func, insert, or_
+from models import db, Teacher
+from utils.db_dialect import insert_ignoring_conflicts, supports_bulk_returning
+from utils.id_allocator import teacher_id_allocator
+from utils.kiosk_roster import record_changes
+from utils.tenant_shards import tenant_directory
+from utils.qrcode_utils import qr_generator
+from utils.email_notifications import email_service
+
+# Accepted spellings for each roster column
+COLUMN_ALIASES = {
+    'name': 'name',
+    'full_name': 'name',
+    'teacher_name': 'name',
+    'email': 'email',
+    'email_address': 'email',
+    'department': 'department',
+    'class': 'department',
+    'phone': 'phone_number',
+    'phone_number': 'phone_number',
+    'mobile': 'phone_number',
+}
+
+logger = logging.getLogger(__name__)
+
+# Rows per IN (...) prefetch and per INSERT, kept under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+# Seconds between heartbeats while a worker waits for import batches at exit
+DRAIN_INTERVAL = 1.0
+
+
+class RosterError(ValueError):
+    """Raised when an uploaded roster cannot be read"""
+
+
+def _normalize_header(header):
+    key = (header or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return COLUMN_ALIASES.get(key)
+
+
+def _rows_from_table(table):
+    """Map a header row plus data rows to dicts keyed by canonical column names"""
+    table = iter(table)
+    try:
+        headers = [_normalize_header(str(h) if h is not None else '') for h in next(table)]
+    except StopIteration:
+        raise RosterError('The roster file is empty')
+    if 'name' not in headers:
+        raise RosterError('The roster must have a "name" column')
+
+    rows = []
+    for values in table:
+        row = {}
+        for header, value in zip(headers, values):
+            if header and value is not None:
+                row[header] = str(value).strip()
+        if any(row.values()):
+            rows.append(row)
+    return rows
+
+
+def parse_roster(filename, stream):
+    """
+    Parse an uploaded CSV or XLSX roster
+
+    Args:
+        filename (str): Original file name, used to pick the parser
+        stream: Binary file object
+
+    Returns:
+        list: One dict per data row with name/email/department/phone_number keys
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        try:
+            text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+            return _rows_from_table(csv.reader(text))
+        except UnicodeDecodeError:
+            raise RosterError('CSV files must be UTF-8 encoded')
+    if extension == '.xlsx':
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RosterError('XLSX import requires the openpyxl package')
+        try:
+            workbook = load_workbook(stream, read_only=True, data_only=True)
+        except Exception as e:
+            raise RosterError(f'Could not read XLSX file: {str(e)}')
+        try:
+            return _rows_from_table(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    raise RosterError('Unsupported file type; upload a .csv or .xlsx roster')
+
+
+def _prefetch_existing(names, emails):
+    """Return (names, lowercased emails) already present, fetched with one query per chunk"""
+    existing_names, existing_emails = set(), set()
+    names, emails = list(names), list(emails)
+    for start in range(0, max(len(names), len(emails)), CHUNK_SIZE):
+        name_chunk = names[start:start + CHUNK_SIZE]
+        email_chunk = emails[start:start + CHUNK_SIZE]
+        rows = db.session.query(Teacher.name, Teacher.email).filter(or_(
+            Teacher.name.in_(name_chunk),
+            func.lower(Teacher.email).in_(email_chunk)
+        )).all()
+        for name, email in rows:
+            existing_names.add(name)
+            if email:
+                existing_emails.add(email.lower())
+    return existing_names, existing_emails
+
+
+def import_teachers(rows, user_id):
+    """
+    Validate, de-duplicate and bulk insert roster rows for one admin
+
+    Args:
+        rows (list): Parsed roster rows from parse_roster
+        user_id (int): Owning admin's user ID
+
+    Returns:
+        tuple: (results, created) where results has one entry per row and
+            created lists the inserted teachers' values
+    """
+    candidate_names = {row.get('name') for row in rows if row.get('name')}
+    candidate_emails = {row['email'].lower() for row in rows if row.get('email')}
+    existing_names, existing_emails = _prefetch_existing(candidate_names, candidate_emails)
+
+    results = []
+    accepted = []
+    seen_names, seen_emails = set(), set()
+
+    for line_number, row in enumerate(rows, start=2):
+        name = row.get('name', '')
+        email = row.get('email') or None
+        result = {'row': line_number, 'name': name, 'email': email}
+
+        if not name:
+            error = 'Teacher name is required'
+        elif name in existing_names or name in seen_names:
+            error = 'Teacher with this name already exists'
+        elif email and '@' not in email:
+            error = 'Invalid email address'
+        elif email and (email.lower() in existing_emails or email.lower() in seen_emails):
+            error = 'Email address is already in use'
+        else:
+            error = None
+
+        if error:
+            result.update(status='error', message=error)
+            results.append(result)
+            continue
+
+        seen_names.add(name)
+        if email:
+            seen_emails.add(email.lower())
+        accepted.append((result, row))
+        results.append(result)
+
+    # Reserve every ID up front, before the insert takes the write lock
+    unique_ids = teacher_id_allocator.allocate(len(accepted))
+    now = datetime.utcnow()
+    created = []
+    for (result, row), unique_id in zip(accepted, unique_ids):
+        created.append({
+            'unique_id': unique_id,
+            'name': result['name'],
+            'email': result['email'],
+            'department': row.get('department') or None,
+            'phone_number': row.get('phone_number') or None,
+            'created_at': now,
+            'is_active': True,
+            'user_id': user_id
+        })
+        result.update(status='created', message='Teacher added', unique_id=unique_id)
+
+    try:
+        if supports_bulk_returning(Teacher):
+            # Rows that lost a race with another insert are skipped instead of failing the batch
+            statement = insert_ignoring_conflicts(Teacher).returning(Teacher.unique_id)
+            inserted = set()
+            for start in range(0, len(created), CHUNK_SIZE):
+                inserted.update(db.session.execute(statement, created[start:start + CHUNK_SIZE]).scalars())
+        else:
+            for start in range(0, len(created), CHUNK_SIZE):
+                db.session.execute(insert(Teacher), created[start:start + CHUNK_SIZE])
+            inserted = {teacher['unique_id'] for teacher in created}
+        tenant_directory.register(user_id, sorted(inserted))
+        record_changes(user_id, [teacher for teacher in created if teacher['unique_id'] in inserted])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        inserted = set()
+        for result in results:
+            if result['status'] == 'created':
+                result.update(status='error', message=f'Error adding teacher: {str(e)}')
+                result.pop('unique_id', None)
+
+    for result in results:
+        if result['status'] == 'created' and result['unique_id'] not in inserted:
+            result.update(status='error', message='Teacher with this name or email already exists')
+            result.pop('unique_id')
+    created = [teacher for teacher in created if teacher['unique_id'] in inserted]
+
+    return results, created
+
+
+def process_import_batch(teachers):
+    """Render QR code files and send welcome emails for imported teachers, logging each recipient's result"""
+    recipients = []
+    for teacher in teachers:
+        qr_path = qr_generator.save_qr_code(teacher['unique_id'])
+        if teacher.get('email'):
+            recipients.append({
+                'to_email': teacher['email'],
+                'teacher_name': teacher['name'],
+                'qr_path': qr_path,
+                'teacher_unique_id': teacher['unique_id']
+            })
+    results = email_service.send_qr_code_emails(recipients)
+    for recipient, result in zip(recipients, results):
+        if result.get('success'):
+            logger.info('Welcome email sent to %s (%s)', recipient['to_email'], recipient['teacher_unique_id'])
+        else:
+            logger.warning('Welcome email to %s (%s) not sent: %s', recipient['to_email'],
+                           recipient['teacher_unique_id'], result.get('error'))
+    return results
+
+
+def _run_batch(teachers):
+    try:
+        return process_import_batch(teachers)
+    except Exception:
+        logger.exception('Roster import batch of %d teachers failed', len(teachers))
+        raise
+
+
+class ImportBatchQueue:
+    """Runs import batches one at a time on a background thread that is drained, not killed, at exit
+
+    The thread is not a daemon, and gunicorn's worker_exit hook calls drain()
+    so a recycled or stopping worker finishes its queued emails first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futures = set()
+
+    def submit(self, teachers):
+        """Queue process_import_batch for teachers; returns its Future"""
+        with self._lock:
+            # Created on first use, so a preloading gunicorn master never starts the thread
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='roster-import')
+            future = self._executor.submit(_run_batch, teachers)
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def drain(self, heartbeat=None):
+        """
+        Finish every queued batch, then stop the thread
+
+        Args:
+            heartbeat (callable): Called every DRAIN_INTERVAL seconds while waiting,
+                e.g. gunicorn's worker.notify so the arbiter doesn't time the worker out
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pending = set(self._futures)
+        if executor is None:
+            return
+        if pending:
+            logger.info('Finishing %d roster import batch(es) before exit', len(pending))
+        # Queued batches still run; only new submissions are refused
+        executor.shutdown(wait=False)
+        while pending:
+            _, pending = wait(pending, timeout=DRAIN_INTERVAL)
+            if heartbeat is not None:
+                heartbeat()
+        executor.shutdown(wait=True)
+
+
+def start_import_batch(teachers):
+    """Queue process_import_batch in the background so the upload returns immediately"""
+    if not teachers:
+        return None
+    return import_batches.submit(teachers)
+
+# Global instance
+import_batches = ImportBatchQueue()
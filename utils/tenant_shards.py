@@ -0,0 +1,188 @@
+import logging
+import threading
+from flask import current_app, g
+from sqlalchemy import delete, event, insert, select, text
+from models import db, Teacher, Attendance, TeacherShard
+from utils.db_routing import RoutingSession, tenant_engines
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT when copying into a shard, kept under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+# Session.info key holding directory writes that wait for the caller's commit
+PENDING_KEY = 'tenant_directory_pending'
+
+
+def sharding_enabled():
+    """True when TENANT_SHARDING puts each admin's teachers in their own shard"""
+    return bool(current_app.config.get('TENANT_SHARDING'))
+
+
+class TenantDirectory:
+    """Maps teacher unique IDs to tenants for requests without a logged-in admin
+
+    Kiosk scans and QR images only carry a teacher's unique_id; the
+    teacher_shards table on the primary says which shard to open.
+
+    The directory and a shard are separate databases, so one commit can't
+    cover both. Directory writes are held until the caller's session has
+    committed the teacher rows and dropped on rollback: a failure leaves at
+    worst a teacher missing from the directory or an entry for a deleted
+    teacher, never an entry pointing at a teacher that was not created.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def lookup(self, teacher_unique_id):
+        """
+        Find the tenant that owns a teacher
+
+        Returns:
+            int: Admin user ID, or None for an unknown teacher
+        """
+        user_id = self._cache.get(teacher_unique_id)
+        if user_id is None:
+            user_id = db.session.query(TeacherShard.user_id).filter_by(unique_id=teacher_unique_id).scalar()
+            # Only hits are cached: a teacher never moves between tenants
+            if user_id is not None:
+                with self._lock:
+                    self._cache[teacher_unique_id] = user_id
+        return user_id
+
+    def use_teacher_tenant(self, teacher_unique_id):
+        """Route the rest of this request to the shard holding a teacher (no-op when sharding is off)"""
+        if sharding_enabled() and teacher_unique_id:
+            g.tenant_id = self.lookup(teacher_unique_id)
+
+    def register(self, user_id, unique_ids):
+        """Record new teachers in the directory once the caller's transaction commits"""
+        if not sharding_enabled() or not unique_ids:
+            return
+        db.session.info.setdefault(PENDING_KEY, []).append(('register', user_id, list(unique_ids)))
+
+    def unregister(self, teacher_unique_id):
+        """Remove a deleted teacher from the directory once the caller's transaction commits"""
+        if not sharding_enabled():
+            return
+        db.session.info.setdefault(PENDING_KEY, []).append(('unregister', None, [teacher_unique_id]))
+
+    def apply(self, pending):
+        """Write queued register/unregister entries to the primary in one transaction"""
+        with db.engine.begin() as connection:
+            for action, user_id, unique_ids in pending:
+                if action == 'register':
+                    for start in range(0, len(unique_ids), CHUNK_SIZE):
+                        connection.execute(insert(TeacherShard), [
+                            {'unique_id': unique_id, 'user_id': user_id}
+                            for unique_id in unique_ids[start:start + CHUNK_SIZE]
+                        ])
+                else:
+                    connection.execute(delete(TeacherShard).where(TeacherShard.unique_id.in_(unique_ids)))
+                    with self._lock:
+                        for unique_id in unique_ids:
+                            self._cache.pop(unique_id, None)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _write_directory(session):
+    """The teacher rows are committed; now point the directory at them"""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        tenant_directory.apply(pending)
+    except Exception:
+        # The teachers are committed but kiosk scans won't find them until this is fixed by hand
+        logger.exception('Teacher directory update failed for %s', pending)
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _drop_directory_writes(session, previous_transaction):
+    """Nothing was committed, so the directory stays as it was"""
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+
+
+def tenant_ids():
+    """
+    Every admin that owns teachers, for jobs that run tenant by tenant
+
+    Returns:
+        list: Admin user IDs, ascending; taken from the shard directory when sharding is on
+    """
+    if sharding_enabled():
+        query = select(TeacherShard.user_id).distinct()
+    else:
+        query = select(Teacher.user_id).distinct()
+    return sorted(db.session.execute(query).scalars())
+
+
+def _copy_missing(target, table, rows):
+    """Insert rows into a shard table, skipping primary keys it already has"""
+    existing = set(target.execute(select(table.c.id)).scalars())
+    missing = [dict(row) for row in rows if row['id'] not in existing]
+    for start in range(0, len(missing), CHUNK_SIZE):
+        target.execute(insert(table), missing[start:start + CHUNK_SIZE])
+    if target.dialect.name == 'postgresql' and missing:
+        # Explicit IDs don't advance the SERIAL sequence; move it past the copied rows
+        schema = target.get_execution_options()['schema_translate_map'][None]
+        target.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{schema}.{table.name}', 'id'), "
+            f"(SELECT MAX(id) FROM {schema}.{table.name}))"
+        ))
+    return len(missing)
+
+
+def split_database(purge=False):
+    """
+    Copy every tenant's teachers and attendance from the primary into its shard
+
+    Safe to re-run: rows already in a shard are skipped. Each tenant is
+    copied in its own transaction.
+
+    Args:
+        purge (bool): Delete the copied rows from the primary afterwards
+
+    Returns:
+        dict: (teachers, attendance records) copied, keyed by tenant ID
+    """
+    teachers = Teacher.__table__
+    attendance = Attendance.__table__
+    primary = db.engine
+
+    with primary.connect() as connection:
+        tenant_ids = connection.execute(select(teachers.c.user_id).distinct()).scalars().all()
+
+    copied = {}
+    for tenant_id in tenant_ids:
+        tenant_teacher_ids = select(teachers.c.id).where(teachers.c.user_id == tenant_id)
+        with primary.begin() as source, tenant_engines.engine_for(db, tenant_id).begin() as target:
+            teacher_rows = source.execute(
+                select(teachers).where(teachers.c.user_id == tenant_id)
+            ).mappings().all()
+            attendance_rows = source.execute(
+                select(attendance).where(attendance.c.teacher_id.in_(tenant_teacher_ids))
+            ).mappings().all()
+            copied[tenant_id] = (
+                _copy_missing(target, teachers, teacher_rows),
+                _copy_missing(target, attendance, attendance_rows)
+            )
+
+            registered = set(source.execute(
+                select(TeacherShard.unique_id).where(TeacherShard.user_id == tenant_id)
+            ).scalars())
+            directory = [{'unique_id': row['unique_id'], 'user_id': tenant_id}
+                         for row in teacher_rows if row['unique_id'] not in registered]
+            for start in range(0, len(directory), CHUNK_SIZE):
+                source.execute(insert(TeacherShard), directory[start:start + CHUNK_SIZE])
+
+            if purge:
+                source.execute(delete(attendance).where(attendance.c.teacher_id.in_(tenant_teacher_ids)))
+                source.execute(delete(teachers).where(teachers.c.user_id == tenant_id))
+    return copied
+
+# Global instance
+tenant_directory = TenantDirectory()
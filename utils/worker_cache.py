@@ -0,0 +1,69 @@
+"""
+Per-worker caches invalidated across gunicorn workers by a stamp file
+
+A worker keeps loaded values in a plain dict. Changing the underlying data
+touches a stamp file in the instance folder; every worker stats the stamp at
+most once per check interval and empties its dict when the stamp has changed.
+Reads between checks cost a dict lookup and no query.
+"""
+import os
+import threading
+from time import monotonic, time_ns
+from flask import current_app
+
+
+class StampedCache:
+    """Dict of loaded values, emptied when the stamp file changes"""
+
+    def __init__(self, stamp_file, check_seconds=1.0):
+        self.stamp_file = stamp_file
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._values = {}
+        self._stamp = None
+        self._checked = 0.0
+
+    def _stamp_path(self, app):
+        return os.path.join(app.instance_path, self.stamp_file)
+
+    def _check_stamp(self, app):
+        now = monotonic()
+        if now - self._checked < self.check_seconds:
+            return
+        self._checked = now
+        try:
+            stamp = os.stat(self._stamp_path(app)).st_mtime_ns
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            with self._lock:
+                self._values = {}
+                self._stamp = stamp
+
+    def get(self, key, load, app=None):
+        """
+        Cached value for `key`, calling `load()` on a miss
+
+        Args:
+            key: Any hashable key
+            load (callable): Returns the value; called without arguments
+            app (Flask): Application (default current_app)
+        """
+        self._check_stamp(app or current_app)
+        value = self._values.get(key)
+        if value is None:
+            value = load()
+            with self._lock:
+                self._values[key] = value
+        return value
+
+    def touch(self, app=None):
+        """Empty this worker's cache and touch the stamp so the other workers empty theirs"""
+        app = app or current_app
+        os.makedirs(app.instance_path, exist_ok=True)
+        with open(self._stamp_path(app), 'w') as f:
+            f.write(str(time_ns()))
+        with self._lock:
+            self._values = {}
+            self._stamp = None
+            self._checked = 0.0